@@ -1 +1,27 @@
-# FastAPI: /health, /pause, /flat
\ No newline at end of file
+# FastAPI: /health, /metrics (Prometheus), вебхук TradingView
+#   uvicorn apps.api:app
+import time
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+from core.metrics import LatencyRegistry
+from core.tracing import TRACER, render_prometheus
+from integrations.signals.tradingview_webhook import router as tv_router
+
+app = FastAPI(title="trading bot")
+app.include_router(tv_router)
+
+_started = time.time()
+# доп. реестры латентности (например adapter.latency биржи) — регистрирует процесс, который их создал
+latency_sources: dict[str, LatencyRegistry] = {}
+
+
+@app.get("/health")
+def health():
+    return {"ok": True, "uptime_s": round(time.time() - _started, 1)}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return render_prometheus(TRACER, latency_sources.items())
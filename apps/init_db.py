@@ -1,11 +1,34 @@
 # apps/init_db.py
+from sqlalchemy import inspect, text
+
 from database.db import engine
 from database.models import Base
 
+
+def add_missing_columns(bind=engine) -> list:
+    """create_all не трогает существующие таблицы — новые nullable-колонки добавляем сами (ALTER TABLE ADD COLUMN)."""
+    insp = inspect(bind)
+    added = []
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not insp.has_table(table.name):
+                continue
+            have = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in have or not col.nullable:
+                    continue
+                coltype = col.type.compile(dialect=bind.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {col.name} {coltype}'))
+                added.append(f"{table.name}.{col.name}")
+    return added
+
+
 def init():
     print("Creating tables...")
     Base.metadata.create_all(bind=engine)
+    for name in add_missing_columns():
+        print(f"Added column {name}")
     print("Done.")
 
 if __name__ == "__main__":
-    init()
\ No newline at end of file
+    init()
@@ -1,24 +1,176 @@
-# основной луп
-from services.trading_service import TradingService
-from core.data_feed import MarketDataFeedImpl      # твоя реализация
-from core.execution import ExecutionAdapterImpl    # твоя реализация
-
-def main():
-    feed = MarketDataFeedImpl(pair="ETH/USDT", timeframe="15m")  # реализуй history()/stream()
-    ex   = ExecutionAdapterImpl(...)                             # ccxt/ключи/лимиты
-
-    svc = TradingService(
-        pair="ETH/USDT",
-        timeframe="15m",
-        data_feed=feed,
-        exchange=ex,
-        equity_provider=lambda: 10_000.0,  # подставь свою функцию/БД
-        cfg_path="config.yaml",
-    )
-
-    # backfill + live loop on bar close
-    for bar in feed.stream():        # yield закрытые бары
-        svc.on_bar_close(bar)
+# основной луп: все пары из config.yaml в одном процессе
+import asyncio, os
+
+from core.aggregator import BarAggregator, parse_timeframe, resample
+from core.backtest import params_from_config, risk_config_from_config, rules_from_config
+from core.bar_store import BarStore
+from core.indicators import IndicatorEngine
+from core.orders import OrderTracker
+from core.portfolio import Portfolio, PortfolioConfig
+from core.risk import RiskEngine
+from core.runtime import StrategyInstance, TradingRuntime
+from core.storage import InMemoryStore, SqlStore
+from core.strategy import RuleStrategy, TrendFollowingStrategy
+from integrations.datafeeds.binance_feed import TF_TO_INTERVAL_SEC
+from integrations.datafeeds.binance_history import BinanceHistoryLoader
+from integrations.datafeeds.binance_ws import BinanceKlineStream
+from integrations.exchanges.binance import AsyncBinanceExchangeAdapter
+from integrations.exchanges.binance_user_stream import BinanceUserDataStream
+from utils.config import load_config
+
+
+_MAX_RESAMPLE_MINUTES = 7 * 24 * 60     # потолок 1m-истории для объёмных/диапазонных баров
+
+
+def _session_factory():
+    # без DATABASE_URL всё состояние живёт в памяти (как раньше)
+    if not os.getenv("DATABASE_URL"):
+        return None
+    from database.db import SessionLocal, engine
+    from database.models import Base
+    Base.metadata.create_all(bind=engine)
+    return SessionLocal
+
+
+def build_runtime(cfg, exchange, session_factory=None) -> TradingRuntime:
+    # лимиты и trailing из risk-секции — на весь процесс, а не на пару
+    runtime = TradingRuntime(exchange, OrderTracker(), portfolio=Portfolio(PortfolioConfig.from_risk(cfg.risk)))
+    params = params_from_config(cfg)
+    risk_cfg = risk_config_from_config(cfg)
+    # entry_long/exit_long из config компилируются один раз; у каждого инстанса свои evaluator'ы (confirm_bars)
+    rules = rules_from_config(cfg)
+    for pair in cfg.pairs or [cfg.pair]:
+        # своё состояние у каждого инстанса; SqlStore пишет его в БД фоном и поднимает после рестарта
+        if session_factory is None:
+            store = InMemoryStore()
+        else:
+            store = SqlStore(session_factory, key=f"{pair}:{cfg.timeframe}:trend", symbol=pair, strategy="trend_ema_rsi")
+        runtime.add(StrategyInstance(
+            pair=pair,
+            timeframe=cfg.timeframe,
+            strategy=RuleStrategy(rules, params) if rules is not None else TrendFollowingStrategy(params),
+            risk=RiskEngine(risk_cfg, equity_provider=store.get_equity),
+            indicators=IndicatorEngine(cfg.indicators),
+            store=store,
+        ))
+    return runtime
+
+
+def _serve_metrics(exchange):
+    # трассировка живёт в этом процессе → /metrics отдаём отсюда же (METRICS_PORT=9100)
+    port = os.getenv("METRICS_PORT")
+    if not port:
+        return None
+    import uvicorn
+    from apps.api import app, latency_sources
+    latency_sources["binance"] = exchange.latency
+    server = uvicorn.Server(uvicorn.Config(app, host="0.0.0.0", port=int(port), log_level="warning"))
+    return asyncio.create_task(server.serve())
+
+
+def _base_timeframe(tf: str) -> str:
+    """Крупнейший таймфрейм Binance, из которого tf собирается целыми барами (6h — из 2h, 10m — из 5m)."""
+    kind, size = parse_timeframe(tf)
+    if kind != "time":
+        return "1m"
+    bases = [t for t, sec in TF_TO_INTERVAL_SEC.items() if size % sec == 0]
+    if not bases:
+        raise ValueError(f"Timeframe {tf!r} cannot be built from Binance klines")
+    return max(bases, key=TF_TO_INTERVAL_SEC.get)
+
+
+def _history(loader: BinanceHistoryLoader, pair: str, tf: str, bars: int = 500):
+    # через локальный кэш баров: после рестарта докачивается только хвост, и только закрытые бары
+    if tf in TF_TO_INTERVAL_SEC:
+        return loader.history(pair, tf, limit=bars)
+    base = _base_timeframe(tf)
+    kind, size = parse_timeframe(tf)
+    if kind == "time":
+        # bars целых корзин + одна на неполную первую (её BarAggregator отбросит)
+        per_bar = int(size) // TF_TO_INTERVAL_SEC[base]
+        out = _aggregate(loader.history(pair, base, limit=(bars + 1) * per_bar), tf, base)
+        return out[-bars:]
+    # объёмные/диапазонные: сколько 1m уйдёт на бар, заранее неизвестно — расширяем окно, пока не хватит
+    minutes = max(bars, 1000)
+    while True:
+        out = _aggregate(loader.history(pair, base, limit=minutes), tf, base)
+        if len(out) >= bars or minutes >= _MAX_RESAMPLE_MINUTES:
+            return out[-bars:]
+        minutes = min(minutes * 2, _MAX_RESAMPLE_MINUTES)
+
+
+def _aggregate(history, tf: str, base: str):
+    agg = BarAggregator([tf], input_tf=base)
+    return [bar for b in history for _, bar in agg.on_bar(b)]
+
+
+def _bar_events(subscriptions, testnet: bool, start_after=None):
+    pairs = {}
+    for pair, tf in subscriptions:
+        pairs.setdefault(pair, []).append(tf)
+    if all(len(tfs) == 1 and tfs[0] in TF_TO_INTERVAL_SEC for tfs in pairs.values()):
+        # разрыв между history() и первым WS-баром догружается уже при подключении
+        return BinanceKlineStream(subscriptions, testnet=testnet, start_after=start_after).stream()
+    # одна 1m-подписка на пару, остальные таймфреймы — агрегацией
+    base = BinanceKlineStream([(pair, "1m") for pair in pairs], testnet=testnet,
+                              start_after=_minute_start_after(start_after or {})).stream()
+    return resample(base, pairs, input_tf="1m")
+
+
+def _minute_start_after(start_after):
+    """
+    start_after по (pair, tf) → по (pair, '1m'): 1m догружаем с начала самой ранней корзины, следующей
+    за последним засеянным баром, — тогда первая собранная корзина целая, а уже виденные инстансы отбросят.
+    Для объёмных/диапазонных баров границы неизвестны — они собираются с момента подключения.
+    """
+    out = {}
+    for (pair, tf), open_ms in start_after.items():
+        kind, size = parse_timeframe(tf)
+        if kind != "time":
+            continue
+        after = open_ms + int(size * 1000) - 60_000      # open time последней 1m засеянной корзины
+        out[(pair, "1m")] = min(out.get((pair, "1m"), after), after)
+    return out
+
+
+def _start_signal_workers(runtime, n: int):
+    """Воркеры services.signal_router с обработчиками, пишущими в этот рантайм."""
+    import threading
+    from cache.redis_client import redis_client
+    from services.signal_router import register_runtime, run_workers
+    register_runtime(runtime, asyncio.get_running_loop())
+    stop = threading.Event()
+    run_workers(redis_client, n=n, stop=stop)
+    return stop
+
+
+async def main(cfg_path: str = "config.yaml", signal_workers: int = 0):
+    cfg = load_config(cfg_path)
+    exchange = AsyncBinanceExchangeAdapter()
+    runtime = build_runtime(cfg, exchange, _session_factory())
+    pairs = [p for p, _ in runtime.subscriptions]
+    await asyncio.to_thread(exchange.prefetch_filters, pairs)
+
+    # backfill индикаторов, затем одно WS-соединение на все пары
+    loader = BinanceHistoryLoader(BarStore(os.getenv("BAR_CACHE_DIR", "data/bars")), testnet=exchange.testnet)
+    await runtime.seed(lambda pair, tf: _history(loader, pair, tf, max(runtime.warmup_bars(pair, tf), 500)))
+    user_stream = BinanceUserDataStream(exchange.api_key, testnet=exchange.testnet)
+    fills = asyncio.create_task(runtime.tracker.consume(user_stream.events()))
+    metrics = _serve_metrics(exchange)
+    # сигналы принимаем только после seed: без прогретых баров не из чего считать ATR и размер
+    signals = _start_signal_workers(runtime, signal_workers) if signal_workers else None
+    try:
+        await runtime.run(_bar_events(runtime.subscriptions, exchange.testnet, runtime.last_bar_ms()))
+    finally:
+        if signals is not None:
+            signals.set()
+        fills.cancel()
+        if metrics is not None:
+            metrics.cancel()
+        await exchange.close()
+        for inst in runtime.all_instances():
+            if isinstance(inst.store, SqlStore):
+                inst.store.close(timeout=10)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,51 @@
+# Масштабирование Optimizer по числу процессов: одна и та же сетка на 1, 2, 4, ... воркерах.
+# Результаты должны совпадать, время — падать почти линейно до числа ядер.
+#   python benchmarks/bench_optimizer.py [--bars 50000] [--workers 1,2,4,8]
+import argparse, os, sys, time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from core.optimizer import Optimizer, grid
+from core.risk import RiskConfig
+
+BASE = {"ema_fast": 5, "ema_slow": 13, "rsi_len": 14, "atr_len": 14,
+        "entry_rsi": 65, "exit_rsi": 75, "cooldown_bars": 3, "stop_atr_mult": 2.0}
+RISK = RiskConfig(per_trade_risk_pct=0.7, max_daily_loss_pct=3.0, stop_atr_mult=2.0)
+
+
+def bars(n, seed=1):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    t0 = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    return pd.DataFrame({
+        "ts": pd.date_range(t0, periods=n, freq="15min"),
+        "open": close + rng.normal(0, 0.3, n), "high": close + rng.uniform(0, 1, n),
+        "low": close - rng.uniform(0, 1, n), "close": close, "volume": rng.uniform(1, 10, n),
+    })
+
+
+def main(a):
+    df = bars(a.bars)
+    space = grid({"ema_fast": [3, 5, 8, 10, 12], "ema_slow": [21, 34, 55, 89],
+                  "entry_rsi": [55, 65], "exit_rsi": [70, 80]})
+    print(f"{len(df)} bars x {len(space)} candidates, {os.cpu_count()} cpu")
+    ref, base_t = None, None
+    for w in (int(x) for x in a.workers.split(",")):
+        t0 = time.perf_counter()
+        table = Optimizer(df, BASE, RISK, max_workers=w).run(space)
+        dt = time.perf_counter() - t0
+        base_t = base_t or dt
+        if ref is None:
+            ref = table
+        same = table["total_return_pct"].round(9).equals(ref["total_return_pct"].round(9))
+        print(f"workers={w:2d} {dt:7.2f}s  {len(space) / dt:7.1f} runs/s  speedup x{base_t / dt:.2f}  same={same}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--bars", type=int, default=50_000)
+    ap.add_argument("--workers", default="1,2,4,8")
+    main(ap.parse_args())
@@ -0,0 +1,42 @@
+# Скорость портфельных запросов: size() при N парах и M открытых позициях, trail() по всем позициям.
+#   python benchmarks/bench_portfolio.py [--pairs 50] [--open 20]
+import argparse, os, sys, time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from core.portfolio import Portfolio, PortfolioConfig
+
+
+def per_call_us(fn, n=20_000):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def main(a):
+    rng = np.random.default_rng(0)
+    pairs = [f"P{i}" for i in range(a.pairs)]
+    pf = Portfolio(PortfolioConfig(max_concurrent_positions=a.open + 1, max_total_exposure_pct=1e6,
+                                   trailing_atr_mult=3.0), pairs)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (500, a.pairs)), axis=0))
+    t0 = time.perf_counter()
+    for t in range(len(prices)):
+        for i, p in enumerate(pairs):
+            pf.on_close(p, t, prices[t, i])
+    upd = (time.perf_counter() - t0) / (len(prices) * a.pairs) * 1e6
+    for k in range(a.open):
+        pf.open(f"k{k}", pairs[k], 1.0, prices[-1, k], atr=1.0)
+
+    print(f"pairs={a.pairs} open={a.open}")
+    print(f"on_close (amortized, incl. cov update): {upd:.2f} us")
+    print(f"size():  {per_call_us(lambda: pf.size('new', pairs[-1], 100.0, 1.0, 10_000.0)):.2f} us")
+    print(f"trail(): {per_call_us(pf.trail):.2f} us")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pairs", type=int, default=50)
+    ap.add_argument("--open", type=int, default=20)
+    main(ap.parse_args())
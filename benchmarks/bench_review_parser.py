@@ -0,0 +1,56 @@
+# Разбор страницы отзывов: lxml с заранее скомпилированными XPath против прежнего BeautifulSoup(html.parser).
+#   python benchmarks/bench_review_parser.py [--n 200] [--page tests/fixtures/amazon_reviews_page.html]
+import argparse, hashlib, os, sys, time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.amazon.reviews.parser import parse_reviews_from_html
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def parse_bs4(html: str) -> list:
+    """Прежняя реализация (без print'ов) — как эталон скорости."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    reviews = []
+    for block in soup.select(".review"):
+        title = block.select_one(".review-title span")
+        text = block.select_one(".review-text span")
+        rating = block.select_one(".review-rating span")
+        date = block.select_one(".review-date")
+        body = text.text.strip() if text else ''
+        date_str = date.text.strip() if date else ''
+        reviews.append({
+            'id': hashlib.sha256(f"{body}_{date_str}".encode()).hexdigest(),
+            'title': title.text.strip() if title else '',
+            'text': body,
+            'rating': rating.text.strip() if rating else '',
+            'date': date_str,
+        })
+    return reviews
+
+
+def bench(fn, html, n):
+    fn(html)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        out = fn(html)
+    return (time.perf_counter() - t0) / n * 1e3, len(out)
+
+
+def main(a):
+    with open(a.page, encoding="utf-8") as f:
+        html = f.read()
+    print(f"page: {a.page} ({len(html) / 1024:.0f} KiB), {a.n} iterations")
+    base = None
+    for name, fn in (("bs4 html.parser (old)", parse_bs4), ("lxml + compiled XPath", parse_reviews_from_html)):
+        ms, count = bench(fn, html, a.n)
+        base = base or ms
+        print(f"{name:24s} {ms:8.2f} ms/page  {count:3d} blocks  x{base / ms:.1f}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200)
+    ap.add_argument("--page", default=os.path.join(ROOT, "tests", "fixtures", "amazon_reviews_page.html"))
+    main(ap.parse_args())
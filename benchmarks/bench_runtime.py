@@ -0,0 +1,75 @@
+# Нагрузочный прогон TradingRuntime: сотни инстансов, синтетические бары, мгновенные фейковые исполнения.
+#   python benchmarks/bench_runtime.py [--pairs 50] [--per-pair 6] [--bars 300]
+import argparse, asyncio, os, sys, time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from core.indicators import IndicatorEngine
+from core.interfaces import AsyncAbstractExchangeAdapter
+from core.risk import RiskConfig, RiskEngine
+from core.runtime import StrategyInstance, TradingRuntime
+from core.storage import InMemoryStore
+from core.strategy import TrendFollowingStrategy
+
+SPEC = {
+    "ema_fast": {"type": "EMA", "length": 5}, "ema_slow": {"type": "EMA", "length": 13},
+    "rsi": {"type": "RSI", "length": 14}, "atr": {"type": "ATR", "length": 14},
+}
+
+
+class InstantExchange(AsyncAbstractExchangeAdapter):
+    def __init__(self):
+        self.orders = 0
+
+    async def _fill(self, qty, coid):
+        self.orders += 1
+        return {"clientOrderId": coid, "orderId": self.orders, "status": "FILLED",
+                "executedQty": str(qty), "cummulativeQuoteQty": str(qty * 100)}
+
+    async def buy_market(self, pair, qty, client_order_id=None):
+        return await self._fill(qty, client_order_id)
+
+    async def sell_market(self, pair, qty, client_order_id=None):
+        return await self._fill(qty, client_order_id)
+
+
+async def main(a):
+    rt = TradingRuntime(InstantExchange())
+    pairs = [f"P{i}/USDT" for i in range(a.pairs)]
+    for pair in pairs:
+        for k in range(a.per_pair):
+            store = InMemoryStore()
+            params = {"entry_rsi": 60 + k, "exit_rsi": 70 + k, "stop_atr_mult": 2.0, "cooldown_bars": k}
+            rt.add(StrategyInstance(pair, "1m", TrendFollowingStrategy(params),
+                                    RiskEngine(RiskConfig(0.7, 2.0, 2.0), store.get_equity),
+                                    IndicatorEngine(SPEC), store, name=f"{pair}#{k}"))
+    rng = np.random.default_rng(0)
+    prices = {p: 100.0 for p in pairs}
+    t0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    async def events():
+        for i in range(a.bars):
+            ts = t0 + timedelta(minutes=i)
+            for p in pairs:
+                c = prices[p] = prices[p] * (1 + rng.normal(0, 0.002))
+                yield p, "1m", {"ts": ts, "open": c, "high": c * 1.001, "low": c * 0.999, "close": c, "volume": 1.0}
+
+    start = time.perf_counter()
+    await rt.run(events())
+    await rt.drain()
+    wall = time.perf_counter() - start
+    snap = rt.bar_latency.snapshot()
+    n_inst = len(rt.all_instances())
+    print(f"instances={n_inst} bar events={a.bars * a.pairs:,} orders={rt.exchange.orders:,} wall={wall:.2f}s")
+    print(f"per-event dispatch: p50={snap['p50_ms']:.3f}ms p99={snap['p99_ms']:.3f}ms max={snap['max_ms']:.3f}ms")
+    print(f"per bar-close across all pairs: {wall / a.bars * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pairs", type=int, default=50)
+    ap.add_argument("--per-pair", type=int, default=6)
+    ap.add_argument("--bars", type=int, default=300)
+    asyncio.run(main(ap.parse_args()))
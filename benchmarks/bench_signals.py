@@ -0,0 +1,56 @@
+# Микробенчмарк confirm(): rolling.apply(lambda) против серий через cumsum.
+#   python benchmarks/bench_signals.py [--n 1000000] [--bars 3] [--legacy-n 100000]
+# Старая версия на 1M баров идёт минуты, поэтому по умолчанию она меряется
+# на --legacy-n барах и линейно экстраполируется (--legacy-n 0 — на всех n).
+import argparse, os, sys, time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pandas as pd
+
+from core.signals import confirm, n_of_m, Confirm
+
+
+def legacy_confirm(series_bool: pd.Series, bars: int) -> pd.Series:
+    return series_bool.rolling(bars).apply(lambda x: x.all(), raw=False).astype(bool)
+
+
+def timed(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=1_000_000)
+    ap.add_argument("--bars", type=int, default=3)
+    ap.add_argument("--legacy-n", type=int, default=100_000)
+    a = ap.parse_args()
+
+    s = pd.Series(np.random.default_rng(0).random(a.n) < 0.7)
+    legacy_n = a.legacy_n or a.n
+    t_legacy = timed(legacy_confirm, s.iloc[:legacy_n], a.bars, repeat=1) * a.n / legacy_n
+    t_vec = timed(confirm, s, a.bars)
+    t_nofm = timed(n_of_m, s, 2, a.bars)
+
+    flags = s.tolist()
+    def stream():
+        c = Confirm(a.bars)
+        for x in flags:
+            c.update(x)
+    t_stream = timed(stream, repeat=1)
+
+    note = "" if legacy_n == a.n else f" (extrapolated from {legacy_n:,} bars)"
+    print(f"bars={a.n:,} confirm_bars={a.bars}")
+    print(f"  legacy rolling.apply : {t_legacy * 1e3:10.1f} ms{note}")
+    print(f"  vectorized confirm   : {t_vec * 1e3:10.1f} ms   x{t_legacy / t_vec:,.0f}")
+    print(f"  vectorized n_of_m    : {t_nofm * 1e3:10.1f} ms")
+    print(f"  streaming Confirm    : {t_stream / a.n * 1e9:10.1f} ns/bar")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# Пропускная способность бумажной биржи: сырые ордера (sync) и через OrderTracker + user stream (async).
+#   python benchmarks/bench_simulated_exchange.py [--orders 100000] [--latency-ms 2]
+import argparse, asyncio, os, sys, time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from decimal import Decimal
+
+from core.orders import LocalUserDataStream, OrderTracker
+from core.types import OrderRequest
+from integrations.exchanges.binance import SymbolFilters
+from integrations.exchanges.simulated import (AsyncSimulatedExchangeAdapter, LatencyModel,
+                                              SimulatedExchangeAdapter, SyntheticBook)
+
+PAIRS = [f"C{i}/USDT" for i in range(20)]
+FILTERS = {p.replace("/", ""): SymbolFilters(p.replace("/", ""), step_size=Decimal("0.001"),
+                                             tick_size=Decimal("0.01"), min_notional=Decimal("5"))
+           for p in PAIRS}
+
+
+def bench_sync(n):
+    ex = SimulatedExchangeAdapter(filters=FILTERS, check_balance=False, book=SyntheticBook())
+    for p in PAIRS:
+        ex.set_price(p, 100.0)
+    t0 = time.perf_counter()
+    for i in range(n):
+        p = PAIRS[i % len(PAIRS)]
+        (ex.buy_market if i & 1 else ex.sell_market)(p, 1.5)
+    return n / (time.perf_counter() - t0)
+
+
+async def bench_async(n, latency_ms, batch=500):
+    stream = LocalUserDataStream()
+    ex = AsyncSimulatedExchangeAdapter(filters=FILTERS, check_balance=False, user_stream=stream,
+                                       latency=LatencyModel(latency_ms, latency_ms / 2))
+    for p in PAIRS:
+        ex.set_price(p, 100.0)
+    tracker = OrderTracker()
+    consumer = asyncio.create_task(tracker.consume(stream.events()))
+    t0 = time.perf_counter()
+    for start in range(0, n, batch):
+        reqs = [OrderRequest(PAIRS[i % len(PAIRS)], "BUY", 1.5) for i in range(start, min(n, start + batch))]
+        futs = await tracker.submit(ex, reqs)
+        await asyncio.gather(*futs)
+        tracker.forget_done()
+    rate = n / (time.perf_counter() - t0)
+    consumer.cancel()
+    return rate
+
+
+def main(a):
+    print(f"sync adapter (book model):             {bench_sync(a.orders):>10,.0f} orders/s")
+    rate = asyncio.run(bench_async(a.orders, a.latency_ms))
+    print(f"async + OrderTracker, {a.latency_ms}ms latency:    {rate:>10,.0f} orders/s (batches of 500 in flight)")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--orders", type=int, default=100_000)
+    ap.add_argument("--latency-ms", type=float, default=2.0)
+    main(ap.parse_args())
@@ -0,0 +1,50 @@
+# Накладные расходы трассировки на один span: record() с perf_counter_ns, span() как контекст-менеджер,
+# выключенный трейсер. Цель — единицы микросекунд.
+#   python benchmarks/bench_tracing.py [--n 1000000]
+import argparse, os, sys, time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.tracing import Tracer
+
+now = time.perf_counter_ns
+
+
+def per_op_ns(fn, n):
+    t0 = time.perf_counter()
+    fn(n)
+    return (time.perf_counter() - t0) / n * 1e9
+
+
+def main(a):
+    on, off = Tracer(), Tracer(enabled=False)
+
+    def baseline(n):
+        for _ in range(n):
+            pass
+
+    def record(n, t=on):
+        for _ in range(n):
+            t0 = now()
+            t.record("strategy", "ETH/USDT", now() - t0)
+
+    def record_off(n):
+        record(n, off)
+
+    def span(n):
+        for _ in range(n):
+            with on.span("indicators", "ETH/USDT"):
+                pass
+
+    base = per_op_ns(baseline, a.n)
+    for name, fn in (("record (2x perf_counter_ns + histogram)", record),
+                     ("record, tracer disabled", record_off),
+                     ("span() context manager", span)):
+        print(f"{name:42s} {per_op_ns(fn, a.n) - base:8.0f} ns/span")
+    h = on.hist("strategy", "ETH/USDT").snapshot()
+    print(f"measured empty span: p50={h['p50_ms'] * 1e6:.0f} ns p99={h['p99_ms'] * 1e6:.0f} ns")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=1_000_000)
+    main(ap.parse_args())
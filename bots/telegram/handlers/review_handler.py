@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import time
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
@@ -11,6 +12,7 @@ logger = logging.getLogger(__name__)
 
 REVIEW_SENT_TTL = 7 * 24 * 3600
 REVIEW_PENDING_TTL = 2 * 24 * 3600
+PROMPT_BATCH = 25  # заказов в одном сообщении (по 2 кнопки; лимит Telegram — 100 кнопок)
 
 
 def _get_authorized_user_ids() -> list[int]:
@@ -19,43 +21,81 @@ def _get_authorized_user_ids() -> list[int]:
         return [int(u.telegram_id) for u in users if u.telegram_id]
 
 
-async def send_review_prompt(app: Application, order_id: str):
-    """Send review confirmation prompt to admins."""
-    if redis_client.exists(f"review_sent:{order_id}"):
-        logger.info(f"Redis check review_sent:{order_id} - exists")
-        return
-    if redis_client.exists(f"review_pending:{order_id}"):
-        logger.info(f"Redis check review_pending:{order_id} - exists")
-        return
-
-    keyboard = [
-        [
-            InlineKeyboardButton("✅ Yes", callback_data=f"review_approve_{order_id}"),
-            InlineKeyboardButton("❌ No", callback_data=f"review_skip_{order_id}"),
-        ]
+def _order_row(order_id: str, single: bool) -> list[InlineKeyboardButton]:
+    return [
+        InlineKeyboardButton("✅ Yes" if single else f"✅ {order_id}", callback_data=f"review_approve_{order_id}"),
+        InlineKeyboardButton("❌ No", callback_data=f"review_skip_{order_id}"),
     ]
-    markup = InlineKeyboardMarkup(keyboard)
-    message = f"Request Amazon review for order {order_id}?"
-    for uid in _get_authorized_user_ids():
-        try:
-            await app.bot.send_message(chat_id=uid, text=message, reply_markup=markup)
-        except Exception as e:
-            logger.warning(f"Failed to send review prompt to {uid}: {e}")
-    redis_client.setex(f"review_pending:{order_id}", REVIEW_PENDING_TTL, 1)
+
+
+def _not_prompted(order_ids: list[str]) -> list[str]:
+    """Отсеять заказы, по которым уже отправлен запрос или ждём ответа админа (один round-trip)."""
+    pipe = redis_client.pipeline()
+    for order_id in order_ids:
+        pipe.exists(f"review_sent:{order_id}", f"review_pending:{order_id}")
+    fresh = [o for o, n in zip(order_ids, pipe.execute()) if not n]
+    skipped = len(order_ids) - len(fresh)
+    if skipped:
+        logger.info(f"Skipped {skipped} orders with review_sent/review_pending set")
+    return fresh
+
+
+async def send_review_prompts(app: Application, order_ids: list[str]) -> list[str]:
+    """
+    Один вопрос админам на пачку заказов: строка кнопок на заказ.
+    Пользователи берутся из БД один раз на пачку. Возвращает заказы, по которым спросили.
+    """
+    order_ids = _not_prompted(list(dict.fromkeys(order_ids)))
+    if not order_ids:
+        return []
+    user_ids = await asyncio.to_thread(_get_authorized_user_ids)
+    for i in range(0, len(order_ids), PROMPT_BATCH):
+        chunk = order_ids[i:i + PROMPT_BATCH]
+        message = (f"Request Amazon review for order {chunk[0]}?" if len(chunk) == 1 else
+                   f"Request Amazon reviews for {len(chunk)} orders?\n" + "\n".join(chunk))
+        markup = InlineKeyboardMarkup([_order_row(o, len(chunk) == 1) for o in chunk])
+
+        async def send(uid: int):
+            try:
+                await app.bot.send_message(chat_id=uid, text=message, reply_markup=markup)
+            except Exception as e:
+                logger.warning(f"Failed to send review prompt to {uid}: {e}")
+        await asyncio.gather(*(send(uid) for uid in user_ids))
+
+    pipe = redis_client.pipeline()
+    for order_id in order_ids:
+        pipe.setex(f"review_pending:{order_id}", REVIEW_PENDING_TTL, 1)
+    pipe.execute()
     logger.info(
-        f"Set review_pending:{order_id} with TTL {REVIEW_PENDING_TTL} at {time.time()}"
+        f"Set review_pending for {len(order_ids)} orders with TTL {REVIEW_PENDING_TTL} at {time.time()}"
     )
+    return order_ids
+
+
+async def send_review_prompt(app: Application, order_id: str):
+    """Send review confirmation prompt to admins."""
+    await send_review_prompts(app, [order_id])
 
 
 async def send_review_request_to_amazon(order_id: str) -> bool:
     """Trigger the SP-API review request."""
     try:
-        return send_review_request(order_id)
+        return await asyncio.to_thread(send_review_request, order_id)
     except Exception as e:
         logger.error(f"Failed to send review request for {order_id}: {e}")
         return False
 
 
+async def _answer(query, order_id: str, text: str):
+    """В пачке убираем только строку этого заказа и дописываем итог; одиночный вопрос заменяем целиком."""
+    rows = query.message.reply_markup.inline_keyboard if query.message and query.message.reply_markup else []
+    left = [row for row in rows if not any(b.callback_data.endswith(f"_{order_id}") for b in row)]
+    if not left:
+        await query.edit_message_text(text)
+        return
+    await query.edit_message_text(f"{query.message.text}\n{text}", reply_markup=InlineKeyboardMarkup(left))
+
+
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
@@ -64,9 +104,9 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         order_id = query.data.split("review_approve_")[1]
         success = await send_review_request_to_amazon(order_id)
         if success:
-            await query.edit_message_text(f"✅ Review request sent for order {order_id}")
+            await _answer(query, order_id, f"✅ Review request sent for order {order_id}")
         else:
-            await query.edit_message_text(f"⚠️ Failed to send review for order {order_id}")
+            await _answer(query, order_id, f"⚠️ Failed to send review for order {order_id}")
         redis_client.setex(f"review_sent:{order_id}", REVIEW_SENT_TTL, 1)
         logger.info(
             f"Set review_sent:{order_id} with TTL {REVIEW_SENT_TTL} at {time.time()}"
@@ -75,7 +115,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         logger.info(f"Deleted review_pending:{order_id}")
     elif query.data.startswith("review_skip_"):
         order_id = query.data.split("review_skip_")[1]
-        await query.edit_message_text(f"⏭ Skipped review request for order {order_id}")
+        await _answer(query, order_id, f"⏭ Skipped review request for order {order_id}")
         redis_client.setex(f"review_sent:{order_id}", REVIEW_SENT_TTL, 1)
         logger.info(
             f"Set review_sent:{order_id} with TTL {REVIEW_SENT_TTL} at {time.time()}"
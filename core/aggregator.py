@@ -0,0 +1,212 @@
+# агрегация тиков/баров в бары любых таймфреймов за один проход: время, объём, диапазон
+from __future__ import annotations
+import re
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, List, Mapping, Optional, Tuple
+
+_UNIT_SEC = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+_TF_RE = re.compile(r"^(\d+)([smhdw])$")
+_WEEK_OFFSET_MS = 4 * 86400 * 1000   # 1970-01-01 — четверг; недели как у Binance — с понедельника
+
+
+def parse_timeframe(tf: str) -> Tuple[str, float]:
+    """
+    '90s' / '7m' / '4h' / '3d' / '1w' → ('time', секунды)
+    'volume:1000'                      → ('volume', 1000.0)  — бар на каждые 1000 единиц объёма
+    'range:2.5'                        → ('range', 2.5)      — бар, когда high - low ≥ 2.5
+    """
+    tf = tf.strip()
+    kind, _, arg = tf.partition(":")
+    if arg:
+        kind = kind.lower()
+        if kind not in ("volume", "range"):
+            raise ValueError(f"Unknown bar type: {tf!r}")
+        size = float(arg)
+        if size <= 0:
+            raise ValueError(f"Bar size must be positive: {tf!r}")
+        return kind, size
+    m = _TF_RE.match(tf)
+    if not m or int(m.group(1)) <= 0:
+        raise ValueError(f"Bad timeframe: {tf!r}")
+    return "time", float(int(m.group(1)) * _UNIT_SEC[m.group(2)])
+
+
+def timeframe_seconds(tf: str) -> int:
+    kind, size = parse_timeframe(tf)
+    if kind != "time":
+        raise ValueError(f"{tf!r} is not a time-based timeframe")
+    return int(size)
+
+
+def _bar(open_ms: int, o: float, h: float, l: float, c: float, v: float) -> Dict[str, Any]:
+    # тот же формат, что у BinanceMarketDataFeed.history()
+    return {"ts": datetime.fromtimestamp(open_ms / 1000, tz=timezone.utc),
+            "open": o, "high": h, "low": l, "close": c, "volume": v}
+
+
+class _Builder:
+    __slots__ = ("spec", "open_ms", "o", "h", "l", "c", "v", "n")
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        self.n = 0
+
+    def _start(self, ts_ms: int, o: float, h: float, l: float, c: float, v: float) -> None:
+        self.open_ms, self.o, self.h, self.l, self.c, self.v, self.n = ts_ms, o, h, l, c, v, 1
+
+    def _add(self, h: float, l: float, c: float, v: float) -> None:
+        if h > self.h:
+            self.h = h
+        if l < self.l:
+            self.l = l
+        self.c = c
+        self.v += v
+        self.n += 1
+
+    def _emit(self) -> Dict[str, Any]:
+        self.n = 0
+        return _bar(self.open_ms, self.o, self.h, self.l, self.c, self.v)
+
+
+class _TimeBuilder(_Builder):
+    __slots__ = ("step_ms", "offset_ms", "bucket_end")
+
+    def __init__(self, spec: str, seconds: float):
+        super().__init__(spec)
+        self.step_ms = int(seconds * 1000)
+        self.offset_ms = _WEEK_OFFSET_MS if self.step_ms % (7 * 86400 * 1000) == 0 else 0
+        self.bucket_end = 0
+
+    def update(self, ts_ms: int, o, h, l, c, v, end_ms: int, out: List) -> None:
+        if self.n and ts_ms >= self.bucket_end:
+            out.append((self.spec, self._emit()))
+        if not self.n:
+            start = (ts_ms - self.offset_ms) // self.step_ms * self.step_ms + self.offset_ms
+            self.bucket_end = start + self.step_ms
+            self._start(start, o, h, l, c, v)
+        else:
+            self._add(h, l, c, v)
+        # вход закрыл корзину (последний 1m-бар часа) — отдаём сразу, не ждём следующего входа
+        if end_ms >= self.bucket_end:
+            out.append((self.spec, self._emit()))
+
+    def flush(self, now_ms: int, out: List) -> None:
+        if self.n and now_ms >= self.bucket_end:
+            out.append((self.spec, self._emit()))
+
+
+class _VolumeBuilder(_Builder):
+    __slots__ = ("size",)
+
+    def __init__(self, spec: str, size: float):
+        super().__init__(spec)
+        self.size = size
+
+    def update(self, ts_ms: int, o, h, l, c, v, end_ms: int, out: List) -> None:
+        # вход не делим: бар закрывается на входе, который довёл объём до порога
+        if not self.n:
+            self._start(ts_ms, o, h, l, c, v)
+        else:
+            self._add(h, l, c, v)
+        if self.v >= self.size:
+            out.append((self.spec, self._emit()))
+
+    def flush(self, now_ms: int, out: List) -> None:
+        pass
+
+
+class _RangeBuilder(_Builder):
+    __slots__ = ("size",)
+
+    def __init__(self, spec: str, size: float):
+        super().__init__(spec)
+        self.size = size
+
+    def update(self, ts_ms: int, o, h, l, c, v, end_ms: int, out: List) -> None:
+        if not self.n:
+            self._start(ts_ms, o, h, l, c, v)
+        else:
+            self._add(h, l, c, v)
+        if self.h - self.l >= self.size:
+            out.append((self.spec, self._emit()))
+
+    def flush(self, now_ms: int, out: List) -> None:
+        pass
+
+
+_BUILDERS = {"time": _TimeBuilder, "volume": _VolumeBuilder, "range": _RangeBuilder}
+
+
+class BarAggregator:
+    """
+    Один входной поток одной пары (сделки или мелкие бары) → бары всех specs за один проход.
+
+        agg = BarAggregator(["5m", "15m", "1h", "volume:500"], input_tf="1m")
+        for spec, bar in agg.on_bar(bar_1m): ...
+
+    Временные бары выровнены по UTC (как у Binance) и отдаются закрытыми: для баров на входе —
+    сразу на последнем входном баре корзины (нужен input_tf), для сделок — на первой сделке
+    следующей корзины или по flush(now_ms) из таймера.
+    drop_partial: первая корзина, начавшаяся раньше первого входа (поток подключился посреди часа),
+    неполная — её не отдаём.
+    """
+
+    def __init__(self, specs: Iterable[str], input_tf: Optional[str] = None, drop_partial: bool = True):
+        self.specs = list(dict.fromkeys(specs))
+        self.drop_partial = drop_partial
+        self._first: Optional[datetime] = None
+        self._builders = []
+        for spec in self.specs:
+            kind, size = parse_timeframe(spec)
+            self._builders.append(_BUILDERS[kind](spec, size))
+        self._input_ms = timeframe_seconds(input_tf) * 1000 if input_tf else 0
+
+    def _complete(self, ts_ms: int, out: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, Dict[str, Any]]]:
+        if self._first is None:
+            self._first = datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc)
+        if not self.drop_partial or not out:
+            return out
+        return [(spec, bar) for spec, bar in out if bar["ts"] >= self._first]
+
+    def on_trade(self, ts_ms: int, price: float, qty: float) -> List[Tuple[str, Dict[str, Any]]]:
+        out: List[Tuple[str, Dict[str, Any]]] = []
+        for b in self._builders:
+            b.update(ts_ms, price, price, price, price, qty, ts_ms, out)
+        return self._complete(ts_ms, out)
+
+    def on_bar(self, bar: Mapping[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+        ts = bar["ts"]
+        ts_ms = int(ts.timestamp() * 1000) if isinstance(ts, datetime) else int(ts)
+        end_ms = ts_ms + self._input_ms if self._input_ms else ts_ms
+        o, h, l, c, v = (float(bar["open"]), float(bar["high"]), float(bar["low"]),
+                         float(bar["close"]), float(bar["volume"]))
+        out: List[Tuple[str, Dict[str, Any]]] = []
+        for b in self._builders:
+            b.update(ts_ms, o, h, l, c, v, end_ms, out)
+        return self._complete(ts_ms, out)
+
+    def flush(self, now_ms: int) -> List[Tuple[str, Dict[str, Any]]]:
+        """Закрыть временные бары, чья корзина уже кончилась (для потока сделок без новых тиков)."""
+        out: List[Tuple[str, Dict[str, Any]]] = []
+        for b in self._builders:
+            b.flush(now_ms, out)
+        return self._complete(now_ms, out) if self._first is not None else out
+
+
+async def resample(events: AsyncIterator[Tuple[str, str, Any]], targets: Mapping[str, Iterable[str]],
+                   input_tf: str = "1m", passthrough: bool = True) -> AsyncIterator[Tuple[str, str, Any]]:
+    """
+    Поток (pair, input_tf, bar) — например BinanceKlineStream по 1m — → (pair, tf, bar) для всех
+    targets[pair]. Одна подписка на пару вместо подписки на каждый таймфрейм.
+    """
+    targets = {pair: list(tfs) for pair, tfs in targets.items()}
+    aggs = {pair: BarAggregator([tf for tf in tfs if tf != input_tf], input_tf=input_tf)
+            for pair, tfs in targets.items()}
+    async for pair, tf, bar in events:
+        agg = aggs.get(pair)
+        if agg is None or tf != input_tf:
+            continue
+        if passthrough and input_tf in targets[pair]:
+            yield pair, tf, bar
+        for spec, out in agg.on_bar(bar):
+            yield pair, spec, out
@@ -0,0 +1,242 @@
+# бэктест: индикаторы и сигналы считаются один раз векторно, state-machine — плотным циклом
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .indicators import ema, rsi, atr, compute
+from .risk import RiskConfig, RiskEngine
+from .rules import StrategyRules, compile_config
+from .signals import crosses_above, crosses_below
+
+
+@dataclass
+class BacktestTrade:
+    entry_ts: Any
+    exit_ts: Any
+    entry: float
+    exit: float
+    qty: float
+    pnl: float
+    reason: str  # 'exit' | 'stop' | 'end'
+
+
+@dataclass
+class BacktestResult:
+    trades: List[BacktestTrade]
+    equity: np.ndarray           # mark-to-market equity на каждом баре
+    start_equity: float
+    meta: Dict[str, Any] = field(default_factory=dict)
+
+    def summary(self) -> Dict[str, float]:
+        eq = self.equity
+        if len(eq) == 0:
+            return dict(trades=0, total_return_pct=0.0, max_drawdown_pct=0.0, win_rate_pct=0.0, profit_factor=0.0)
+        peak = np.maximum.accumulate(eq)
+        dd = (eq - peak) / peak
+        gross_win = sum(t.pnl for t in self.trades if t.pnl > 0)
+        gross_loss = -sum(t.pnl for t in self.trades if t.pnl <= 0)
+        n_wins = sum(1 for t in self.trades if t.pnl > 0)
+        return dict(
+            trades=len(self.trades),
+            total_return_pct=float((eq[-1] / self.start_equity - 1) * 100),
+            max_drawdown_pct=float(dd.min() * 100),
+            win_rate_pct=float(n_wins / len(self.trades) * 100) if self.trades else 0.0,
+            profit_factor=float(gross_win / gross_loss) if gross_loss > 0 else (float("inf") if gross_win else 0.0),
+        )
+
+
+def params_from_config(cfg) -> Dict[str, Any]:
+    """Параметры стратегии из utils.config.Config: длины/пороги TrendFollowingStrategy — если такие индикаторы есть."""
+    ind = cfg.indicators
+    params: Dict[str, Any] = {
+        "cooldown_bars": int(cfg.entry_long.get("cooldown_bars", 0)),
+        "stop_atr_mult": float(cfg.risk["stop_atr_mult"]),
+    }
+    for key, name in (("ema_fast", "ema_fast"), ("ema_slow", "ema_slow"), ("rsi_len", "rsi"), ("atr_len", "atr")):
+        if name in ind:
+            params[key] = int(ind[name]["length"])
+    for rule in cfg.entry_long.get("all", []):
+        if rule.get("left") == "rsi" and rule.get("op") == "<":
+            params["entry_rsi"] = float(rule["right"])
+    for rule in cfg.exit_long.get("any", []):
+        if rule.get("left") == "rsi" and rule.get("op") == ">":
+            params["exit_rsi"] = float(rule["right"])
+    return params
+
+
+def rules_from_config(cfg) -> Optional[StrategyRules]:
+    """Правила entry_long/exit_long из config.yaml; None — в config их нет, работают зашитые правила."""
+    if not (cfg.entry_long or cfg.exit_long):
+        return None
+    return compile_config(cfg)
+
+
+def risk_config_from_config(cfg) -> RiskConfig:
+    r = cfg.risk
+    return RiskConfig(
+        per_trade_risk_pct=float(r["per_trade_risk_pct"]),
+        max_daily_loss_pct=float(r["max_daily_loss_pct"]),
+        stop_atr_mult=float(r["stop_atr_mult"]),
+    )
+
+
+def compute_features(df: pd.DataFrame, params: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Индикаторы для всей истории одним проходом (колонки 'ema_fast','ema_slow','rsi','atr')."""
+    close = df["close"]
+    return {
+        "ema_fast": ema(close, int(params["ema_fast"])).to_numpy(dtype=float),
+        "ema_slow": ema(close, int(params["ema_slow"])).to_numpy(dtype=float),
+        "rsi": rsi(close, int(params.get("rsi_len", 14))).to_numpy(dtype=float),
+        "atr": atr(df["high"], df["low"], close, int(params.get("atr_len", 14))).to_numpy(dtype=float),
+    }
+
+
+def default_signals(features: Dict[str, np.ndarray], params: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """Те же правила, что зашиты в TrendFollowingStrategy.on_bar, но сразу для всех баров."""
+    fast = pd.Series(features["ema_fast"])
+    slow = pd.Series(features["ema_slow"])
+    rsi_v = features["rsi"]
+    entry = crosses_above(fast, slow).to_numpy(dtype=bool) & (rsi_v < params["entry_rsi"])
+    exit_ = crosses_below(fast, slow).to_numpy(dtype=bool) | (rsi_v > params["exit_rsi"])
+    return entry, exit_
+
+
+def rule_signals(df: pd.DataFrame, rules: StrategyRules,
+                 indicators: Optional[Dict[str, Dict[str, Any]]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (entry, exit, atr) по StrategyRules для всех баров df.
+    indicators — те же имена с другими длинами (перебор в оптимизаторе); правила от длин не зависят.
+    """
+    cols = {name: df[name].to_numpy(dtype=float) for name in ("open", "high", "low", "close", "volume")}
+    cols.update({name: v.to_numpy(dtype=float) for name, v in compute(df, indicators or rules.indicators).items()})
+    entry, exit_ = rules.signals(cols)
+    atr_v = cols[rules.atr_name] if rules.atr_name else np.zeros(len(df))
+    return entry, exit_, atr_v
+
+
+def _day_index(ts) -> np.ndarray:
+    return pd.DatetimeIndex(ts).floor("D").asi8
+
+
+def simulate(
+    ts,
+    open_: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    atr_v: np.ndarray,
+    entry: np.ndarray,
+    exit_: np.ndarray,
+    params: Dict[str, Any],
+    risk_cfg: RiskConfig,
+    start_equity: float = 10_000.0,
+    fee_pct: float = 0.0,
+    day: Optional[np.ndarray] = None,
+) -> BacktestResult:
+    """
+    FLAT/LONG state-machine поверх готовых массивов сигналов.
+    Порядок на баре повторяет live: сначала ATR-стоп внутри бара (по low),
+    затем on_bar на закрытии: выход по правилам → кулдаун → вход (если не сработал дневной kill switch).
+    """
+    n = len(close)
+    if day is None:
+        day = _day_index(ts)
+    # python-списки: поэлементный доступ в цикле в разы быстрее, чем к numpy-скалярам
+    o, lo, c, a = open_.tolist(), low.tolist(), close.tolist(), atr_v.tolist()
+    en, ex, dy = entry.tolist(), exit_.tolist(), day.tolist()
+
+    cash = [float(start_equity)]
+    risk = RiskEngine(risk_cfg, equity_provider=lambda: cash[0])
+    stop_mult = float(params["stop_atr_mult"])
+    cooldown_bars = int(params.get("cooldown_bars", 0))
+    fee = fee_pct / 100.0
+
+    trades: List[BacktestTrade] = []
+    equity = [0.0] * n
+    long = False
+    qty = entry_px = entry_fee = stop = 0.0
+    entry_i = 0
+    cooldown = 0
+    cur_day = dy[0] if n else 0
+    day_start_equity = cash[0]
+
+    def close_pos(i: int, px: float, reason: str):
+        nonlocal long
+        exit_fee = px * qty * fee
+        cash[0] += (px - entry_px) * qty - exit_fee
+        pnl = (px - entry_px) * qty - entry_fee - exit_fee
+        trades.append(BacktestTrade(ts[entry_i], ts[i], entry_px, px, qty, pnl, reason))
+        long = False
+
+    for i in range(n):
+        if dy[i] != cur_day:
+            cur_day = dy[i]
+            day_start_equity = cash[0]
+
+        # защитный стоп срабатывает внутри бара
+        if long and lo[i] <= stop:
+            close_pos(i, min(o[i], stop), "stop")
+
+        if i > 0:
+            if long and ex[i]:
+                close_pos(i, c[i], "exit")
+            elif cooldown > 0:
+                cooldown -= 1
+            elif not long and en[i]:
+                cooldown = cooldown_bars
+                day_pnl_pct = (cash[0] / day_start_equity - 1) * 100
+                if not risk.daily_kill_switch(day_pnl_pct):
+                    q = risk.position_size(c[i], a[i])
+                    if q > 0:
+                        long, qty, entry_px, entry_i = True, q, c[i], i
+                        stop = c[i] - stop_mult * a[i]
+                        entry_fee = c[i] * q * fee
+                        cash[0] -= entry_fee
+
+        equity[i] = cash[0] + ((c[i] - entry_px) * qty if long else 0.0)
+
+    if long:
+        close_pos(n - 1, c[n - 1], "end")
+        equity[n - 1] = cash[0]
+
+    return BacktestResult(trades=trades, equity=np.asarray(equity), start_equity=float(start_equity))
+
+
+def backtest_config(df: pd.DataFrame, cfg, **kw) -> BacktestResult:
+    """run_backtest по utils.config.Config: правила из entry_long/exit_long, риск из risk."""
+    return run_backtest(df, params_from_config(cfg), risk_config_from_config(cfg), rules=rules_from_config(cfg), **kw)
+
+
+def run_backtest(
+    df: pd.DataFrame,
+    params: Dict[str, Any],
+    risk_cfg: RiskConfig,
+    start_equity: float = 10_000.0,
+    fee_pct: float = 0.0,
+    rules=None,
+) -> BacktestResult:
+    """
+    df: OHLCV с колонкой 'ts' (или DatetimeIndex), как из history().
+    rules: core.rules.StrategyRules — сигналы из entry_long/exit_long config.yaml
+    вместо зашитых правил TrendFollowingStrategy.
+    """
+    # DatetimeIndex без to_numpy(): tz-aware колонка иначе превращается в object-массив Timestamp
+    ts = pd.DatetimeIndex(df["ts"]) if "ts" in df.columns else pd.DatetimeIndex(df.index)
+    if rules is not None:
+        entry, exit_, atr_v = rule_signals(df, rules)
+        params = {**params, "cooldown_bars": rules.cooldown_bars}
+    else:
+        feats = compute_features(df, params)
+        entry, exit_ = default_signals(feats, params)
+        atr_v = feats["atr"]
+    return simulate(
+        ts,
+        df["open"].to_numpy(dtype=float),
+        df["low"].to_numpy(dtype=float),
+        df["close"].to_numpy(dtype=float),
+        atr_v,
+        entry, exit_, params, risk_cfg,
+        start_equity=start_equity, fee_pct=fee_pct,
+    )
@@ -0,0 +1,80 @@
+# локальный колоночный кэш баров: <root>/<SYMBOL>/<tf>/<column>.bin
+# Каждая колонка — сырой little-endian массив (ts — int64 ms open time, остальные — float64),
+# поэтому чтение = np.memmap без парсинга, а дозапись хвоста = append в конец файла.
+from __future__ import annotations
+import os
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = {"ts": "<i8", "open": "<f8", "high": "<f8", "low": "<f8", "close": "<f8", "volume": "<f8"}
+
+
+class BarStore:
+    def __init__(self, root: str = "data/bars"):
+        self.root = root
+
+    def _dir(self, pair: str, timeframe: str) -> str:
+        return os.path.join(self.root, pair.replace("/", "").upper(), timeframe)
+
+    def _path(self, pair: str, timeframe: str, col: str) -> str:
+        return os.path.join(self._dir(pair, timeframe), f"{col}.bin")
+
+    def count(self, pair: str, timeframe: str) -> int:
+        """Число целых баров (после сбоя посреди дозаписи колонки могут разойтись — берём минимум)."""
+        sizes = []
+        for col, dt in COLUMNS.items():
+            p = self._path(pair, timeframe, col)
+            if not os.path.exists(p):
+                return 0
+            sizes.append(os.path.getsize(p) // np.dtype(dt).itemsize)
+        return min(sizes)
+
+    def last_ts(self, pair: str, timeframe: str) -> Optional[int]:
+        n = self.count(pair, timeframe)
+        if not n:
+            return None
+        ts = np.memmap(self._path(pair, timeframe, "ts"), dtype=COLUMNS["ts"], mode="r", shape=(n,))
+        return int(ts[-1])
+
+    def load(self, pair: str, timeframe: str) -> Dict[str, np.ndarray]:
+        """Колонки как read-only memmap (zero-copy)."""
+        n = self.count(pair, timeframe)
+        if not n:
+            return {col: np.empty(0, dtype=dt) for col, dt in COLUMNS.items()}
+        return {
+            col: np.memmap(self._path(pair, timeframe, col), dtype=dt, mode="r", shape=(n,))
+            for col, dt in COLUMNS.items()
+        }
+
+    def load_frame(self, pair: str, timeframe: str) -> pd.DataFrame:
+        cols = self.load(pair, timeframe)
+        df = pd.DataFrame({c: cols[c] for c in COLUMNS if c != "ts"}, copy=False)
+        df.insert(0, "ts", pd.to_datetime(cols["ts"], unit="ms", utc=True))
+        return df
+
+    def append(self, pair: str, timeframe: str, cols: Dict[str, np.ndarray]) -> int:
+        """Дописывает бары новее последнего сохранённого; возвращает число добавленных."""
+        ts = np.asarray(cols["ts"], dtype=COLUMNS["ts"])
+        if not len(ts):
+            return 0
+        order = np.argsort(ts, kind="stable")
+        ts = ts[order]
+        keep = np.concatenate(([True], ts[1:] != ts[:-1]))
+        last = self.last_ts(pair, timeframe)
+        if last is not None:
+            keep &= ts > last
+        if not keep.any():
+            return 0
+        os.makedirs(self._dir(pair, timeframe), exist_ok=True)
+        n = self.count(pair, timeframe)
+        for col, dt in COLUMNS.items():
+            path = self._path(pair, timeframe, col)
+            data = np.asarray(cols[col], dtype=dt)[order][keep]
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                # обрезаем недописанный хвост прошлого сбоя, чтобы колонки оставались выровнены
+                f.truncate(n * np.dtype(dt).itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(data.tobytes())
+        return int(keep.sum())
@@ -0,0 +1,111 @@
+# кольцевой буфер баров: SoA на NumPy, фиксированная ёмкость, без аллокаций на append
+from __future__ import annotations
+from typing import Any, Dict, Iterable, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .indicators import _field
+
+OHLCV = ("open", "high", "low", "close", "volume")
+
+
+def _ts_ns(ts: Any) -> int:
+    if isinstance(ts, (int, np.integer)):
+        return int(ts)
+    return pd.Timestamp(ts).value   # datetime / pd.Timestamp / строка
+
+
+class BarRingBuffer:
+    """
+    OHLCV + колонки индикаторов последних `capacity` баров.
+
+    Данные — один float64 массив (n_cols, 2*capacity): каждое значение пишется дважды,
+    в i и в i+capacity («зеркало»). Поэтому последние n баров — всегда непрерывный
+    срез, и buf[col] / buf.tail(col, n) отдают view без копий и склейки.
+    Память на пару: (n_cols + 1) * 2 * capacity * 8 байт, не растёт.
+
+    Для стратегий buf ведёт себя как df: np.asarray(buf['close'])[-1] — последний бар.
+    """
+
+    def __init__(self, columns: Sequence[str] = OHLCV, capacity: int = 256):
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.columns = tuple(dict.fromkeys(columns))
+        self.capacity = capacity
+        self._index = {name: k for k, name in enumerate(self.columns)}
+        self._data = np.full((len(self.columns), 2 * capacity), np.nan)
+        self._ts = np.zeros(2 * capacity, dtype=np.int64)   # ns UTC
+        self._w = 0        # куда пишем следующий бар (0..capacity-1)
+        self.count = 0     # всего баров за жизнь буфера
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def _write(self, k: int, v: float) -> None:
+        self._data[k, self._w] = v
+        self._data[k, self._w + self.capacity] = v
+
+    def _advance(self, ts: Any) -> None:
+        if ts is not None:
+            t = _ts_ns(ts)
+            self._ts[self._w] = t
+            self._ts[self._w + self.capacity] = t
+        self._w = (self._w + 1) % self.capacity
+        self.count += 1
+
+    def append(self, values: Mapping[str, float], ts: Any = None) -> None:
+        """values: {колонка: значение}; отсутствующие колонки → NaN."""
+        for k, name in enumerate(self.columns):
+            self._write(k, values.get(name, np.nan))
+        self._advance(ts if ts is not None else values.get("ts"))
+
+    def append_bar(self, bar: Any, extra: Optional[Mapping[str, float]] = None) -> None:
+        """Bar/dict из фида + значения индикаторов (например IndicatorEngine.update(bar))."""
+        for k, name in enumerate(self.columns):
+            if extra is not None and name in extra:
+                self._write(k, extra[name])
+            else:
+                self._write(k, _field(bar, name))
+        self._advance(bar["ts"] if isinstance(bar, Mapping) else getattr(bar, "ts", None))
+
+    def extend(self, rows: Iterable[Mapping[str, float]]) -> None:
+        for row in rows:
+            self.append(row)
+
+    # --- чтение: view, без копий ---
+
+    def _span(self, n: Optional[int]) -> slice:
+        size = len(self)
+        n = size if n is None else min(n, size)
+        end = (self._w - 1) % self.capacity + self.capacity + 1
+        return slice(end - n, end)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self._data[self._index[name], self._span(None)]
+
+    def tail(self, name: str, n: int) -> np.ndarray:
+        return self._data[self._index[name], self._span(n)]
+
+    def last(self, name: str, back: int = 1) -> float:
+        """Значение `back` баров назад (1 — последний бар)."""
+        if back > len(self):
+            raise IndexError(f"only {len(self)} bars in buffer")
+        return float(self._data[self._index[name], (self._w - back) % self.capacity])
+
+    def ts(self, n: Optional[int] = None) -> np.ndarray:
+        return self._ts[self._span(n)]
+
+    def window(self, n: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Последние n баров: {колонка: view}."""
+        span = self._span(n)
+        return {name: self._data[k, span] for k, name in enumerate(self.columns)}
+
+    def frame(self, n: Optional[int] = None) -> pd.DataFrame:
+        """Для кода, которому нужен именно DataFrame (отчёты, отладка)."""
+        df = pd.DataFrame(self.window(n), copy=False)
+        df.insert(0, "ts", pd.to_datetime(self.ts(n), utc=True))
+        return df
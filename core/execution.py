@@ -1,12 +1,12 @@
-# адаптер биржи (ccxtpro)
+# адаптер биржи: тонкая обёртка над AbstractExchangeAdapter
 class ExecutionAdapter:
-    """Оборачивает работу с биржей: размещение/отмена/статус ордеров."""
+    """Оборачивает работу с биржей: размещение/отмена/статус ордеров.
+    client — любой AbstractExchangeAdapter (BinanceExchangeAdapter, SimulatedExchangeAdapter для бумажной торговли)."""
     def __init__(self, client):
         self.client = client
 
     def buy_market(self, symbol: str, qty: float):
-        # TODO: вызвать ccxtpro/REST
-        return {"orderId": "mock", "status": "filled"}
+        return self.client.buy_market(symbol, qty)
 
     def sell_market(self, symbol: str, qty: float):
-        return {"orderId": "mock", "status": "filled"}
+        return self.client.sell_market(symbol, qty)
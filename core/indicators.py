@@ -1,4 +1,7 @@
 # EMA, RSI, ATR
+import math
+from typing import Any, Dict, Iterable, Mapping
+
 import pandas as pd
 
 def ema(series: pd.Series, length: int) -> pd.Series:
@@ -20,3 +23,185 @@ def atr(high: pd.Series, low: pd.Series, close: pd.Series, length: int = 14) ->
         (low - prev_close).abs()
     ], axis=1).max(axis=1)
     return tr.rolling(length).mean()
+
+def compute(df: pd.DataFrame, spec: Dict[str, Dict[str, Any]]) -> Dict[str, pd.Series]:
+    """Все индикаторы из секции `indicators` config.yaml векторно: {name: Series}."""
+    out = {}
+    for name, ind in spec.items():
+        kind, length = str(ind["type"]).upper(), int(ind["length"])
+        if kind == "EMA":
+            out[name] = ema(df["close"], length)
+        elif kind == "RSI":
+            out[name] = rsi(df["close"], length)
+        elif kind == "ATR":
+            out[name] = atr(df["high"], df["low"], df["close"], length)
+        else:
+            raise ValueError(f"Unknown indicator type for '{name}': {ind['type']}")
+    return out
+
+
+# ---- потоковые (инкрементальные) версии: O(1) на закрытый бар ----
+# Считают ровно то же, что векторные функции выше (включая прогрев NaN),
+# поэтому live-луп и бэктест видят одинаковые значения.
+
+NAN = float("nan")
+
+
+def _field(bar: Any, name: str) -> float:
+    """Bar (core/types.py) или dict из AbstractMarketDataFeed."""
+    if isinstance(bar, Mapping):
+        return float(bar[name])
+    return float(getattr(bar, name))
+
+
+class _RollingMean:
+    """Скользящее среднее по окну `length` через кольцевой буфер и бегущую сумму."""
+    __slots__ = ("length", "_buf", "_pos", "_count", "_sum")
+
+    def __init__(self, length: int):
+        self.length = length
+        self._buf = [0.0] * length
+        self._pos = 0
+        self._count = 0
+        self._sum = 0.0
+
+    def update(self, x: float) -> float:
+        if self._count == self.length:
+            self._sum -= self._buf[self._pos]
+        else:
+            self._count += 1
+        self._buf[self._pos] = x
+        self._sum += x
+        self._pos = (self._pos + 1) % self.length
+        if self._pos == 0:
+            # раз в окно пересчитываем сумму, чтобы не копилась ошибка округления
+            self._sum = sum(self._buf)
+        if self._count < self.length:
+            return NAN
+        return self._sum / self.length
+
+
+class EMAState:
+    """ewm(span=length, adjust=False).mean() по одному значению за раз."""
+    __slots__ = ("length", "alpha", "value")
+
+    def __init__(self, length: int):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        self.value = NAN
+
+    @property
+    def warmup(self) -> int:
+        # вес стартового значения (1 - alpha)^n ≈ e^-8
+        return 4 * (self.length + 1)
+
+    def update(self, x: float) -> float:
+        if math.isnan(self.value):
+            self.value = x
+        else:
+            self.value = self.value + self.alpha * (x - self.value)
+        return self.value
+
+
+class RSIState:
+    """RSI на простом скользящем среднем приростов/падений — как rsi() выше."""
+    __slots__ = ("length", "_gain", "_loss", "_prev", "value")
+
+    def __init__(self, length: int = 14):
+        self.length = length
+        self._gain = _RollingMean(length)
+        self._loss = _RollingMean(length)
+        self._prev = NAN
+        self.value = NAN
+
+    @property
+    def warmup(self) -> int:
+        return self.length + 1
+
+    def update(self, x: float) -> float:
+        # первый бар: diff() = NaN, а where(...) превращает его в 0
+        delta = 0.0 if math.isnan(self._prev) else x - self._prev
+        self._prev = x
+        gain = self._gain.update(delta if delta > 0 else 0.0)
+        loss = self._loss.update(-delta if delta < 0 else 0.0)
+        if math.isnan(gain):
+            self.value = NAN
+        else:
+            rs = gain / (loss if loss != 0 else 1e-12)
+            self.value = 100 - (100 / (1 + rs))
+        return self.value
+
+
+class ATRState:
+    """ATR как скользящее среднее true range — как atr() выше."""
+    __slots__ = ("length", "_tr", "_prev_close", "value")
+
+    def __init__(self, length: int = 14):
+        self.length = length
+        self._tr = _RollingMean(length)
+        self._prev_close = NAN
+        self.value = NAN
+
+    @property
+    def warmup(self) -> int:
+        return self.length + 1
+
+    def update(self, high: float, low: float, close: float) -> float:
+        tr = high - low
+        if not math.isnan(self._prev_close):
+            tr = max(tr, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._prev_close = close
+        self.value = self._tr.update(tr)
+        return self.value
+
+
+_STATE_TYPES = {"EMA": EMAState, "RSI": RSIState, "ATR": ATRState}
+
+
+class IndicatorEngine:
+    """
+    Набор потоковых индикаторов из секции `indicators` config.yaml:
+        {"ema_fast": {"type": "EMA", "length": 20}, "atr": {"type": "ATR", "length": 14}, ...}
+    seed() прогревает состояние историей (AbstractMarketDataFeed.history()),
+    update() принимает один закрытый бар и возвращает {name: value}
+    (один и тот же dict, обновляется на месте — копируй, если нужно хранить).
+    """
+
+    def __init__(self, spec: Dict[str, Dict[str, Any]]):
+        self._close_states = []   # (name, state) — считаются по close
+        self._hlc_states = []     # (name, state) — нужны high/low/close
+        for name, ind in spec.items():
+            kind = str(ind["type"]).upper()
+            if kind not in _STATE_TYPES:
+                raise ValueError(f"Unknown indicator type for '{name}': {ind['type']}")
+            state = _STATE_TYPES[kind](int(ind["length"]))
+            if kind == "ATR":
+                self._hlc_states.append((name, state))
+            else:
+                self._close_states.append((name, state))
+        self.values: Dict[str, float] = {name: NAN for name in spec}
+
+    def update(self, bar: Any) -> Dict[str, float]:
+        close = _field(bar, "close")
+        values = self.values
+        for name, state in self._close_states:
+            values[name] = state.update(close)
+        if self._hlc_states:
+            high, low = _field(bar, "high"), _field(bar, "low")
+            for name, state in self._hlc_states:
+                values[name] = state.update(high, low, close)
+        return values
+
+    def seed(self, bars: Iterable[Any]) -> Dict[str, float]:
+        for bar in bars:
+            self.update(bar)
+        return self.values
+
+    @property
+    def warmup(self) -> int:
+        """Сколько баров истории нужно самому медленному индикатору, чтобы сойтись с batch-расчётом."""
+        return max((st.warmup for _, st in self._close_states + self._hlc_states), default=0)
+
+    @property
+    def ready(self) -> bool:
+        return not any(math.isnan(v) for v in self.values.values())
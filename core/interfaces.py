@@ -1,7 +1,11 @@
 # core/interfaces.py
-from typing import Dict, Any, Iterable
+import asyncio, time
+from typing import Dict, Any, Iterable, List, Union
 from datetime import datetime
 
+from .tracing import TRACER
+from .types import OrderRequest
+
 class AbstractExchangeAdapter:
     def buy_market(self, pair: str, qty: float, client_order_id: str | None = None) -> Dict[str, Any]:
         raise NotImplementedError
@@ -12,9 +16,40 @@ class AbstractExchangeAdapter:
     def cancel_order(self, pair: str, order_id: str) -> Dict[str, Any]:
         raise NotImplementedError
 
-    def get_order(self, pair: str, order_id: str) -> Dict[str, Any]:
+    def get_order(self, pair: str, order_id: str | None = None, client_order_id: str | None = None) -> Dict[str, Any]:
+        """Ордер по orderId биржи или по client order id (если orderId неизвестен)."""
+        raise NotImplementedError
+
+
+class AsyncAbstractExchangeAdapter:
+    """Асинхронный адаптер: ордера по разным парам не ждут друг друга."""
+
+    async def buy_market(self, pair: str, qty: float, client_order_id: str | None = None) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def sell_market(self, pair: str, qty: float, client_order_id: str | None = None) -> Dict[str, Any]:
         raise NotImplementedError
 
+    async def cancel_order(self, pair: str, order_id: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def get_order(self, pair: str, order_id: str | None = None, client_order_id: str | None = None) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def place_order(self, req: OrderRequest) -> Dict[str, Any]:
+        fn = self.buy_market if req.side == "BUY" else self.sell_market
+        t0 = time.perf_counter_ns()
+        resp = await fn(req.pair, req.qty, req.client_order_id)
+        TRACER.record("order_ack", req.pair, time.perf_counter_ns() - t0)   # запрос → ответ биржи
+        return resp
+
+    async def place_orders(self, reqs: List[OrderRequest]) -> List[Union[Dict[str, Any], Exception]]:
+        """Пачка ордеров параллельно; ошибка одного не роняет остальные (вместо ответа — исключение)."""
+        return await asyncio.gather(*(self.place_order(r) for r in reqs), return_exceptions=True)
+
+    async def cancel_orders(self, pair: str, order_ids: List[str]) -> List[Union[Dict[str, Any], Exception]]:
+        return await asyncio.gather(*(self.cancel_order(pair, oid) for oid in order_ids), return_exceptions=True)
+
 
 class AbstractMarketDataFeed:
     def history(self, limit: int = 500) -> list[Dict[str, Any]]:
@@ -0,0 +1,94 @@
+# гистограммы латентности (HDR-подобные: лог-бакеты, ~6% точности, O(1) на запись)
+import threading
+from typing import Dict, Iterable, Tuple
+
+_SUB_BITS = 4                 # 16 под-бакетов на каждую степень двойки
+_SUB = 1 << _SUB_BITS
+_MAX_EXP = 64
+
+
+def _bucket(ns: int) -> int:
+    if ns < _SUB:
+        return max(ns, 0)
+    e = ns.bit_length()
+    return ((e - _SUB_BITS) << _SUB_BITS) + ((ns >> (e - _SUB_BITS - 1)) & (_SUB - 1)) + _SUB
+
+
+def _bucket_upper(i: int) -> int:
+    """Верхняя граница бакета i (в ns) — её и отдаём как значение перцентиля."""
+    if i < _SUB:
+        return i
+    i -= _SUB
+    e, sub = (i >> _SUB_BITS) + _SUB_BITS, i & (_SUB - 1)
+    return ((_SUB | sub) + 1) << (e - _SUB_BITS - 1)
+
+
+class LatencyHistogram:
+    __slots__ = ("counts", "count", "total_ns", "max_ns")
+
+    def __init__(self):
+        self.counts = [0] * ((_MAX_EXP + 1) * _SUB)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, ns: int) -> None:
+        self.counts[_bucket(ns)] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentile(self, q: float) -> int:
+        """q в [0, 100]; ns (верхняя граница бакета)."""
+        if not self.count:
+            return 0
+        rank = max(1, int(round(q / 100.0 * self.count)))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return min(_bucket_upper(i), self.max_ns)
+        return self.max_ns
+
+    def buckets(self) -> Iterable[Tuple[int, int]]:
+        """(верхняя граница ns, накопленный счётчик) для непустых бакетов."""
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if c:
+                seen += c
+                yield _bucket_upper(i), seen
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ns / self.count / 1e6 if self.count else 0.0,
+            "p50_ms": self.percentile(50) / 1e6,
+            "p90_ms": self.percentile(90) / 1e6,
+            "p99_ms": self.percentile(99) / 1e6,
+            "max_ms": self.max_ns / 1e6,
+        }
+
+
+class LatencyRegistry:
+    """Гистограммы по имени (эндпоинт, стадия, ...). Создание под локом, запись — без."""
+
+    def __init__(self):
+        self._hists: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> LatencyHistogram:
+        h = self._hists.get(name)
+        if h is None:
+            with self._lock:
+                h = self._hists.setdefault(name, LatencyHistogram())
+        return h
+
+    def record(self, name: str, ns: int) -> None:
+        self.get(name).record(ns)
+
+    def items(self):
+        return list(self._hists.items())
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {name: h.snapshot() for name, h in self.items()}
@@ -0,0 +1,250 @@
+# перебор параметров стратегии (grid/random) и walk-forward поверх core.backtest
+from __future__ import annotations
+import itertools, os, random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .backtest import (compute_features, default_signals, params_from_config, risk_config_from_config,
+                       rule_signals, rules_from_config, simulate)
+from .risk import RiskConfig
+from .rules import StrategyRules
+
+# поля config.yaml, которые имеет смысл крутить
+TUNABLE = ("ema_fast", "ema_slow", "entry_rsi", "exit_rsi", "stop_atr_mult", "cooldown_bars")
+_COLUMNS = ("open", "high", "low", "close", "volume")
+_NS_PER_DAY = 86_400 * 10**9
+
+
+# ---- пространство параметров ----
+
+def grid(space: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """{'ema_fast': [10, 20], 'ema_slow': [50, 100]} → все комбинации."""
+    keys = list(space)
+    return [dict(zip(keys, combo)) for combo in itertools.product(*(space[k] for k in keys))]
+
+
+def random_sample(space: Dict[str, Any], n: int, seed: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Значение — список (выбор) или (lo, hi) (равномерно; int, если обе границы int)."""
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(n):
+        p = {}
+        for k, v in space.items():
+            if isinstance(v, tuple) and len(v) == 2:
+                lo, hi = v
+                p[k] = rnd.randint(lo, hi) if isinstance(lo, int) and isinstance(hi, int) else rnd.uniform(lo, hi)
+            else:
+                p[k] = rnd.choice(list(v))
+        out.append(p)
+    return out
+
+
+def walk_forward_windows(n: int, train: int, test: int, step: Optional[int] = None) -> List[Tuple[slice, slice]]:
+    """Скользящие окна (train, test) по индексам баров; шаг по умолчанию = test."""
+    step = step or test
+    out = []
+    start = 0
+    while start + train + test <= n:
+        out.append((slice(start, start + train), slice(start + train, start + train + test)))
+        start += step
+    return out
+
+
+# ---- бары в shared memory: воркеры подключаются к одному буферу, без pickle массивов ----
+
+@dataclass(frozen=True)
+class SharedBarsSpec:
+    name: str
+    n: int
+
+
+class SharedBars:
+    """OHLCV (float64, 5×n) + ts (int64 ns) в одном сегменте multiprocessing.shared_memory."""
+
+    def __init__(self, df: pd.DataFrame):
+        n = len(df)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, 6 * n * 8))
+        self.spec = SharedBarsSpec(self._shm.name, n)
+        ohlcv, ts = _views(self._shm, n)
+        for i, col in enumerate(_COLUMNS):
+            ohlcv[i] = df[col].to_numpy(dtype=float)
+        ts_idx = pd.DatetimeIndex(df["ts"]) if "ts" in df.columns else pd.DatetimeIndex(df.index)
+        ts[:] = ts_idx.asi8
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _views(shm: shared_memory.SharedMemory, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    ohlcv = np.ndarray((5, n), dtype=np.float64, buffer=shm.buf)
+    ts = np.ndarray((n,), dtype=np.int64, buffer=shm.buf, offset=5 * n * 8)
+    return ohlcv, ts
+
+
+# состояние процесса-воркера (заполняется в _init_worker)
+_W: Dict[str, Any] = {}
+
+
+def _init_worker(spec: SharedBarsSpec, base: Dict[str, Any], risk_cfg: RiskConfig, start_equity: float, fee_pct: float,
+                 rules: Optional[StrategyRules] = None):
+    shm = shared_memory.SharedMemory(name=spec.name)
+    ohlcv, ts = _views(shm, spec.n)
+    _W.update(shm=shm, ohlcv=ohlcv, ts=ts, base=base, risk=risk_cfg,
+              start_equity=start_equity, fee_pct=fee_pct, feat_cache={}, rules=rules)
+
+
+def _rule_lengths(rules: StrategyRules, params: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    # ключ кандидата с именем индикатора из config — его длина ({"ema_fast": 10})
+    return {name: {**ind, "length": int(params.get(name, ind["length"]))} for name, ind in rules.indicators.items()}
+
+
+def _rule_signals(lo: int, hi: int, params: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    rules = _W["rules"]
+    indicators = _rule_lengths(rules, params)
+    key = (lo, hi) + tuple(ind["length"] for ind in indicators.values())
+    cache = _W["feat_cache"]
+    out = cache.get(key)
+    if out is None:
+        ohlcv = _W["ohlcv"]
+        df = pd.DataFrame({col: ohlcv[i, lo:hi] for i, col in enumerate(_COLUMNS)}, copy=False)
+        out = rule_signals(df, rules, indicators)
+        if len(cache) > 64:
+            cache.clear()
+        cache[key] = out
+    return out
+
+
+def _features(lo: int, hi: int, params: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    # индикаторы зависят только от длин — соседние наборы параметров их переиспользуют
+    key = (lo, hi, params["ema_fast"], params["ema_slow"], params.get("rsi_len", 14), params.get("atr_len", 14))
+    cache = _W["feat_cache"]
+    feats = cache.get(key)
+    if feats is None:
+        ohlcv = _W["ohlcv"]
+        df = pd.DataFrame({col: ohlcv[i, lo:hi] for i, col in enumerate(_COLUMNS)}, copy=False)
+        feats = compute_features(df, params)
+        if len(cache) > 64:
+            cache.clear()
+        cache[key] = feats
+    return feats
+
+
+def _evaluate(task: Tuple[Dict[str, Any], int, int, int]) -> Dict[str, Any]:
+    overrides, start, end, warmup = task
+    params = {**_W["base"], **overrides}
+    lo = max(0, start - warmup)
+    if _W["rules"] is not None:
+        entry, exit_, atr_v = _rule_signals(lo, end, params)
+        params["cooldown_bars"] = _W["rules"].cooldown_bars
+    else:
+        feats = _features(lo, end, params)
+        entry, exit_ = default_signals(feats, params)
+        atr_v = feats["atr"]
+    off = start - lo
+    ohlcv, ts = _W["ohlcv"], _W["ts"][start:end]
+    res = simulate(
+        ts, ohlcv[0, start:end], ohlcv[2, start:end], ohlcv[3, start:end], atr_v[off:],
+        entry[off:], exit_[off:], params, _W["risk"],
+        start_equity=_W["start_equity"], fee_pct=_W["fee_pct"], day=ts // _NS_PER_DAY,
+    )
+    return {**overrides, **res.summary()}
+
+
+# ---- публичный API ----
+
+class Optimizer:
+    """
+    Перебор параметров по историческим барам на ProcessPoolExecutor.
+
+        opt = Optimizer(df, base_params=params_from_config(cfg), risk_cfg=risk_config_from_config(cfg))
+        table = opt.run(grid({"ema_fast": [10, 20], "ema_slow": [50, 100]}))
+
+    rules (Optimizer.from_config — из entry_long/exit_long): сигналы по правилам config,
+    ключ кандидата с именем индикатора задаёт его длину, остальные ключи — params (stop_atr_mult ...).
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        base_params: Dict[str, Any],
+        risk_cfg: RiskConfig,
+        start_equity: float = 10_000.0,
+        fee_pct: float = 0.0,
+        max_workers: Optional[int] = None,
+        warmup: int = 500,
+        rules: Optional[StrategyRules] = None,
+    ):
+        self.df = df
+        self.base = dict(base_params)
+        self.risk_cfg = risk_cfg
+        self.start_equity = start_equity
+        self.fee_pct = fee_pct
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.warmup = warmup
+        self.rules = rules
+
+    @classmethod
+    def from_config(cls, df: pd.DataFrame, path: str = "config.yaml", **kw) -> "Optimizer":
+        from utils.config import load_config
+        cfg = load_config(path)
+        kw.setdefault("rules", rules_from_config(cfg))
+        return cls(df, params_from_config(cfg), risk_config_from_config(cfg), **kw)
+
+    def _map(self, shared: SharedBars, tasks: List[Tuple]) -> List[Dict[str, Any]]:
+        if not tasks:
+            return []
+        init_args = (shared.spec, self.base, self.risk_cfg, self.start_equity, self.fee_pct, self.rules)
+        workers = min(self.max_workers, len(tasks))
+        # крупные чанки — меньше IPC; соседние задачи делят кэш индикаторов в воркере
+        chunk = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as ex:
+            return list(ex.map(_evaluate, tasks, chunksize=chunk))
+
+    def run(self, candidates: Iterable[Dict[str, Any]], metric: str = "total_return_pct") -> pd.DataFrame:
+        """Все кандидаты на всей истории; таблица метрик, лучшие сверху."""
+        n = len(self.df)
+        tasks = [(c, 0, n, 0) for c in candidates]
+        with SharedBars(self.df) as shared:
+            rows = self._map(shared, tasks)
+        return pd.DataFrame(rows).sort_values(metric, ascending=False, ignore_index=True)
+
+    def walk_forward(
+        self,
+        candidates: Iterable[Dict[str, Any]],
+        train: int,
+        test: int,
+        step: Optional[int] = None,
+        metric: str = "total_return_pct",
+    ) -> pd.DataFrame:
+        """На каждом окне выбираем лучший набор на train и проверяем его на следующем test-отрезке."""
+        candidates = list(candidates)
+        windows = walk_forward_windows(len(self.df), train, test, step)
+        out = []
+        with SharedBars(self.df) as shared:
+            train_tasks = [(c, tr.start, tr.stop, self.warmup) for tr, _ in windows for c in candidates]
+            train_rows = self._map(shared, train_tasks)
+            best = []
+            for w in range(len(windows)):
+                rows = train_rows[w * len(candidates):(w + 1) * len(candidates)]
+                best.append(max(range(len(rows)), key=lambda j: rows[j][metric]))
+            test_rows = self._map(shared, [
+                (candidates[best[w]], te.start, te.stop, self.warmup) for w, (_, te) in enumerate(windows)
+            ])
+            for w, (tr, te) in enumerate(windows):
+                row = {"window": w, "train_start": tr.start, "test_start": te.start, "test_end": te.stop}
+                row.update({f"train_{metric}": train_rows[w * len(candidates) + best[w]][metric]})
+                row.update(test_rows[w])
+                out.append(row)
+        return pd.DataFrame(out)
@@ -0,0 +1,195 @@
+# трекер ордеров в полёте: client_order_id → состояние + future исполнения
+from __future__ import annotations
+import asyncio, re, uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from .types import OrderRequest
+
+TERMINAL = {"FILLED", "CANCELED", "REJECTED", "EXPIRED", "EXPIRED_IN_MATCH"}
+UNKNOWN = "UNKNOWN"   # запрос упал по дороге (таймаут, обрыв, 5xx): ордер мог и дойти до биржи
+
+_HTTP_4XX = re.compile(r"\[4\d\d\]")
+_NOT_FOUND = ("-2013", "does not exist")   # ответ get_order: биржа такого ордера не знает
+
+
+def _rejected(exc: BaseException) -> bool:
+    """Ордер точно не принят: локальная проверка (ValueError) или 4xx от биржи."""
+    return isinstance(exc, ValueError) or bool(_HTTP_4XX.search(str(exc)))
+
+
+def new_client_order_id(prefix: str = "fa") -> str:
+    # Binance: ^[.A-Z:/a-z0-9_-]{1,36}$
+    return f"{prefix}-{uuid.uuid4().hex[:24]}"
+
+
+@dataclass
+class OrderState:
+    client_order_id: str
+    pair: str = ""
+    side: str = ""
+    qty: float = 0.0
+    status: str = "PENDING_NEW"
+    order_id: Optional[str] = None
+    filled_qty: float = 0.0
+    quote_qty: float = 0.0
+    error: Optional[str] = None
+    future: Optional[asyncio.Future] = field(default=None, repr=False)
+
+    @property
+    def avg_price(self) -> Optional[float]:
+        return self.quote_qty / self.filled_qty if self.filled_qty else None
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL
+
+
+class OrderTracker:
+    """
+    Живёт в одном event loop. Обновляется из ответов REST (on_order_response)
+    и из user data stream (on_execution_report, формат Binance executionReport).
+    Future ордера завершается его финальным OrderState (FILLED/CANCELED/REJECTED/...) —
+    статус проверяет вызывающий; исключение — только если биржа точно отклонила запрос.
+    Если запрос упал без ответа биржи, ордер в UNKNOWN (не финал): его закроет отчёт из стрима
+    или resolve() через get_order по client order id.
+    """
+
+    def __init__(self):
+        self._orders: Dict[str, OrderState] = {}
+
+    def track(self, req: OrderRequest) -> OrderState:
+        if not req.client_order_id:
+            req.client_order_id = new_client_order_id()
+        st = self._orders.get(req.client_order_id)
+        if st is None:
+            st = self._orders[req.client_order_id] = OrderState(req.client_order_id)
+        st.pair, st.side, st.qty = req.pair, req.side, req.qty
+        if st.future is None:
+            st.future = asyncio.get_running_loop().create_future()
+            if st.done:  # отчёт из стрима пришёл раньше, чем мы зарегистрировали ордер
+                st.future.set_result(st)
+        return st
+
+    def get(self, client_order_id: str) -> Optional[OrderState]:
+        return self._orders.get(client_order_id)
+
+    def open_orders(self) -> List[OrderState]:
+        return [s for s in self._orders.values() if not s.done]
+
+    def forget_done(self) -> int:
+        done = [k for k, s in self._orders.items() if s.done]
+        for k in done:
+            del self._orders[k]
+        return len(done)
+
+    def _apply(self, coid: str, status: str, order_id: Any, filled: Optional[float], quote: Optional[float]) -> OrderState:
+        st = self._orders.get(coid)
+        if st is None:
+            st = self._orders[coid] = OrderState(coid)
+        if st.done:
+            return st  # поздний/повторный отчёт не откатывает финальный статус
+        st.status = status or st.status
+        if order_id is not None:
+            st.order_id = str(order_id)
+        # накопленные значения: берём максимум, отчёты могут прийти не по порядку
+        if filled is not None:
+            st.filled_qty = max(st.filled_qty, filled)
+        if quote is not None:
+            st.quote_qty = max(st.quote_qty, quote)
+        if st.done and st.future is not None and not st.future.done():
+            st.future.set_result(st)
+        return st
+
+    def on_order_response(self, resp: Dict[str, Any]) -> OrderState:
+        """Ответ POST /v3/order (ACK/RESULT/FULL)."""
+        return self._apply(
+            resp["clientOrderId"], resp.get("status", "NEW"), resp.get("orderId"),
+            float(resp["executedQty"]) if "executedQty" in resp else None,
+            float(resp["cummulativeQuoteQty"]) if "cummulativeQuoteQty" in resp else None,
+        )
+
+    def on_execution_report(self, ev: Dict[str, Any]) -> Optional[OrderState]:
+        if ev.get("e") != "executionReport":
+            return None
+        # для отмен Binance кладёт исходный id в C, а в c — id запроса на отмену
+        coid = (ev.get("C") or ev["c"]) if ev.get("X") == "CANCELED" else ev["c"]
+        return self._apply(coid, ev.get("X"), ev.get("i"), float(ev.get("z", 0)), float(ev.get("Z", 0)))
+
+    def _reject(self, st: OrderState, exc: BaseException) -> None:
+        st.status, st.error = "REJECTED", str(exc)
+        if st.future is not None and not st.future.done():
+            st.future.set_exception(exc)
+
+    def on_error(self, coid: str, exc: BaseException) -> None:
+        st = self._orders.get(coid)
+        if st is None or st.done:
+            return
+        if _rejected(exc):
+            self._reject(st, exc)
+        else:
+            st.status, st.error = UNKNOWN, str(exc) or type(exc).__name__
+
+    async def resolve(self, adapter, states: Optional[List[OrderState]] = None) -> List[OrderState]:
+        """
+        Сверка незавершённых ордеров (по умолчанию всех открытых, в т.ч. UNKNOWN) с биржей:
+        adapter.get_order по client order id. Нашёлся — берём его статус, биржа его не знает — REJECTED;
+        ошибка запроса — статус не меняется до следующей сверки.
+        """
+        states = [s for s in (self.open_orders() if states is None else states) if not s.done]
+        results = await asyncio.gather(
+            *(adapter.get_order(s.pair, client_order_id=s.client_order_id) for s in states), return_exceptions=True,
+        )
+        for st, res in zip(states, results):
+            if not isinstance(res, BaseException):
+                self.on_order_response(res)
+            elif any(m in str(res) for m in _NOT_FOUND):
+                self._reject(st, RuntimeError(st.error or str(res)))
+        return states
+
+    async def consume(self, events: AsyncIterator[Dict[str, Any]]) -> None:
+        """Крутить как задачу: asyncio.create_task(tracker.consume(user_stream.events()))."""
+        async for ev in events:
+            self.on_execution_report(ev)
+
+    async def submit(self, adapter, reqs: List[OrderRequest]) -> List[asyncio.Future]:
+        """Регистрирует и отправляет пачку ордеров через AsyncAbstractExchangeAdapter.place_orders."""
+        states = [self.track(r) for r in reqs]
+        results = await adapter.place_orders(reqs)
+        for st, res in zip(states, results):
+            if isinstance(res, BaseException):
+                self.on_error(st.client_order_id, res)
+            elif isinstance(res, dict) and "clientOrderId" in res:
+                self.on_order_response(res)
+        return [st.future for st in states]
+
+    async def wait(self, client_order_id: str, timeout: Optional[float] = None) -> OrderState:
+        st = self._orders[client_order_id]
+        return await asyncio.wait_for(asyncio.shield(st.future), timeout)
+
+
+class LocalUserDataStream:
+    """
+    In-process user data stream: тот же поток executionReport, что у биржи,
+    только события публикует сам процесс (тесты, симулятор биржи).
+    """
+
+    def __init__(self):
+        self._queues: List[asyncio.Queue] = []
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        for q in self._queues:
+            q.put_nowait(event)
+
+    def events(self) -> AsyncIterator[Dict[str, Any]]:
+        # подписка сразу при вызове, а не на первой итерации — события не теряются
+        q: asyncio.Queue = asyncio.Queue()
+        self._queues.append(q)
+        return self._iter(q)
+
+    async def _iter(self, q: asyncio.Queue) -> AsyncIterator[Dict[str, Any]]:
+        try:
+            while True:
+                yield await q.get()
+        finally:
+            self._queues.remove(q)
@@ -0,0 +1,246 @@
+# портфельный риск: ковариация доходностей всех пар, лимиты на число позиций/экспозицию,
+# chandelier-стопы сразу по всем открытым позициям
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Mapping, Optional, Sequence
+
+import numpy as np
+
+
+@dataclass
+class PortfolioConfig:
+    max_concurrent_positions: int = 1
+    max_total_exposure_pct: float = 100.0     # сумма notional открытых позиций, % от equity
+    trailing_atr_mult: Optional[float] = None # chandelier: max(high с момента входа) - mult * ATR
+    cov_lambda: float = 0.97                  # EW-затухание ковариации (на бар)
+    min_cov_bars: int = 20                    # до этого корреляции не учитываем
+
+    @classmethod
+    def from_risk(cls, risk: Mapping[str, Any]) -> "PortfolioConfig":
+        """Секция risk из config.yaml."""
+        trailing = risk.get("trailing") or {}
+        mult = None
+        if str(trailing.get("type", "")).lower() == "chandelier":
+            mult = float(trailing.get("atr_mult", 3.0))
+        return cls(
+            max_concurrent_positions=int(risk.get("max_concurrent_positions", 1)),
+            max_total_exposure_pct=float(risk.get("max_total_exposure_pct", 100.0)),
+            trailing_atr_mult=mult,
+            cov_lambda=float(risk.get("cov_lambda", 0.97)),
+            min_cov_bars=int(risk.get("min_cov_bars", 20)),
+        )
+
+
+class EWCovariance:
+    """
+    Экспоненциально взвешенная ковариация лог-доходностей по всем парам.
+    Бары пар приходят по одному; когда приходит бар с новым ts, накопленный вектор
+    доходностей предыдущего ts применяется одним rank-1 апдейтом (O(n²) numpy, без истории).
+    Пара без бара на этом ts в апдейт не входит: её строка/столбец не затухают и не тянутся к нулю;
+    nobs — сколько общих наблюдений у каждой пары пар.
+    """
+
+    def __init__(self, lam: float = 0.97, capacity: int = 8):
+        self.lam = lam
+        self.n = 0                      # сколько векторов доходностей применено
+        self.size = 0                   # число пар
+        self.mean = np.zeros(capacity)
+        self.cov = np.zeros((capacity, capacity))
+        self.nobs = np.zeros((capacity, capacity), dtype=np.int64)
+        self.last = np.full(capacity, np.nan)     # последний close по паре
+        self._pending = np.full(capacity, np.nan)
+        self._ts: Any = None
+
+    def _grow(self) -> None:
+        cap = 2 * len(self.mean)
+        mean, cov, nobs = np.zeros(cap), np.zeros((cap, cap)), np.zeros((cap, cap), dtype=np.int64)
+        mean[: self.size], cov[: self.size, : self.size] = self.mean[: self.size], self.cov[: self.size, : self.size]
+        nobs[: self.size, : self.size] = self.nobs[: self.size, : self.size]
+        last, pending = np.full(cap, np.nan), np.full(cap, np.nan)
+        last[: self.size], pending[: self.size] = self.last[: self.size], self._pending[: self.size]
+        self.mean, self.cov, self.nobs, self.last, self._pending = mean, cov, nobs, last, pending
+
+    def add(self) -> int:
+        if self.size == len(self.mean):
+            self._grow()
+        self.size += 1
+        return self.size - 1
+
+    def update(self, i: int, ts: Any, close: float) -> None:
+        if self._ts is not None and ts != self._ts:
+            self.commit()
+        self._ts = ts
+        prev = self.last[i]
+        if prev > 0 and close > 0:
+            self._pending[i] = np.log(close / prev)
+        self.last[i] = close
+
+    def commit(self) -> None:
+        k = self.size
+        r = self._pending[:k]
+        seen = ~np.isnan(r)
+        if not seen.any():
+            return
+        a = 1.0 - self.lam
+        d = np.where(seen, r - self.mean[:k], 0.0)
+        self.mean[:k] += a * d
+        both = np.outer(seen, seen)
+        cov = self.cov[:k, :k]
+        cov[both] = (self.lam * (cov + a * np.outer(d, d)))[both]
+        self.nobs[:k, :k] += both
+        r.fill(np.nan)
+        self.n += 1
+
+    def corr(self, i: int, js: np.ndarray) -> np.ndarray:
+        sd = np.sqrt(self.cov[i, i] * self.cov[js, js])
+        return self.cov[i, js] / np.where(sd > 0, sd, np.inf)   # нулевая дисперсия → 0
+
+
+class Portfolio:
+    """
+    Общий для всех инстансов TradingRuntime. Позиции — по ключу (имя инстанса), несколько
+    стратегий на одной паре — разные ключи. Состояние позиций — массивы по слотам, поэтому
+    экспозиция и trailing-стопы считаются векторно по всем открытым позициям.
+
+    size(): qty от per-trade риска (RiskEngine.position_size) → делим на 1 + Σ положительных
+    корреляций с уже открытыми позициями (та же пара = корреляция 1) → режем по лимитам.
+    Лимит экспозиции — от equity портфеля (equity_provider), а не одного инстанса.
+    """
+
+    def __init__(self, cfg: PortfolioConfig, pairs: Sequence[str] = (), capacity: int = 16,
+                 equity_provider: Optional[Callable[[], float]] = None):
+        self.cfg = cfg
+        self.equity_provider = equity_provider   # equity всего портфеля; TradingRuntime ставит сумму по инстансам
+        self.cov = EWCovariance(cfg.cov_lambda)
+        self._tf: Optional[str] = None
+        self._pairs: Dict[str, int] = {}
+        for p in pairs:
+            self.pair_index(p)
+        self._keys: Dict[str, int] = {}
+        self._pidx = np.zeros(capacity, dtype=np.int64)
+        self._open = np.zeros(capacity, dtype=bool)
+        self._qty = np.zeros(capacity)
+        self._stop = np.full(capacity, np.nan)
+        self._high = np.full(capacity, np.nan)
+        self._atr = np.full(capacity, np.nan)
+
+    # --- пары и слоты ---
+
+    def pair_index(self, pair: str) -> int:
+        i = self._pairs.get(pair)
+        if i is None:
+            i = self._pairs[pair] = self.cov.add()
+        return i
+
+    def _slot(self, key: str) -> int:
+        s = self._keys.get(key)
+        if s is None:
+            s = len(self._keys)
+            if s == len(self._open):
+                self._grow()
+            self._keys[key] = s
+        return s
+
+    def _grow(self) -> None:
+        n = len(self._open)
+        self._pidx = np.concatenate([self._pidx, np.zeros(n, dtype=np.int64)])
+        self._open = np.concatenate([self._open, np.zeros(n, dtype=bool)])
+        self._qty = np.concatenate([self._qty, np.zeros(n)])
+        for name in ("_stop", "_high", "_atr"):
+            setattr(self, name, np.concatenate([getattr(self, name), np.full(n, np.nan)]))
+
+    # --- рынок ---
+
+    def on_close(self, pair: str, ts: Any, close: float, timeframe: Optional[str] = None) -> None:
+        """Раз на бар пары (не на инстанс): ковариация и цена для экспозиции.
+        Ковариацию считаем по одному таймфрейму — первому, который пришёл."""
+        if timeframe is not None:
+            if self._tf is None:
+                self._tf = timeframe
+            elif timeframe != self._tf:
+                return
+        self.cov.update(self.pair_index(pair), ts, close)
+
+    def mark(self, key: str, high: float, atr: float) -> None:
+        """Бар инстанса: максимум с момента входа и текущий ATR для chandelier."""
+        s = self._keys.get(key)
+        if s is not None and self._open[s]:
+            self._high[s] = max(self._high[s], high)
+            self._atr[s] = atr
+
+    def trail(self) -> np.ndarray:
+        """Chandelier-стопы всех открытых позиций одним проходом; стоп только подтягивается вверх."""
+        m = self.cfg.trailing_atr_mult
+        if m is not None:
+            o = self._open
+            self._stop[o] = np.fmax(self._stop[o], self._high[o] - m * self._atr[o])
+        return self._stop
+
+    def stop(self, key: str) -> Optional[float]:
+        s = self._keys.get(key)
+        if s is None or not self._open[s] or np.isnan(self._stop[s]):
+            return None
+        return float(self._stop[s])
+
+    # --- позиции ---
+
+    def open(self, key: str, pair: str, qty: float, price: float, stop: Optional[float] = None,
+             atr: Optional[float] = None) -> None:
+        s = self._slot(key)
+        i = self._pidx[s] = self.pair_index(pair)
+        if np.isnan(self.cov.last[i]):
+            self.cov.last[i] = price   # цена для экспозиции, пока не пришёл бар пары
+        self._open[s] = True
+        self._qty[s] = qty
+        self._stop[s] = np.nan if stop is None else stop
+        self._high[s] = price
+        self._atr[s] = np.nan if atr is None else atr
+
+    def reduce(self, key: str, qty: float) -> None:
+        s = self._keys.get(key)
+        if s is None:
+            return
+        self._qty[s] = max(self._qty[s] - qty, 0.0)
+        if self._qty[s] <= 1e-12:
+            self.close(key)
+
+    def close(self, key: str) -> None:
+        s = self._keys.get(key)
+        if s is not None:
+            self._open[s] = False
+            self._qty[s] = 0.0
+            self._stop[s] = np.nan
+
+    @property
+    def open_count(self) -> int:
+        return int(np.count_nonzero(self._open))
+
+    def exposure(self) -> float:
+        o = self._open
+        return float(np.dot(self._qty[o], self.cov.last[self._pidx[o]]))
+
+    def equity(self) -> float:
+        return float(self.equity_provider()) if self.equity_provider is not None else 0.0
+
+    def size(self, key: str, pair: str, price: float, qty: float, equity: Optional[float] = None) -> float:
+        """Портфельная поправка к qty, посчитанному по риску одной сделки. equity по умолчанию — портфеля."""
+        if qty <= 0 or price <= 0:
+            return 0.0
+        if equity is None:
+            equity = self.equity()
+        o = self._open
+        n_open = int(np.count_nonzero(o))
+        if n_open >= self.cfg.max_concurrent_positions:
+            return 0.0
+        if n_open:
+            held = self._pidx[o]
+            i = self.pair_index(pair)
+            rho = self.cov.corr(i, held)
+            # корреляцию берём только по парам с достаточной общей историей (та же пара — всегда 1)
+            rho = np.where(held == i, 1.0, np.where(self.cov.nobs[i, held] >= self.cfg.min_cov_bars, rho, 0.0))
+            qty /= 1.0 + float(rho[rho > 0].sum())
+            exposure = float(np.dot(self._qty[o], self.cov.last[held]))
+        else:
+            exposure = 0.0
+        room = equity * self.cfg.max_total_exposure_pct / 100.0 - exposure
+        return max(min(qty, room / price), 0.0)
@@ -0,0 +1,158 @@
+# компиляция правил entry_long / exit_long из config.yaml
+# Имена индикаторов и операторы разбираются один раз при загрузке:
+# векторная форма (numpy) — для бэктеста, скалярные замыкания — для live-баров.
+from __future__ import annotations
+import operator
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .signals import Confirm, confirm, crosses_above, crosses_below
+
+BAR_FIELDS = ("open", "high", "low", "close", "volume")
+
+_COMPARE = {"<": operator.lt, ">": operator.gt, "<=": operator.le, ">=": operator.ge}
+_CROSS = ("crosses_above", "crosses_below")
+
+# (cur, prev) → bool; cur/prev — значения слотов в порядке StrategyRules.slots
+ScalarCond = Callable[[Sequence[float], Sequence[float]], bool]
+
+
+def _operand_names(block: Mapping[str, Any]) -> List[str]:
+    names = []
+    for cond in block.get("all", []) + block.get("any", []):
+        for side in ("left", "right"):
+            v = cond.get(side)
+            if isinstance(v, str):
+                names.append(v)
+    return names
+
+
+def validate_rules(indicators: Mapping[str, Any], *blocks: Mapping[str, Any]) -> None:
+    """ValueError, если правило ссылается на неизвестный индикатор или оператор."""
+    known = set(indicators) | set(BAR_FIELDS)
+    for block in blocks:
+        if not block:
+            continue
+        if "all" in block and "any" in block:
+            raise ValueError("Rule block must use either 'all' or 'any', not both")
+        for cond in block.get("all", []) + block.get("any", []):
+            op = cond.get("op")
+            if op not in _COMPARE and op not in _CROSS:
+                raise ValueError(f"Unknown rule op: {op!r}")
+            if not isinstance(cond.get("left"), str):
+                raise ValueError(f"Rule left operand must be an indicator name: {cond}")
+            if op in _CROSS and not isinstance(cond.get("right"), str):
+                raise ValueError(f"'{op}' needs an indicator on both sides: {cond}")
+        for name in _operand_names(block):
+            if name not in known:
+                raise ValueError(f"Rule references unknown indicator '{name}' (not in 'indicators')")
+
+
+class CompiledBlock:
+    """Один блок правил (all/any + confirm_bars), уже привязанный к слотам."""
+
+    def __init__(self, block: Mapping[str, Any], slot_of: Mapping[str, int]):
+        self.mode = "any" if "any" in block else "all"
+        self.conds = list(block.get(self.mode, []))
+        self.confirm_bars = int(block.get("confirm_bars", 1) or 1)
+        self._scalar = [self._compile_scalar(c, slot_of) for c in self.conds]
+
+    # ---- numpy ----
+    def vector(self, cols: Mapping[str, Any]) -> np.ndarray:
+        """cols: {name: array|Series} одинаковой длины → bool-массив сигнала на каждом баре."""
+        if not self.conds:
+            n = len(next(iter(cols.values())))
+            return np.zeros(n, dtype=bool)
+        parts = [self._vector_cond(c, cols) for c in self.conds]
+        out = np.logical_and.reduce(parts) if self.mode == "all" else np.logical_or.reduce(parts)
+        if self.confirm_bars > 1:
+            out = confirm(pd.Series(out), self.confirm_bars).to_numpy(dtype=bool)
+        return out
+
+    @staticmethod
+    def _vector_cond(cond: Mapping[str, Any], cols: Mapping[str, Any]) -> np.ndarray:
+        op, left = cond["op"], pd.Series(np.asarray(cols[cond["left"]], dtype=float))
+        right = cond["right"]
+        if op in _CROSS:
+            right = pd.Series(np.asarray(cols[right], dtype=float))
+            fn = crosses_above if op == "crosses_above" else crosses_below
+            return fn(left, right).to_numpy(dtype=bool)
+        rhs = np.asarray(cols[right], dtype=float) if isinstance(right, str) else float(right)
+        return _COMPARE[op](left.to_numpy(), rhs)
+
+    # ---- live ----
+    @staticmethod
+    def _compile_scalar(cond: Mapping[str, Any], slot_of: Mapping[str, int]) -> ScalarCond:
+        op, l = cond["op"], slot_of[cond["left"]]
+        right = cond["right"]
+        if op == "crosses_above":
+            r = slot_of[right]
+            return lambda cur, prev: prev[l] <= prev[r] and cur[l] > cur[r]
+        if op == "crosses_below":
+            r = slot_of[right]
+            return lambda cur, prev: prev[l] >= prev[r] and cur[l] < cur[r]
+        cmp = _COMPARE[op]
+        if isinstance(right, str):
+            r = slot_of[right]
+            return lambda cur, prev: cmp(cur[l], cur[r])
+        c = float(right)
+        return lambda cur, prev: cmp(cur[l], c)
+
+    def evaluator(self) -> ScalarCond:
+        """Новое скалярное замыкание. При confirm_bars > 1 оно хранит серию — вызывать на каждом баре."""
+        conds = tuple(self._scalar)
+        if not conds:
+            base: ScalarCond = lambda cur, prev: False
+        elif self.mode == "all":
+            base = lambda cur, prev: all(f(cur, prev) for f in conds)
+        else:
+            base = lambda cur, prev: any(f(cur, prev) for f in conds)
+        if self.confirm_bars <= 1:
+            return base
+        gate = Confirm(self.confirm_bars)
+        return lambda cur, prev: gate.update(base(cur, prev))
+
+
+@dataclass
+class StrategyRules:
+    indicators: Dict[str, Dict[str, Any]]
+    slots: Tuple[str, ...]        # порядок значений для скалярных evaluator'ов
+    entry: CompiledBlock
+    exit: CompiledBlock
+    cooldown_bars: int = 0
+
+    def signals(self, cols: Mapping[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        return self.entry.vector(cols), self.exit.vector(cols)
+
+    def row(self, values: Mapping[str, float]) -> Tuple[float, ...]:
+        """{name: value} → кортеж в порядке slots (один раз на бар)."""
+        return tuple(float(values[name]) for name in self.slots)
+
+    @property
+    def atr_name(self) -> Optional[str]:
+        for name, ind in self.indicators.items():
+            if str(ind.get("type", "")).upper() == "ATR":
+                return name
+        return None
+
+
+def compile_rules(indicators: Mapping[str, Any], entry_long: Mapping[str, Any], exit_long: Mapping[str, Any]) -> StrategyRules:
+    validate_rules(indicators, entry_long, exit_long)
+    used = set(_operand_names(entry_long)) | set(_operand_names(exit_long))
+    slots = tuple(indicators) + tuple(f for f in BAR_FIELDS if f in used or f == "close")
+    slot_of = {name: i for i, name in enumerate(slots)}
+    return StrategyRules(
+        indicators=dict(indicators),
+        slots=slots,
+        entry=CompiledBlock(entry_long, slot_of),
+        exit=CompiledBlock(exit_long, slot_of),
+        cooldown_bars=int(entry_long.get("cooldown_bars", 0) or 0),
+    )
+
+
+def compile_config(cfg) -> StrategyRules:
+    """utils.config.Config → StrategyRules."""
+    return compile_rules(cfg.indicators, cfg.entry_long, cfg.exit_long)
@@ -0,0 +1,328 @@
+# asyncio-рантайм: много (pair, timeframe, strategy) в одном процессе,
+# один поток баров и одна сессия биржи на всех
+from __future__ import annotations
+import asyncio, time
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .aggregator import parse_timeframe
+from .buffers import OHLCV, BarRingBuffer, _ts_ns
+from .indicators import IndicatorEngine, _field
+from .metrics import LatencyHistogram
+from .orders import OrderTracker, OrderState
+from .portfolio import Portfolio
+from .risk import RiskEngine
+from .storage import InMemoryStore
+from .tracing import TRACER
+from .types import OrderRequest, Position, Side
+
+BarEvent = Tuple[str, str, Any]   # (pair, timeframe, bar) — как отдаёт BinanceKlineStream.stream()
+
+
+def _bar_ts(bar: Any) -> Any:
+    return bar["ts"] if isinstance(bar, dict) else getattr(bar, "ts", None)
+
+
+class StrategyInstance:
+    """
+    Одна стратегия на одной паре/таймфрейме. Всё состояние — своё:
+    индикаторы, кольцевой буфер последних `history` баров, store (позиция/equity/PnL дня), ордер в полёте.
+    Общий Portfolio (если есть) режет размер входа и ведёт trailing-стоп.
+    """
+
+    def __init__(self, pair: str, timeframe: str, strategy, risk: RiskEngine,
+                 indicators: IndicatorEngine, store: Optional[InMemoryStore] = None, name: str = "",
+                 history: int = 256, portfolio: Optional[Portfolio] = None):
+        self.pair, self.timeframe = pair, timeframe
+        self.name = name or f"{pair}:{timeframe}"
+        self.strategy = strategy
+        self.risk = risk
+        self.indicators = indicators
+        self.store = store or InMemoryStore()
+        self.portfolio = portfolio
+        self.bars = BarRingBuffer(OHLCV + tuple(indicators.values), capacity=history)
+        self.pending: Optional[OrderRequest] = None
+        self._pending_signal: Dict[str, Any] = {}
+        self._day = None
+        self._last_ts: Optional[int] = None   # ns последнего принятого бара
+
+    def _fresh(self, bar: Any) -> bool:
+        """Бар новее последнего принятого (тот же бар из history() и из стрима второй раз не считаем)."""
+        ts = _bar_ts(bar)
+        if ts is None:
+            return True
+        ns = _ts_ns(ts)
+        if self._last_ts is not None and ns <= self._last_ts:
+            return False
+        self._last_ts = ns
+        return True
+
+    def _push(self, bar: Any) -> None:
+        t0 = time.perf_counter_ns()
+        values = self.indicators.update(bar)
+        TRACER.record("indicators", self.pair, time.perf_counter_ns() - t0)
+        self.bars.append_bar(bar, values)
+
+    def seed(self, bars: Iterable[Any]) -> None:
+        for bar in bars:
+            if self._fresh(bar):
+                self._push(bar)
+
+    def _roll_day(self, bar: Any) -> None:
+        ts = _bar_ts(bar)
+        day = ts.date() if isinstance(ts, datetime) else None
+        if day is None or day == self._day:
+            return
+        self._day = day
+        # день PnL хранится в store: после рестарта посреди дня kill switch не сбрасывается,
+        # а если процесс лежал через полночь — сбрасывается на первом баре нового дня
+        if self.store.get_pnl_day() != day:
+            self.store.set_day_pnl_pct(0.0, day=day)
+
+    def _decide(self, pos: Position) -> Dict[str, Any]:
+        if hasattr(self.strategy, "on_values"):
+            rules = self.strategy.rules
+            last = self.bars.last
+            cur = tuple(last(name) for name in rules.slots)
+            prev = tuple(last(name, 2) for name in rules.slots)
+            return self.strategy.on_values(cur, prev, pos)
+        return self.strategy.on_bar(self.bars, pos)
+
+    def on_bar(self, bar: Any) -> Optional[OrderRequest]:
+        """CPU-часть обработки бара (без I/O): индикаторы → стоп → стратегия → размер. Возвращает ордер или None."""
+        if not self._fresh(bar):
+            return None
+        self._roll_day(bar)
+        self._push(bar)
+        if len(self.bars) < 2 or self.pending is not None:
+            return None
+        pos = self.store.get_position()
+
+        stop = pos.stop
+        if self.portfolio is not None and pos.side == Side.LONG:
+            trail = self.portfolio.stop(self.name)
+            if trail is not None and (stop is None or trail > stop):
+                stop = trail
+        if pos.side == Side.LONG and stop is not None and self.bars.last("low") <= stop:
+            return self._order("SELL", pos.qty, reason="stop")
+
+        t0 = time.perf_counter_ns()
+        sig = self._decide(pos)
+        TRACER.record("strategy", self.pair, time.perf_counter_ns() - t0)
+        if self.portfolio is not None and pos.side == Side.LONG:
+            self.portfolio.mark(self.name, self.bars.last("high"), self.bars.last("atr") if "atr" in self.bars else np.nan)
+        return self._act(sig, pos, self.bars.last("close"))
+
+    def on_signal(self, action: str, price: float, reason: str = "signal") -> Optional[OrderRequest]:
+        """
+        Внешний сигнал (services.signal_router): тот же путь риска/размера, что у сигнала стратегии,
+        цена — из сигнала, ATR и стоп — по последнему бару. Без прогретого буфера — ошибка (сигнал повторится).
+        """
+        if not len(self.bars):
+            raise RuntimeError(f"{self.name}: no bars yet")
+        if self.pending is not None:
+            raise RuntimeError(f"{self.name}: order in flight")
+        pos = self.store.get_position()
+        stop = None
+        if action == "BUY" and "atr" in self.bars:
+            stop = price - self.risk.cfg.stop_atr_mult * self.bars.last("atr")
+        return self._act(dict(action=action, stop=stop, reason=reason), pos, price)
+
+    def _act(self, sig: Dict[str, Any], pos: Position, close: float) -> Optional[OrderRequest]:
+        if sig["action"] == "SELL" and pos.side == Side.LONG:
+            return self._order("SELL", pos.qty, reason=sig.get("reason", "exit"))
+        if sig["action"] == "BUY" and pos.side == Side.FLAT:
+            if self.risk.daily_kill_switch(self.store.get_day_pnl_pct()):
+                return None
+            atr = self.bars.last("atr") if "atr" in self.bars else 0.0
+            t0 = time.perf_counter_ns()
+            qty = self.risk.position_size(close, atr)
+            if self.portfolio is not None:
+                qty = self.portfolio.size(self.name, self.pair, close, qty)   # лимиты — от equity портфеля
+            TRACER.record("position_size", self.pair, time.perf_counter_ns() - t0)
+            if qty > 0:
+                if self.portfolio is not None:
+                    # резервируем место до исполнения, чтобы соседние инстансы видели лимиты
+                    self.portfolio.open(self.name, self.pair, qty, close, sig.get("stop"), atr)
+                return self._order("BUY", qty, stop=sig.get("stop"), reason=sig.get("reason", "entry"))
+        return None
+
+    def _order(self, side: str, qty: float, **signal) -> OrderRequest:
+        self.pending = OrderRequest(pair=self.pair, side=side, qty=qty)
+        self._pending_signal = signal
+        return self.pending
+
+    def on_order_done(self, st: Optional[OrderState]) -> None:
+        """Исполнение (или отказ) ордера → позиция и equity в своём store (сначала equity, потом позиция, потом fill)."""
+        req, self.pending = self.pending, None
+        if st is None or not st.filled_qty:
+            if self.portfolio is not None and req is not None and req.side == "BUY":
+                self.portfolio.close(self.name)   # снять резерв
+            return
+        pos = self.store.get_position()
+        price = st.avg_price
+        if st.side == "BUY":
+            if self.portfolio is not None:
+                self.portfolio.open(self.name, self.pair, st.filled_qty, price, self._pending_signal.get("stop"),
+                                    self.bars.last("atr") if "atr" in self.bars else None)
+            self.store.set_position(Position(side=Side.LONG, qty=st.filled_qty, entry=price,
+                                             stop=self._pending_signal.get("stop"), meta={"coid": st.client_order_id}))
+        else:
+            pnl = (price - (pos.entry or price)) * st.filled_qty
+            equity = self.store.get_equity()
+            self.store.set_day_pnl_pct(self.store.get_day_pnl_pct() + pnl / equity * 100 if equity else 0.0)
+            self.store.set_equity(equity + pnl)
+            left = pos.qty - st.filled_qty
+            if self.portfolio is not None:
+                self.portfolio.reduce(self.name, st.filled_qty)
+            if left > 1e-12:
+                self.store.set_position(Position(side=Side.LONG, qty=left, entry=pos.entry, stop=pos.stop, meta=pos.meta))
+            else:
+                self.store.set_position(Position(side=Side.FLAT, qty=0.0, entry=None, stop=None, tp1=None, meta={}))
+        self.store.record_fill(st.client_order_id, st.side, st.filled_qty, price, order_id=st.order_id)
+
+
+class TradingRuntime:
+    """
+    Один поток закрытых баров → все инстансы с этим (pair, timeframe).
+    Ордера уходят параллельно через общий AsyncAbstractExchangeAdapter + OrderTracker,
+    цикл баров их не ждёт. bar_latency — время от получения бара до отправки ордеров (вся CPU-часть).
+    """
+
+    def __init__(self, exchange, tracker: Optional[OrderTracker] = None, fill_timeout: float = 30.0,
+                 portfolio: Optional[Portfolio] = None):
+        self.exchange = exchange
+        self.portfolio = portfolio
+        self.tracker = tracker or OrderTracker()
+        self.fill_timeout = fill_timeout
+        self.instances: Dict[Tuple[str, str], List[StrategyInstance]] = {}
+        self.bar_latency = LatencyHistogram()
+        self._tasks: set = set()
+
+    def add(self, inst: StrategyInstance) -> StrategyInstance:
+        self.instances.setdefault((inst.pair, inst.timeframe), []).append(inst)
+        if inst.portfolio is None:
+            inst.portfolio = self.portfolio
+        if self.portfolio is not None:
+            self.portfolio.pair_index(inst.pair)
+            if self.portfolio.equity_provider is None:
+                self.portfolio.equity_provider = self.equity
+        return inst
+
+    @property
+    def subscriptions(self) -> List[Tuple[str, str]]:
+        return list(self.instances)
+
+    def all_instances(self) -> List[StrategyInstance]:
+        return [i for group in self.instances.values() for i in group]
+
+    def equity(self) -> float:
+        """Equity портфеля: сумма по store инстансов (общий store считается один раз)."""
+        stores = {id(i.store): i.store for i in self.all_instances()}
+        return sum(s.get_equity() for s in stores.values())
+
+    async def seed(self, history: Callable[[str, str], List[Any]], now: Optional[datetime] = None) -> None:
+        """
+        history(pair, tf) — блокирующий backfill (например BinanceHistoryLoader.history()); гоним в потоках.
+        Незакрытые на момент now бары (REST отдаёт и текущую свечу) отбрасываем — закрытыми они придут из стрима.
+        """
+        keys = self.subscriptions
+        results = await asyncio.gather(*(asyncio.to_thread(history, p, tf) for p, tf in keys))
+        now_ns = _ts_ns(now) if now is not None else time.time_ns()
+        for (pair, tf), bars in zip(keys, results):
+            kind, size = parse_timeframe(tf)
+            if kind == "time":
+                span = int(size * 1e9)
+                bars = [b for b in bars if _bar_ts(b) is None or _ts_ns(_bar_ts(b)) + span <= now_ns]
+            for inst in self.instances[(pair, tf)]:
+                inst.seed(bars)
+
+    def warmup_bars(self, pair: str, tf: str) -> int:
+        """Сколько закрытых баров (pair, tf) просить у history(): буфер и прогрев индикаторов каждого инстанса."""
+        return max((max(i.bars.capacity, i.indicators.warmup) for i in self.instances.get((pair, tf), ())), default=0)
+
+    def last_bar_ms(self) -> Dict[Tuple[str, str], int]:
+        """(pair, tf) → open time (ms) последнего бара в инстансах — start_after для BinanceKlineStream."""
+        out = {}
+        for key, group in self.instances.items():
+            seen = [i._last_ts for i in group if i._last_ts is not None]
+            if seen:
+                out[key] = min(seen) // 1_000_000
+        return out
+
+    def dispatch(self, pair: str, timeframe: str, bar: Any) -> List[Tuple[StrategyInstance, OrderRequest]]:
+        orders = []
+        for inst in self.instances.get((pair, timeframe), ()):
+            try:
+                req = inst.on_bar(bar)
+            except Exception as e:
+                print(f"[RUNTIME] {inst.name} on_bar error: {e}")
+                continue
+            if req is not None:
+                orders.append((inst, req))
+        return orders
+
+    async def _execute(self, orders: List[Tuple[StrategyInstance, OrderRequest]]) -> None:
+        t0 = time.perf_counter_ns()
+        futures = await self.tracker.submit(self.exchange, [req for _, req in orders])
+
+        async def settle(inst: StrategyInstance, req: OrderRequest, fut: asyncio.Future):
+            st = None
+            while st is None:
+                try:
+                    st = await asyncio.wait_for(asyncio.shield(fut), self.fill_timeout)
+                    TRACER.record("order_fill", inst.pair, time.perf_counter_ns() - t0)
+                except asyncio.TimeoutError:
+                    # ордер может быть жив на бирже: pending и резерв портфеля держим до финального статуса
+                    state = self.tracker.get(req.client_order_id)
+                    print(f"[RUNTIME] {inst.name} order {req.client_order_id} not final after "
+                          f"{self.fill_timeout}s ({state.status if state else '?'}), reconciling")
+                    if state is not None:
+                        await self.tracker.resolve(self.exchange, [state])
+                except Exception as e:
+                    print(f"[RUNTIME] {inst.name} order failed: {e}")
+                    break
+            inst.on_order_done(st)
+        await asyncio.gather(*(settle(inst, req, f) for (inst, req), f in zip(orders, futures)))
+
+    def _submit(self, orders: List[Tuple[StrategyInstance, OrderRequest]]) -> None:
+        if orders:
+            task = asyncio.create_task(self._execute(orders))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def on_signal(self, pair: str, timeframe: str, action: str, price: float, reason: str = "signal") -> int:
+        """Внешний BUY/SELL всем инстансам (pair, timeframe); ошибки инстанса пробрасываются. Возвращает число ордеров."""
+        group = self.instances.get((pair, timeframe))
+        if not group:
+            raise KeyError(f"no strategy instance for {pair} {timeframe}")
+        orders = []
+        for inst in group:
+            req = inst.on_signal(action, price, reason)
+            if req is not None:
+                orders.append((inst, req))
+        self._submit(orders)
+        return len(orders)
+
+    async def on_event(self, pair: str, timeframe: str, bar: Any) -> None:
+        t0 = time.perf_counter_ns()
+        if self.portfolio is not None:
+            ts = bar["ts"] if isinstance(bar, dict) else bar.ts
+            self.portfolio.on_close(pair, ts, _field(bar, "close"), timeframe)
+        orders = self.dispatch(pair, timeframe, bar)
+        if self.portfolio is not None:
+            self.portfolio.trail()   # стопы на закрытии → проверяются low следующего бара
+        TRACER.record("dispatch", pair, time.perf_counter_ns() - t0)
+        self._submit(orders)
+        self.bar_latency.record(time.perf_counter_ns() - t0)
+
+    async def run(self, events: AsyncIterator[BarEvent]) -> None:
+        async for pair, timeframe, bar in events:
+            await self.on_event(pair, timeframe, bar)
+
+    async def drain(self) -> None:
+        """Дождаться ордеров в полёте (остановка, тесты)."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
@@ -1,4 +1,7 @@
 # кроссы, фильтры
+from collections import deque
+
+import numpy as np
 import pandas as pd
 
 def crosses_above(left: pd.Series, right: pd.Series) -> pd.Series:
@@ -7,6 +10,101 @@ def crosses_above(left: pd.Series, right: pd.Series) -> pd.Series:
 def crosses_below(left: pd.Series, right: pd.Series) -> pd.Series:
     return (left.shift(1) >= right.shift(1)) & (left < right)
 
+
+# ---- подтверждения / серии ----
+# Всё через cumsum/maximum.accumulate: без Python-лямбды на каждое окно.
+
+def _as_bool(series_bool: pd.Series) -> np.ndarray:
+    return series_bool.fillna(False).to_numpy(dtype=bool)
+
+def streak(series_bool: pd.Series) -> pd.Series:
+    """Сколько баров подряд (включая текущий) сигнал TRUE; 0 на FALSE."""
+    b = _as_bool(series_bool)
+    idx = np.arange(1, len(b) + 1)
+    last_false = np.maximum.accumulate(np.where(b, 0, idx)) if len(b) else idx
+    return pd.Series(idx - last_false, index=series_bool.index)
+
 def confirm(series_bool: pd.Series, bars: int) -> pd.Series:
     """TRUE, если сигнал был TRUE N последних баров подряд (простое подтверждение)."""
-    return series_bool.rolling(bars).apply(lambda x: x.all(), raw=False).astype(bool)
+    return streak(series_bool) >= bars
+
+def n_of_m(series_bool: pd.Series, n: int, m: int) -> pd.Series:
+    """TRUE, если сигнал был TRUE хотя бы n раз за последние m баров (первые m-1 баров — FALSE)."""
+    c = np.cumsum(_as_bool(series_bool), dtype=np.int64)
+    window = c.copy()
+    window[m:] -= c[:-m]
+    out = window >= n
+    out[:m - 1] = False
+    return pd.Series(out, index=series_bool.index)
+
+def bars_since(event: pd.Series) -> pd.Series:
+    """Баров с последнего TRUE в event (0 на самом событии, -1 — события ещё не было)."""
+    e = _as_bool(event)
+    idx = np.arange(len(e))
+    last = np.maximum.accumulate(np.where(e, idx, -1)) if len(e) else idx
+    return pd.Series(np.where(last >= 0, idx - last, -1), index=event.index)
+
+def held_since(event: pd.Series, cond: pd.Series) -> pd.Series:
+    """TRUE, если cond держится непрерывно с бара последнего event (например «выше с момента кросса»)."""
+    since = bars_since(event).to_numpy()
+    return pd.Series((since >= 0) & (streak(cond).to_numpy() > since), index=cond.index)
+
+
+# ---- потоковые аналоги для live-баров (O(1) на бар) ----
+
+class StreakCounter:
+    __slots__ = ("count",)
+
+    def __init__(self):
+        self.count = 0
+
+    def update(self, flag: bool) -> int:
+        self.count = self.count + 1 if flag else 0
+        return self.count
+
+
+class Confirm:
+    """Потоковый confirm(series, bars)."""
+    __slots__ = ("bars", "_streak")
+
+    def __init__(self, bars: int):
+        self.bars = bars
+        self._streak = StreakCounter()
+
+    def update(self, flag: bool) -> bool:
+        return self._streak.update(flag) >= self.bars
+
+
+class NofM:
+    """Потоковый n_of_m(series, n, m)."""
+    __slots__ = ("n", "m", "_window", "_hits")
+
+    def __init__(self, n: int, m: int):
+        self.n, self.m = n, m
+        self._window = deque(maxlen=m)
+        self._hits = 0
+
+    def update(self, flag: bool) -> bool:
+        flag = bool(flag)
+        if len(self._window) == self.m:
+            self._hits -= self._window[0]
+        self._window.append(flag)
+        self._hits += flag
+        return len(self._window) == self.m and self._hits >= self.n
+
+
+class HeldSince:
+    """Потоковый held_since(event, cond)."""
+    __slots__ = ("_since", "_streak")
+
+    def __init__(self):
+        self._since = -1
+        self._streak = StreakCounter()
+
+    def update(self, event: bool, cond: bool) -> bool:
+        if event:
+            self._since = 0
+        elif self._since >= 0:
+            self._since += 1
+        held = self._streak.update(cond)
+        return self._since >= 0 and held > self._since
@@ -1,10 +1,16 @@
 # Redis/PG (позы, сделки, метрики)
+from __future__ import annotations
+import copy, json, queue, threading, time
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
 from .types import Position, Side
 
 class InMemoryStore:
     def __init__(self):
         self.position = Position(side=Side.FLAT, qty=0.0, entry=None, stop=None, tp1=None, meta={})
         self.day_pnl_pct = 0.0
+        self.pnl_day: Optional[date] = None   # день, к которому относится day_pnl_pct
         self.equity = 10_000.0  # стартовый equity
 
     def get_position(self) -> Position:
@@ -22,5 +28,321 @@ class InMemoryStore:
     def get_day_pnl_pct(self) -> float:
         return self.day_pnl_pct
 
-    def set_day_pnl_pct(self, v: float):
+    def get_pnl_day(self) -> Optional[date]:
+        return self.pnl_day
+
+    def set_day_pnl_pct(self, v: float, day: Optional[date] = None):
+        """day — начать новый день (сброс в 0 на смене дня); без day значение относится к текущему."""
         self.day_pnl_pct = v
+        if day is not None:
+            self.pnl_day = day
+
+    def record_fill(self, client_order_id: str, side: str, qty: float, price: float, **kw):
+        pass  # в памяти сделки не храним
+
+
+# ===== write-behind в SQL =====
+
+Op = Tuple[int, str, Dict[str, Any], datetime]   # (seq, kind, payload, ts)
+_STOP = object()
+
+
+def _pos_to_dict(p: Position) -> Dict[str, Any]:
+    return {"side": Side(p.side).value, "qty": p.qty, "entry": p.entry, "stop": p.stop, "tp1": p.tp1, "meta": p.meta or {}}
+
+
+def _pos_from_dict(d: Dict[str, Any]) -> Position:
+    return Position(side=Side(d["side"]), qty=d["qty"], entry=d["entry"], stop=d["stop"], tp1=d["tp1"], meta=d.get("meta") or {})
+
+
+def _apply(state: InMemoryStore, kind: str, payload: Dict[str, Any]) -> None:
+    """Одна операция журнала → состояние (и в писателе, и при восстановлении)."""
+    if kind == "position":
+        state.position = _pos_from_dict(payload)
+    elif kind == "equity":
+        state.equity = payload["v"]
+    elif kind == "day_pnl":
+        state.day_pnl_pct = payload["v"]
+        if payload.get("day"):
+            state.pnl_day = date.fromisoformat(payload["day"])
+
+
+def _transient(e: BaseException) -> bool:
+    """Стоит повторить: БД недоступна/занята или соединение порвалось (а не ошибка в самих данных)."""
+    from sqlalchemy.exc import DBAPIError, OperationalError
+    return isinstance(e, OperationalError) or (isinstance(e, DBAPIError) and bool(e.connection_invalidated))
+
+
+class _WriterState:
+    """То, что уже закоммичено в БД. Меняется только в потоке писателя."""
+
+    def __init__(self, shadow: InMemoryStore, seq: int):
+        self.shadow = shadow
+        self.seq = seq
+        self.since_snapshot = 0
+        self.position_id: Optional[int] = None     # открытая позиция в positions
+        self.last_position_id: Optional[int] = None
+        self.open_equity: Optional[float] = None
+        self.day_realized: Dict[Any, float] = {}
+
+
+class SqlStore(InMemoryStore):
+    """
+    Тот же интерфейс, что у InMemoryStore: чтение и запись идут в память, поэтому бар-цикл
+    не ждёт БД. Каждое изменение получает seq и уходит в очередь; фоновый поток пишет её
+    пачками одной транзакцией — журнал (store_journal), positions/orders/trades, daily_pnl,
+    а раз в snapshot_every операций снапшот (store_snapshots).
+
+    Восстановление после падения: снапшот + операции журнала с seq больше снапшотного;
+    журнал до снапшота удаляется в той же транзакции. Потерять можно только то, что не успело
+    уйти из очереди (flush_interval).
+
+    Сбои записи: транзиентные ошибки БД повторяются до max_retries раз с backoff. Пачку с ошибкой
+    в данных пишем по одной операции; то, что не записалось (ядовитая операция или БД так и не ожила),
+    уходит в dead_letters и в лог — очередь за ним не встаёт.
+    """
+
+    def __init__(self, session_factory, key: str, symbol: str = "", strategy: str = "",
+                 exchange: str = "binance", start_equity: float = 10_000.0,
+                 batch_size: int = 500, flush_interval: float = 0.2, snapshot_every: int = 100,
+                 max_retries: int = 5, retry_backoff: float = 0.1):
+        super().__init__()
+        self.session_factory = session_factory
+        self.key = key
+        self.symbol = symbol or key
+        self.strategy = strategy or key
+        self.exchange = exchange
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.equity = start_equity
+        self.write_errors = 0
+        self.dead_letters: List[Tuple[Op, str]] = []
+
+        self._seq = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._w = self._recover()
+        self._thread = threading.Thread(target=self._run, name=f"store-{key}", daemon=True)
+        self._thread.start()
+
+    # --- горячий путь: память + очередь ---
+
+    def _emit(self, kind: str, payload: Dict[str, Any]) -> None:
+        self._seq += 1
+        self._queue.put_nowait((self._seq, kind, payload, datetime.now(timezone.utc)))
+
+    def set_position(self, pos: Position):
+        self.position = pos
+        self._emit("position", _pos_to_dict(pos))
+
+    def set_equity(self, value: float):
+        self.equity = value
+        self._emit("equity", {"v": value})
+
+    def set_day_pnl_pct(self, v: float, day: Optional[date] = None):
+        super().set_day_pnl_pct(v, day)
+        self._emit("day_pnl", {"v": v, "day": self.pnl_day.isoformat() if self.pnl_day else None})
+
+    def record_fill(self, client_order_id: str, side: str, qty: float, price: float,
+                    fee: float = 0.0, fee_asset: Optional[str] = None, order_id: Optional[str] = None):
+        """Исполненный рыночный ордер → orders + trades (после set_position, чтобы привязаться к позиции)."""
+        self._emit("fill", {"coid": client_order_id, "side": side, "qty": qty, "price": price,
+                            "fee": fee, "fee_asset": fee_asset, "order_id": order_id})
+
+    # --- восстановление ---
+
+    def _recover(self) -> _WriterState:
+        from database.models import DailyPnL, Position as PositionRow, PositionStatus, StoreJournal, StoreSnapshot
+
+        with self.session_factory() as s:
+            snap = s.get(StoreSnapshot, self.key)
+            seq = 0
+            if snap is not None:
+                seq = snap.seq
+                self.position = _pos_from_dict(json.loads(snap.position))
+                self.equity, self.day_pnl_pct, self.pnl_day = snap.equity, snap.day_pnl_pct, snap.pnl_day
+            tail = (s.query(StoreJournal).filter(StoreJournal.key == self.key, StoreJournal.seq > seq)
+                    .order_by(StoreJournal.seq).all())
+            for row in tail:
+                _apply(self, row.kind, json.loads(row.payload))
+                seq = row.seq
+            w = _WriterState(InMemoryStore(), seq)
+            w.shadow.position, w.shadow.equity = self.position, self.equity
+            w.shadow.day_pnl_pct, w.shadow.pnl_day = self.day_pnl_pct, self.pnl_day
+
+            open_row = (s.query(PositionRow)
+                        .filter(PositionRow.symbol == self.symbol, PositionRow.strategy == self.strategy,
+                                PositionRow.status == PositionStatus.OPEN)
+                        .order_by(PositionRow.id.desc()).first())
+            if open_row is not None and self.position.side == Side.LONG:
+                w.position_id = w.last_position_id = open_row.id
+                w.open_equity = self.equity
+            today = datetime.now(timezone.utc).date()
+            day_row = s.query(DailyPnL).filter(DailyPnL.account == self.key, DailyPnL.day == today).first()
+            if day_row is not None and day_row.realized_pnl is not None:
+                w.day_realized[today] = float(day_row.realized_pnl)
+        self._seq = seq
+        return w
+
+    # --- поток писателя ---
+
+    def _take(self) -> Tuple[List[Op], bool]:
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return [], False
+        if first is _STOP:
+            return [], True
+        batch, stop = [first], False
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _run(self) -> None:
+        while True:
+            batch, stop = self._take()
+            if batch:
+                self._commit(batch, force_snapshot=stop)
+            if stop:
+                if not batch:
+                    self._commit([], force_snapshot=True)
+                self._queue.task_done()
+                return
+
+    def _try_commit(self, batch: List[Op], force_snapshot: bool) -> Optional[Exception]:
+        """Одна транзакция; транзиентные ошибки повторяем. None — записано, иначе последняя ошибка."""
+        for attempt in range(self.max_retries + 1):
+            w = copy.deepcopy(self._w)  # состояние писателя двигаем только после успешного коммита
+            try:
+                with self.session_factory() as s:
+                    self._write(s, w, batch, force_snapshot)
+                    s.commit()
+                self._w = w
+                return None
+            except Exception as e:
+                self.write_errors += 1
+                print(f"[STORE] {self.key}: write of {len(batch)} ops failed (attempt {attempt + 1}): {e}")
+                if not _transient(e) or attempt == self.max_retries:
+                    return e
+                time.sleep(min(self.retry_backoff * 2 ** attempt, 5.0))
+        return None
+
+    def _commit(self, batch: List[Op], force_snapshot: bool = False) -> None:
+        err = self._try_commit(batch, force_snapshot)
+        if err is not None:
+            if len(batch) > 1 and not _transient(err):
+                # ищем ядовитую операцию: по одной, чтобы соседние по пачке всё же записались
+                for op in batch:
+                    e = self._try_commit([op], False)
+                    if e is not None:
+                        self._dead_letter(op, e)
+            else:
+                for op in batch:
+                    self._dead_letter(op, err)
+            if force_snapshot:
+                self._try_commit([], True)
+        for _ in batch:
+            self._queue.task_done()
+
+    def _dead_letter(self, op: Op, err: Exception) -> None:
+        self.dead_letters.append((op, str(err)))
+        seq, kind, payload, ts = op
+        print(f"[STORE] {self.key}: dropped op seq={seq} {kind} {json.dumps(payload, default=str)}: {err}")
+
+    def _write(self, s, w: _WriterState, batch: List[Op], force_snapshot: bool) -> None:
+        from sqlalchemy import insert
+        from database.models import (DailyPnL, Order, OrderStatus, OrderType, Position as PositionRow,
+                                     PositionStatus, Side as DbSide, StoreJournal, StoreSnapshot, Trade)
+
+        if batch:
+            s.execute(insert(StoreJournal.__table__), [
+                {"key": self.key, "seq": seq, "kind": kind, "payload": json.dumps(payload, default=str), "ts": ts}
+                for seq, kind, payload, ts in batch
+            ])
+        days = set()
+        for seq, kind, payload, ts in batch:
+            prev = w.shadow.position
+            _apply(w.shadow, kind, payload)
+            w.seq = seq
+            if kind in ("equity", "day_pnl"):
+                days.add(ts.date())
+            elif kind == "position":
+                cur = w.shadow.position
+                if cur.side == Side.LONG and w.position_id is None:
+                    row = PositionRow(symbol=self.symbol, exchange=self.exchange, strategy=self.strategy,
+                                      status=PositionStatus.OPEN, side=DbSide.LONG, qty=cur.qty,
+                                      entry_price=cur.entry, stop_price=cur.stop, tp1_price=cur.tp1, opened_at=ts)
+                    s.add(row)
+                    s.flush()
+                    w.position_id = w.last_position_id = row.id
+                    w.open_equity = w.shadow.equity
+                elif w.position_id is not None:
+                    row = s.get(PositionRow, w.position_id)
+                    if cur.side == Side.LONG:
+                        row.qty, row.stop_price = cur.qty, cur.stop
+                    else:
+                        # сеттеры зовутся в порядке equity → position, так что equity уже после сделки
+                        realized = w.shadow.equity - (w.open_equity if w.open_equity is not None else w.shadow.equity)
+                        row.status, row.closed_at, row.realized_pnl = PositionStatus.CLOSED, ts, realized
+                        w.day_realized[ts.date()] = w.day_realized.get(ts.date(), 0.0) + realized
+                        w.position_id, w.open_equity = None, None
+                        days.add(ts.date())
+            elif kind == "fill":
+                side = DbSide.LONG if payload["side"] == "BUY" else DbSide.SHORT
+                order = Order(position_id=w.last_position_id, client_order_id=payload["coid"],
+                              exchange_order_id=payload.get("order_id"), symbol=self.symbol, side=side,
+                              type=OrderType.MARKET, status=OrderStatus.FILLED, qty=payload["qty"],
+                              filled_qty=payload["qty"], avg_fill_price=payload["price"],
+                              is_protective=False, created_at=ts, updated_at=ts)
+                s.add(order)
+                s.flush()
+                s.add(Trade(order_id=order.id, price=payload["price"], qty=payload["qty"],
+                            fee=payload.get("fee") or 0.0, fee_asset=payload.get("fee_asset"), ts=ts))
+
+        for day in days:
+            row = s.query(DailyPnL).filter(DailyPnL.account == self.key, DailyPnL.day == day).first()
+            if row is None:
+                row = DailyPnL(account=self.key, day=day, unrealized_pnl=0)
+                s.add(row)
+            row.realized_pnl = w.day_realized.get(day, 0.0)
+            row.equity = w.shadow.equity
+            row.updated_at = datetime.now(timezone.utc)
+
+        w.since_snapshot += len(batch)
+        if force_snapshot or w.since_snapshot >= self.snapshot_every:
+            s.merge(StoreSnapshot(key=self.key, seq=w.seq, position=json.dumps(_pos_to_dict(w.shadow.position), default=str),
+                                  equity=w.shadow.equity, day_pnl_pct=w.shadow.day_pnl_pct, pnl_day=w.shadow.pnl_day,
+                                  updated_at=datetime.now(timezone.utc)))
+            # журнал до снапшота для восстановления больше не нужен
+            s.query(StoreJournal).filter(StoreJournal.key == self.key, StoreJournal.seq <= w.seq) \
+                .delete(synchronize_session=False)
+            w.since_snapshot = 0
+
+    # --- управление ---
+
+    def pending(self) -> int:
+        return self._queue.unfinished_tasks
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Дождаться записи всего, что уже в очереди. Не для горячего пути."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Дописать очередь, сохранить финальный снапшот и остановить поток."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
@@ -1,5 +1,5 @@
 # state-machine: FLAT/LONG/EXIT
-import pandas as pd
+import numpy as np
 from .types import Position, Side
 
 class TrendFollowingStrategy:
@@ -7,18 +7,21 @@ class TrendFollowingStrategy:
         self.params = params
         self.cooldown = 0  # бары до следующего входа
 
-    def on_bar(self, df: pd.DataFrame, pos: Position) -> dict:
+    def on_bar(self, df, pos: Position) -> dict:
         """
-        df: OHLCV + индикаторы ('ema_fast','ema_slow','rsi','atr')
+        df: OHLCV + индикаторы ('ema_fast','ema_slow','rsi','atr') — pd.DataFrame
+            или core.buffers.BarRingBuffer (читаем только две последние строки)
         pos: текущее состояние позиции
         return: dict{action: 'BUY'|'SELL'|'HOLD', size, stop, tp1, reason}
         """
-        last = df.iloc[-1]
-        ema_f, ema_s, rsi = last['ema_fast'], last['ema_slow'], last['rsi']
-        atr_val, close = last['atr'], last['close']
+        fast, slow = np.asarray(df['ema_fast']), np.asarray(df['ema_slow'])
+        ema_f, ema_s = fast[-1], slow[-1]
+        prev_f, prev_s = fast[-2], slow[-2]
+        rsi = np.asarray(df['rsi'])[-1]
+        atr_val, close = np.asarray(df['atr'])[-1], np.asarray(df['close'])[-1]
 
         # выход по правилам
-        exit_cross = (df['ema_fast'].iloc[-2] >= df['ema_slow'].iloc[-2]) and (ema_f < ema_s)
+        exit_cross = (prev_f >= prev_s) and (ema_f < ema_s)
         exit_rsi   = rsi > self.params['exit_rsi']
 
         if pos.side == Side.LONG and (exit_cross or exit_rsi):
@@ -29,7 +32,7 @@ class TrendFollowingStrategy:
             self.cooldown -= 1
             return dict(action='HOLD')
 
-        entry_cross = (df['ema_fast'].iloc[-2] <= df['ema_slow'].iloc[-2]) and (ema_f > ema_s)
+        entry_cross = (prev_f <= prev_s) and (ema_f > ema_s)
         entry_rsi   = rsi < self.params['entry_rsi']
 
         if pos.side == Side.FLAT and entry_cross and entry_rsi:
@@ -39,3 +42,44 @@ class TrendFollowingStrategy:
             return dict(action='BUY', stop=stop, reason='entry')
 
         return dict(action='HOLD')
+
+
+class RuleStrategy:
+    """
+    Та же state-machine, что у TrendFollowingStrategy, но условия входа/выхода
+    берутся из entry_long/exit_long config.yaml (core.rules.compile_config).
+    """
+    def __init__(self, rules, params: dict):
+        self.rules = rules
+        self.params = params
+        self.cooldown = 0
+        self._entry = rules.entry.evaluator()
+        self._exit = rules.exit.evaluator()
+        self._i_close = rules.slots.index('close')
+        self._i_atr = rules.slots.index(rules.atr_name) if rules.atr_name else None
+
+    def on_bar(self, df, pos: Position) -> dict:
+        cols = [np.asarray(df[name]) for name in self.rules.slots]
+        cur = tuple(float(c[-1]) for c in cols)
+        prev = tuple(float(c[-2]) for c in cols)
+        return self.on_values(cur, prev, pos)
+
+    def on_values(self, cur: tuple, prev: tuple, pos: Position) -> dict:
+        """cur/prev — значения в порядке rules.slots (без DataFrame)."""
+        # evaluator'ы с confirm_bars считают серию, поэтому зовём их на каждом баре
+        entry = self._entry(cur, prev)
+        if self._exit(cur, prev) and pos.side == Side.LONG:
+            return dict(action='SELL', size=pos.qty, reason='exit')
+
+        if self.cooldown > 0:
+            self.cooldown -= 1
+            return dict(action='HOLD')
+
+        if pos.side == Side.FLAT and entry:
+            stop = None
+            if self._i_atr is not None:
+                stop = cur[self._i_close] - self.params['stop_atr_mult'] * cur[self._i_atr]
+            self.cooldown = self.rules.cooldown_bars
+            return dict(action='BUY', stop=stop, reason='entry')
+
+        return dict(action='HOLD')
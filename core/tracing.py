@@ -0,0 +1,106 @@
+# трассировка пути бар → сигнал → ордер: время по стадиям и парам в HDR-гистограммах
+from __future__ import annotations
+import threading, time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .metrics import LatencyHistogram, LatencyRegistry
+
+_now = time.perf_counter_ns
+
+
+class _Span:
+    __slots__ = ("_hist", "_t0")
+
+    def __init__(self, hist: Optional[LatencyHistogram]):
+        self._hist = hist
+
+    def __enter__(self):
+        self._t0 = _now()
+        return self
+
+    def __exit__(self, *exc):
+        if self._hist is not None:
+            self._hist.record(_now() - self._t0)
+        return False
+
+
+class Tracer:
+    """
+    Гистограмма на (stage, pair). В горячем пути — record(stage, pair, ns) с замером
+    через time.perf_counter_ns() (монотонные часы); span() — то же как контекст-менеджер.
+    Стадии, которые меряются от времени закрытия бара на бирже (bar_delay), используют
+    time.time_ns() — это единственные стенные часы здесь.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._hists: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def hist(self, stage: str, pair: str = "") -> LatencyHistogram:
+        key = (stage, pair)
+        h = self._hists.get(key)
+        if h is None:
+            with self._lock:
+                h = self._hists.setdefault(key, LatencyHistogram())
+        return h
+
+    def record(self, stage: str, pair: str, ns: int) -> None:
+        if self.enabled:
+            h = self._hists.get((stage, pair))
+            if h is None:
+                h = self.hist(stage, pair)
+            h.record(ns)
+
+    def span(self, stage: str, pair: str = "") -> _Span:
+        return _Span(self.hist(stage, pair) if self.enabled else None)
+
+    def items(self) -> List[Tuple[Tuple[str, str], LatencyHistogram]]:
+        return list(self._hists.items())
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {f"{stage}|{pair}": h.snapshot() for (stage, pair), h in self.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hists.clear()
+
+
+TRACER = Tracer()
+
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+def _esc(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _summary(lines: List[str], name: str, labels: str, h: LatencyHistogram) -> None:
+    for q in QUANTILES:
+        lines.append(f'{name}{{{labels},quantile="{q}"}} {h.percentile(q * 100) / 1e9:.9f}')
+    lines.append(f"{name}_sum{{{labels}}} {h.total_ns / 1e9:.9f}")
+    lines.append(f"{name}_count{{{labels}}} {h.count}")
+
+
+def render_prometheus(tracer: Tracer = TRACER, registries: Iterable[Tuple[str, LatencyRegistry]] = ()) -> str:
+    """
+    Текстовый формат Prometheus (summary в секундах).
+    registries: (метка, LatencyRegistry) — например ("binance", adapter.latency) → endpoint="..."
+    """
+    lines = [
+        "# HELP trading_stage_latency_seconds Latency of bar-close -> order path stages.",
+        "# TYPE trading_stage_latency_seconds summary",
+    ]
+    for (stage, pair), h in sorted(tracer.items()):
+        _summary(lines, "trading_stage_latency_seconds", f'stage="{_esc(stage)}",pair="{_esc(pair)}"', h)
+    regs = list(registries)
+    if regs:
+        lines += [
+            "# HELP trading_endpoint_latency_seconds Exchange REST latency per endpoint.",
+            "# TYPE trading_endpoint_latency_seconds summary",
+        ]
+        for source, reg in regs:
+            for endpoint, h in sorted(reg.items()):
+                _summary(lines, "trading_endpoint_latency_seconds",
+                         f'source="{_esc(source)}",endpoint="{_esc(endpoint)}"', h)
+    return "\n".join(lines) + "\n"
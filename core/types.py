@@ -7,7 +7,7 @@ class Side(str, Enum):
     LONG = "LONG"
     FLAT = "FLAT"
 
-@dataclass
+@dataclass(slots=True)
 class Bar:
     ts: datetime
     open: float
@@ -24,3 +24,11 @@ class Position:
     stop: Optional[float] = None
     tp1: Optional[float] = None
     meta: Dict = None
+
+
+@dataclass
+class OrderRequest:
+    pair: str
+    side: str                 # 'BUY' | 'SELL'
+    qty: float
+    client_order_id: Optional[str] = None
@@ -1,3 +1,5 @@
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from database.models import ProductReview, User, GoogleToken, AmazonToken, TodoistToken
@@ -71,7 +73,9 @@ def save_review(session: Session, asin: str, review: dict) -> bool:
             title=review['title'],
             rating=review['rating'],
             text=review['text'],
-            review_date=review['date']
+            review_date=review['date'],
+            verified=review.get('verified'),
+            helpful_votes=review.get('helpful_votes'),
         )
         session.add(new_review)
         session.commit()
@@ -79,3 +83,72 @@ def save_review(session: Session, asin: str, review: dict) -> bool:
     except IntegrityError:
         session.rollback()
         return False
+
+
+REVIEW_BATCH = 1000  # строк на один IN / INSERT (лимит bind-параметров Postgres — 65535)
+
+
+def _review_row(asin: str, review: dict) -> dict:
+    return {
+        "asin": asin,
+        "review_id": review['id'],
+        "title": review['title'],
+        "rating": review['rating'],
+        "text": review['text'],
+        "review_date": review['date'],
+        "verified": review.get('verified'),
+        "helpful_votes": review.get('helpful_votes'),
+    }
+
+
+def existing_review_ids(session: Session, review_ids: list[str]) -> set[str]:
+    """Какие из review_ids уже сохранены — один SELECT ... IN на пачку."""
+    ids = list(dict.fromkeys(review_ids))
+    found = set()
+    for i in range(0, len(ids), REVIEW_BATCH):
+        chunk = ids[i:i + REVIEW_BATCH]
+        found.update(rid for (rid,) in session.query(ProductReview.review_id)
+                     .filter(ProductReview.review_id.in_(chunk)))
+    return found
+
+
+def insert_reviews_stmt(rows: list[dict]):
+    """INSERT ... ON CONFLICT (review_id) DO NOTHING RETURNING review_id (Postgres)."""
+    return (
+        pg_insert(ProductReview).values(rows)
+        .on_conflict_do_nothing(index_elements=[ProductReview.review_id])
+        .returning(ProductReview.review_id)
+    )
+
+
+def save_reviews_bulk(session: Session, asin: str, reviews: list[dict]) -> list[dict]:
+    """
+    Сохраняет пачку отзывов одной транзакцией и возвращает реально добавленные (в исходном порядке).
+    Postgres: один INSERT ... ON CONFLICT DO NOTHING RETURNING на REVIEW_BATCH строк.
+    Другие БД: SELECT ... IN + executemany; при гонке с другим писателем — по одному через save_review.
+    """
+    reviews = list({r['id']: r for r in reviews}.values())
+    # отзывы, сохранённые раньше под хешем текста и даты (до id из DOM), — уже не новые
+    legacy = existing_review_ids(session, [r['legacy_id'] for r in reviews if r.get('legacy_id')])
+    reviews = [r for r in reviews if r.get('legacy_id') not in legacy]
+    if not reviews:
+        return []
+    rows = [_review_row(asin, r) for r in reviews]
+    if session.get_bind().dialect.name == "postgresql":
+        inserted = set()
+        for i in range(0, len(rows), REVIEW_BATCH):
+            inserted.update(rid for (rid,) in session.execute(insert_reviews_stmt(rows[i:i + REVIEW_BATCH])))
+        session.commit()
+        return [r for r in reviews if r['id'] in inserted]
+
+    existing = existing_review_ids(session, [r['id'] for r in reviews])
+    fresh = [r for r in reviews if r['id'] not in existing]
+    if not fresh:
+        return []
+    try:
+        session.execute(insert(ProductReview), [_review_row(asin, r) for r in fresh])
+        session.commit()
+        return fresh
+    except IntegrityError:
+        session.rollback()
+        return [r for r in fresh if save_review(session, asin, r)]
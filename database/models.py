@@ -1,6 +1,7 @@
-from sqlalchemy import Column, DateTime, Integer, BigInteger, String, Boolean, Text, TIMESTAMP, ForeignKey, func
+from sqlalchemy import Column, DateTime, Date, Integer, BigInteger, String, Boolean, Text, TIMESTAMP, Numeric, Float, Enum, ForeignKey, UniqueConstraint, Index, func
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
+import enum
 
 Base = declarative_base()
 
@@ -55,6 +56,8 @@ class ProductReview(Base):
     rating = Column(String(255))
     text = Column(Text)
     review_date = Column(String)
+    verified = Column(Boolean)
+    helpful_votes = Column(Integer)          # на момент первого обхода; отзыв вставляется один раз
     created_at = Column(DateTime, server_default=func.now())
 
 
@@ -64,4 +67,145 @@ class Product(Base):
     id = Column(Integer, primary_key=True)
     asin = Column(String(255), unique=True, nullable=False)
     active = Column(Boolean, default=True)
-    created_at = Column(DateTime, server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime, server_default=func.now())
+
+
+# ===== трейдинг =====
+
+class PositionStatus(str, enum.Enum):
+    OPEN = "OPEN"
+    CLOSED = "CLOSED"
+
+class Side(str, enum.Enum):
+    LONG = "LONG"
+    SHORT = "SHORT"
+
+class OrderType(str, enum.Enum):
+    MARKET = "MARKET"
+    LIMIT = "LIMIT"
+    STOP_MARKET = "STOP_MARKET"
+
+class OrderStatus(str, enum.Enum):
+    NEW = "NEW"
+    PARTIALLY_FILLED = "PARTIALLY_FILLED"
+    FILLED = "FILLED"
+    CANCELED = "CANCELED"
+    REJECTED = "REJECTED"
+    EXPIRED = "EXPIRED"
+
+
+class Position(Base):
+    __tablename__ = "positions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    symbol = Column(String(32), nullable=False)
+    exchange = Column(String(32), nullable=False, default="binance")
+    strategy = Column(String(64), nullable=False)
+    strategy_version = Column(String(32))
+    status = Column(Enum(PositionStatus), nullable=False, default=PositionStatus.OPEN)
+    side = Column(Enum(Side), nullable=False)
+    qty = Column(Numeric(28, 10), nullable=False)
+    entry_price = Column(Numeric(28, 10))
+    stop_price = Column(Numeric(28, 10))
+    tp1_price = Column(Numeric(28, 10))
+    opened_at = Column(DateTime(timezone=True), nullable=False)
+    closed_at = Column(DateTime(timezone=True))
+    realized_pnl = Column(Numeric(28, 10))
+    fees_paid = Column(Numeric(28, 10))
+    notes = Column(Text)
+
+    __table_args__ = (Index("ix_positions_symbol_strategy_status", "symbol", "strategy", "status"),)
+
+
+class Order(Base):
+    __tablename__ = "orders"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    position_id = Column(Integer, ForeignKey("positions.id", ondelete="SET NULL"))
+    client_order_id = Column(String(64), unique=True, nullable=False)
+    exchange_order_id = Column(String(64))
+    symbol = Column(String(32), nullable=False)
+    side = Column(Enum(Side), nullable=False)
+    type = Column(Enum(OrderType), nullable=False)
+    status = Column(Enum(OrderStatus), nullable=False)
+    price = Column(Numeric(28, 10))
+    stop_price = Column(Numeric(28, 10))
+    qty = Column(Numeric(28, 10), nullable=False)
+    filled_qty = Column(Numeric(28, 10))
+    avg_fill_price = Column(Numeric(28, 10))
+    is_protective = Column(Boolean, default=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True))
+
+
+class Trade(Base):
+    __tablename__ = "trades"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
+    exchange_trade_id = Column(String(64))
+    price = Column(Numeric(28, 10), nullable=False)
+    qty = Column(Numeric(28, 10), nullable=False)
+    fee = Column(Numeric(28, 10))
+    fee_asset = Column(String(16))
+    ts = Column(DateTime(timezone=True), nullable=False)
+
+
+class SignalLog(Base):
+    __tablename__ = "signal_logs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    symbol = Column(String(32), nullable=False)
+    timeframe = Column(String(8), nullable=False)
+    bar_ts = Column(DateTime(timezone=True), nullable=False)
+    strategy = Column(String(64), nullable=False)
+    strategy_version = Column(String(32))
+    ema_fast = Column(Numeric(28, 10))
+    ema_slow = Column(Numeric(28, 10))
+    rsi = Column(Numeric(28, 10))
+    atr = Column(Numeric(28, 10))
+    entry_signal = Column(Boolean, default=False)
+    exit_signal = Column(Boolean, default=False)
+    decided_action = Column(String(8))
+    notes = Column(Text)
+
+
+class DailyPnL(Base):
+    __tablename__ = "daily_pnl"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    account = Column(String(64), nullable=False, default="default")   # ключ стора (стратегия/пара)
+    day = Column(Date, nullable=False)
+    realized_pnl = Column(Numeric(28, 10), default=0)
+    unrealized_pnl = Column(Numeric(28, 10), default=0)
+    equity = Column(Numeric(28, 10))
+    updated_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (UniqueConstraint("account", "day", name="uq_daily_pnl_account_day"),)
+
+
+# состояние core.storage.SqlStore: последний снапшот + журнал изменений после него
+
+class StoreSnapshot(Base):
+    __tablename__ = "store_snapshots"
+
+    key = Column(String(64), primary_key=True)
+    seq = Column(BigInteger, nullable=False)          # последняя операция журнала, вошедшая в снапшот
+    position = Column(Text, nullable=False)           # JSON core.types.Position
+    equity = Column(Float, nullable=False)
+    day_pnl_pct = Column(Float, nullable=False)
+    pnl_day = Column(Date)                            # к какому дню (UTC) относится day_pnl_pct
+    updated_at = Column(DateTime(timezone=True))
+
+
+class StoreJournal(Base):
+    __tablename__ = "store_journal"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    key = Column(String(64), nullable=False)
+    seq = Column(BigInteger, nullable=False)
+    kind = Column(String(16), nullable=False)         # position | equity | day_pnl | fill
+    payload = Column(Text, nullable=False)            # JSON
+    ts = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (UniqueConstraint("key", "seq", name="uq_store_journal_key_seq"),)
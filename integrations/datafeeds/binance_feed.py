@@ -3,9 +3,10 @@ from __future__ import annotations
 import time, requests
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Dict, Iterable, List, Any
+from typing import Dict, Iterable, List, Any, AsyncIterator
 
 from core.interfaces import AbstractMarketDataFeed
+from core.tracing import TRACER
 
 TF_TO_INTERVAL_SEC = {
     "1m": 60, "3m": 180, "5m": 300, "15m": 900, "30m": 1800,
@@ -51,6 +52,13 @@ class BinanceMarketDataFeed(AbstractMarketDataFeed):
             })
         return bars
 
+    async def astream(self, **kw) -> AsyncIterator[Dict[str, Any]]:
+        """Закрытые бары через WebSocket (k.x == true) — без опроса REST. kw → BinanceKlineStream."""
+        from integrations.datafeeds.binance_ws import BinanceKlineStream
+        ws = BinanceKlineStream([(self.pair, self.timeframe)], testnet=self.testnet, **kw)
+        async for _pair, _tf, bar in ws.stream():
+            yield bar
+
     def stream(self) -> Iterable[Dict[str, Any]]:
         poll = max(5, TF_TO_INTERVAL_SEC.get(self.timeframe, 60) // 4)
         while True:
@@ -59,6 +67,8 @@ class BinanceMarketDataFeed(AbstractMarketDataFeed):
                 open_ms = int(last[0])
                 if open_ms != self._last_stream_open_ms:
                     self._last_stream_open_ms = open_ms
+                    # новый бар открылся = прошлый закрылся в open_ms; задержку опроса видно здесь
+                    TRACER.record("bar_delay", self.pair, time.time_ns() - open_ms * 1_000_000)
                     yield {
                         "ts": datetime.fromtimestamp(open_ms / 1000, tz=timezone.utc),
                         "open": float(last[1]),
@@ -0,0 +1,119 @@
+# integrations/datafeeds/binance_history.py
+from __future__ import annotations
+import time, requests
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from requests.adapters import HTTPAdapter
+
+from core.bar_store import COLUMNS, BarStore
+from integrations.datafeeds.binance_feed import TF_TO_INTERVAL_SEC, _base_url, _to_symbol
+from utils.rate_limit import TokenBucket
+
+PAGE_LIMIT = 1000
+KLINES_WEIGHT = 2          # вес /v3/klines при limit 101..1000
+WEIGHT_PER_MINUTE = 6000   # лимит REQUEST_WEIGHT у Binance spot
+
+
+def _parse_page(rows: List[List[Any]]) -> Dict[str, np.ndarray]:
+    # один numpy-вызов на страницу вместо float()/datetime на каждое поле
+    if not rows:
+        # типы как у непустой страницы: иначе concatenate поднимет ts до float64
+        return {**{c: np.empty(0, dtype=dt) for c, dt in COLUMNS.items()}, "close_ts": np.empty(0, dtype=np.int64)}
+    raw = np.array([r[:7] for r in rows], dtype=np.float64)
+    return {
+        "ts": raw[:, 0].astype(np.int64),
+        "open": raw[:, 1], "high": raw[:, 2], "low": raw[:, 3],
+        "close": raw[:, 4], "volume": raw[:, 5],
+        "close_ts": raw[:, 6].astype(np.int64),
+    }
+
+
+@dataclass
+class BinanceHistoryLoader:
+    """
+    Массовая загрузка свечей: страницы по startTime/endTime качаются параллельно
+    под бюджетом веса запросов и складываются в BarStore. Повторный sync()
+    докачивает только хвост после последнего сохранённого бара.
+    """
+    store: BarStore = field(default_factory=BarStore)
+    testnet: bool = True
+    max_workers: int = 8
+    budget_share: float = 0.5   # какую часть минутного веса можно съесть (остальное — торговле)
+
+    def __post_init__(self):
+        self._base = _base_url(self.testnet)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        per_min = WEIGHT_PER_MINUTE * self.budget_share
+        self._budget = TokenBucket(rate=per_min / 60.0, capacity=per_min / 10.0)
+
+    def _get_page(self, symbol: str, timeframe: str, start_ms: int, end_ms: int) -> List[List[Any]]:
+        params = {"symbol": symbol, "interval": timeframe, "startTime": start_ms,
+                  "endTime": end_ms, "limit": PAGE_LIMIT}
+        for attempt in range(5):
+            self._budget.acquire(KLINES_WEIGHT)
+            r = self._session.get(f"{self._base}/v3/klines", params=params, timeout=15)
+            if r.status_code in (418, 429):
+                retry = float(r.headers.get("Retry-After", 2 ** attempt))
+                self._budget.drain(retry)
+                continue
+            r.raise_for_status()
+            return r.json()
+        raise RuntimeError(f"Binance klines rate limited: {symbol} {timeframe} @ {start_ms}")
+
+    def fetch(self, pair: str, timeframe: str, start_ms: int, end_ms: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Закрытые бары [start_ms, end_ms] одним набором колонок (ts — open time в ms)."""
+        step = TF_TO_INTERVAL_SEC[timeframe] * 1000
+        now_ms = int(time.time() * 1000)
+        end_ms = min(end_ms or now_ms, now_ms)
+        # границы страниц известны заранее → можно качать все сразу, а не цепочкой
+        starts = list(range(start_ms - start_ms % step, end_ms + 1, step * PAGE_LIMIT))
+        if not starts:
+            return _parse_page([])
+        symbol = _to_symbol(pair)
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(starts))) as ex:
+            pages = list(ex.map(
+                lambda s: _parse_page(self._get_page(symbol, timeframe, s, min(s + step * PAGE_LIMIT - 1, end_ms))),
+                starts,
+            ))
+        cols = {c: np.concatenate([p[c] for p in pages]) for c in pages[0]}
+        closed = (cols["close_ts"] < now_ms) & (cols["ts"] >= start_ms)
+        return {c: v[closed] for c, v in cols.items() if c != "close_ts"}
+
+    def sync(self, pair: str, timeframe: str, start_ms: int, end_ms: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Докачать недостающий хвост в кэш и вернуть всю историю из кэша (memmap).
+        Если кэш кончается раньше start_ms, качается только [start_ms, ...] — в кэше остаётся разрыв.
+        """
+        last = self.store.last_ts(pair, timeframe)
+        step = TF_TO_INTERVAL_SEC[timeframe] * 1000
+        since = start_ms if last is None else max(start_ms, last + step)
+        if since <= (end_ms or int(time.time() * 1000)) - step:
+            self.store.append(pair, timeframe, self.fetch(pair, timeframe, since, end_ms))
+        return self.store.load(pair, timeframe)
+
+    def history(self, pair: str, timeframe: str, limit: int = 500) -> List[Dict[str, Any]]:
+        """Последние limit закрытых баров через кэш — в формате BinanceMarketDataFeed.history()."""
+        step = TF_TO_INTERVAL_SEC[timeframe] * 1000
+        now_ms = int(time.time() * 1000)
+        start_ms = now_ms - now_ms % step - limit * step
+        cols = self.sync(pair, timeframe, start_ms)
+        if len(cols["ts"]) and int(cols["ts"][0]) > start_ms:
+            # кэш начинается позже (прошлый запуск просил меньше баров) — голову докачиваем мимо кэша
+            head = self.fetch(pair, timeframe, start_ms, int(cols["ts"][0]) - 1)
+            cols = {c: np.concatenate([head[c], cols[c]]) for c in COLUMNS}
+        first = int(np.searchsorted(cols["ts"], start_ms))
+        first = max(first, len(cols["ts"]) - limit)
+        return [
+            {
+                "ts": datetime.fromtimestamp(int(t) / 1000, tz=timezone.utc),
+                "open": float(o), "high": float(h), "low": float(l), "close": float(c), "volume": float(v),
+            }
+            for t, o, h, l, c, v in zip(*(cols[c][first:] for c in COLUMNS))
+        ]
@@ -0,0 +1,152 @@
+# integrations/datafeeds/binance_ws.py
+from __future__ import annotations
+import asyncio, json, time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+from core.tracing import TRACER
+
+def _to_symbol(pair: str) -> str:
+    return pair.replace("/", "").upper()
+
+def _ws_base_url(testnet: bool) -> str:
+    return "wss://stream.testnet.binance.vision" if testnet else "wss://stream.binance.com:9443"
+
+def _rest_base_url(testnet: bool) -> str:
+    return "https://testnet.binance.vision/api" if testnet else "https://api.binance.com/api"
+
+def _bar(open_ms: int, o, h, l, c, v) -> Dict[str, Any]:
+    # тот же формат, что у BinanceMarketDataFeed.history()
+    return {
+        "ts": datetime.fromtimestamp(open_ms / 1000, tz=timezone.utc),
+        "open": float(o),
+        "high": float(h),
+        "low": float(l),
+        "close": float(c),
+        "volume": float(v),
+    }
+
+
+class BinanceKlineStream:
+    """
+    Закрытые свечи по многим (pair, timeframe) через одно combined-WS соединение.
+    Бар отдаётся по событию kline с k.x == true (сразу на закрытии, без опроса REST).
+    После переподключения пропущенные бары догружаются через /v3/klines (страницами, до текущей свечи).
+    start_after — open_ms последнего бара, который у вызывающего уже есть (например из history()):
+    тогда разрыв между history() и WS догружается уже при первом подключении.
+
+        async for pair, tf, bar in BinanceKlineStream([("ETH/USDT", "1m"), ("BTC/USDT", "1m")]).stream():
+            ...
+    """
+
+    def __init__(
+        self,
+        subscriptions: Iterable[Tuple[str, str]],
+        testnet: bool = True,
+        ws_base: Optional[str] = None,
+        rest_base: Optional[str] = None,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+        start_after: Optional[Dict[Tuple[str, str], int]] = None,
+        backfill_limit: int = 1000,
+    ):
+        self.subscriptions: List[Tuple[str, str]] = list(dict.fromkeys(subscriptions))
+        self.ws_base = ws_base or _ws_base_url(testnet)
+        self.rest_base = rest_base or _rest_base_url(testnet)
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        # (SYMBOL, interval) → pair
+        self._pairs = {(_to_symbol(p), tf): p for p, tf in self.subscriptions}
+        self.backfill_limit = backfill_limit
+        start_after = start_after or {}
+        self._last_open_ms: Dict[Tuple[str, str], int] = {key: int(start_after.get(key, 0)) for key in self.subscriptions}
+        self.reconnects = 0
+        self.rest_calls = 0
+
+    @property
+    def url(self) -> str:
+        streams = "/".join(f"{_to_symbol(p).lower()}@kline_{tf}" for p, tf in self.subscriptions)
+        return f"{self.ws_base}/stream?streams={streams}"
+
+    def _accept(self, pair: str, tf: str, open_ms: int) -> bool:
+        # бары, уже отданные из backfill, по WS не дублируем
+        key = (pair, tf)
+        if open_ms <= self._last_open_ms[key]:
+            return False
+        self._last_open_ms[key] = open_ms
+        return True
+
+    def _parse(self, raw: str) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        msg = json.loads(raw)
+        data = msg.get("data", msg)
+        if data.get("e") != "kline":
+            return None
+        k = data["k"]
+        if not k.get("x"):
+            return None  # свеча ещё открыта
+        pair = self._pairs.get((k["s"], k["i"]))
+        if pair is None:
+            return None
+        open_ms = int(k["t"])
+        if not self._accept(pair, k["i"], open_ms):
+            return None
+        # закрытие свечи на бирже (k.T — последняя ms) → событие у нас; стенные часы, NTP важен
+        TRACER.record("bar_delay", pair, time.time_ns() - (int(k["T"]) + 1) * 1_000_000)
+        return pair, k["i"], _bar(open_ms, k["o"], k["h"], k["l"], k["c"], k["v"])
+
+    async def _klines(self, session: aiohttp.ClientSession, pair: str, tf: str, start_ms: int) -> List[list]:
+        params = {"symbol": _to_symbol(pair), "interval": tf, "startTime": start_ms, "limit": self.backfill_limit}
+        self.rest_calls += 1
+        async with session.get(f"{self.rest_base}/v3/klines", params=params,
+                               timeout=aiohttp.ClientTimeout(total=15)) as r:
+            r.raise_for_status()
+            return await r.json()
+
+    async def _backfill(self, session: aiohttp.ClientSession) -> AsyncIterator[Tuple[str, str, Dict[str, Any]]]:
+        now_ms = int(time.time() * 1000)
+        for pair, tf in self.subscriptions:
+            if not self._last_open_ms[(pair, tf)]:
+                continue  # ещё ничего не отдавали — догружать нечего, history() на стороне вызывающего
+            # страницами по backfill_limit, пока не дошли до текущей (незакрытой) свечи
+            while True:
+                start = self._last_open_ms[(pair, tf)]
+                try:
+                    klines = await self._klines(session, pair, tf, start + 1)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    print(f"[FEED] backfill error {pair} {tf}: {e}")
+                    break
+                caught_up = len(klines) < self.backfill_limit
+                for k in klines:
+                    open_ms, close_ms = int(k[0]), int(k[6])
+                    if close_ms >= now_ms:
+                        caught_up = True
+                        break  # незакрытая свеча придёт по WS
+                    if self._accept(pair, tf, open_ms):
+                        yield pair, tf, _bar(open_ms, k[1], k[2], k[3], k[4], k[5])
+                if caught_up or self._last_open_ms[(pair, tf)] == start:
+                    break  # вторая проверка — защита от зацикливания на странице без новых баров
+
+    async def stream(self) -> AsyncIterator[Tuple[str, str, Dict[str, Any]]]:
+        delay = self.reconnect_delay
+        async with aiohttp.ClientSession() as session:
+            while True:
+                try:
+                    async with session.ws_connect(self.url, heartbeat=30) as ws:
+                        delay = self.reconnect_delay
+                        # WS уже подключён и буферизует события, пока догружаем пропуск
+                        async for ev in self._backfill(session):
+                            yield ev
+                        async for msg in ws:
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                ev = self._parse(msg.data)
+                                if ev is not None:
+                                    yield ev
+                            elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                                break
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    print(f"[FEED] ws error: {e}")
+                self.reconnects += 1
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
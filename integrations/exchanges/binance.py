@@ -1,10 +1,14 @@
 # integrations/exchanges/binance.py
 from __future__ import annotations
-import os, time, hmac, hashlib, math, requests
+import os, time, hmac, hashlib, json, asyncio, threading, requests
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from decimal import Decimal, ROUND_DOWN
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
-from core.interfaces import AbstractExchangeAdapter
+from requests.adapters import HTTPAdapter
+
+from core.interfaces import AbstractExchangeAdapter, AsyncAbstractExchangeAdapter
+from core.metrics import LatencyRegistry
 
 def _to_symbol(pair: str) -> str:
     return pair.replace("/", "").upper()
@@ -12,17 +16,139 @@ def _to_symbol(pair: str) -> str:
 def _base_url(testnet: bool) -> str:
     return "https://testnet.binance.vision/api" if testnet else "https://api.binance.com/api"
 
+# вес запросов spot API (остальное — 1)
+_WEIGHTS = {
+    ("GET", "/v3/exchangeInfo"): 20,
+    ("GET", "/v3/order"): 4,
+    ("GET", "/v3/openOrders"): 6,
+    ("GET", "/v3/account"): 20,
+}
+_ORDER_PATHS = {("POST", "/v3/order"), ("POST", "/v3/order/oco")}
+
+
+_DEFAULT_STEP = Decimal("0.000001")
+
+
+@dataclass(frozen=True)
+class SymbolFilters:
+    """LOT_SIZE / PRICE_FILTER / NOTIONAL одного символа, уже разобранные в Decimal."""
+    symbol: str
+    step_size: Decimal = Decimal(0)
+    tick_size: Decimal = Decimal(0)
+    min_qty: Decimal = Decimal(0)
+    min_notional: Decimal = Decimal(0)
+    fetched_at: float = 0.0
+
+    @classmethod
+    def from_symbol_info(cls, info: Dict[str, Any], fetched_at: float = 0.0) -> "SymbolFilters":
+        kw: Dict[str, Decimal] = {}
+        for f in info.get("filters", []):
+            if f["filterType"] == "LOT_SIZE":
+                kw["step_size"] = Decimal(f["stepSize"])
+                kw["min_qty"] = Decimal(f.get("minQty", "0"))
+            elif f["filterType"] == "PRICE_FILTER":
+                kw["tick_size"] = Decimal(f["tickSize"])
+            elif f["filterType"] in ("NOTIONAL", "MIN_NOTIONAL"):
+                kw["min_notional"] = Decimal(f.get("minNotional", f.get("notional", "0")))
+        return cls(symbol=info["symbol"], fetched_at=fetched_at, **kw)
+
+    @staticmethod
+    def _floor(value: Decimal, step: Decimal) -> Decimal:
+        return (value / step).to_integral_value(rounding=ROUND_DOWN) * step
+
+    def normalize(self, qty: float, price: Optional[float] = None) -> Dict[str, float]:
+        """
+        qty вниз по stepSize, price вниз по tickSize. Если после округления qty < minQty
+        или (при известной цене) qty·price < minNotional — qty = 0: такой ордер биржа отклонит, слать нечего.
+        """
+        q = self._floor(Decimal(repr(qty)), self.step_size or _DEFAULT_STEP)
+        p = price
+        if p is not None and self.tick_size:
+            p = float(self._floor(Decimal(repr(p)), self.tick_size))
+        if q < self.min_qty or (p and Decimal(repr(p)) * q < self.min_notional):
+            q = Decimal(0)
+        return {"qty": float(q), "price": p}
+
+
+class BinanceRateLimits:
+    """
+    Следит за X-MBX-USED-WEIGHT-1M / X-MBX-ORDER-COUNT-* из ответов и заранее
+    притормаживает запросы, пока не откроется следующее окно, — вместо 429/418 и бана IP.
+    """
+
+    def __init__(self, weight_limit: int = 6000, orders_10s: int = 100, orders_1d: int = 200_000,
+                 headroom: float = 0.9):
+        self.weight_limit, self.orders_10s, self.orders_1d = weight_limit, orders_10s, orders_1d
+        self.headroom = headroom
+        self.used_weight = 0
+        self.order_count_10s = 0
+        self.order_count_1d = 0
+        self._weight_window = 0      # минута, к которой относится used_weight
+        self._order_window = 0       # 10-секундное окно
+        self._blocked_until = 0.0    # после 429/418 (Retry-After)
+        self._lock = threading.Lock()
+
+    def wait_time(self, method: str, path: str, now: Optional[float] = None) -> float:
+        """Сколько подождать перед запросом (0 — можно сразу); заодно резервирует вес."""
+        now = time.time() if now is None else now
+        weight = _WEIGHTS.get((method, path), 1)
+        is_order = (method, path) in _ORDER_PATHS
+        with self._lock:
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            minute, tens = int(now // 60), int(now // 10)
+            if minute != self._weight_window:
+                self._weight_window, self.used_weight = minute, 0
+            if tens != self._order_window:
+                self._order_window, self.order_count_10s = tens, 0
+            if self.used_weight + weight > self.weight_limit * self.headroom:
+                return (minute + 1) * 60 - now
+            if is_order and self.order_count_10s + 1 > self.orders_10s * self.headroom:
+                return (tens + 1) * 10 - now
+            if is_order and self.order_count_1d + 1 > self.orders_1d:
+                raise RuntimeError("Binance daily order limit reached")
+            self.used_weight += weight
+            if is_order:
+                self.order_count_10s += 1
+                self.order_count_1d += 1
+            return 0.0
+
+    def update(self, status: int, headers, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        with self._lock:
+            for k, v in headers.items():
+                k = k.upper()
+                if k == "X-MBX-USED-WEIGHT-1M":
+                    self.used_weight, self._weight_window = int(v), int(now // 60)
+                elif k == "X-MBX-ORDER-COUNT-10S":
+                    self.order_count_10s, self._order_window = int(v), int(now // 10)
+                elif k == "X-MBX-ORDER-COUNT-1D":
+                    self.order_count_1d = int(v)
+            if status in (418, 429):
+                retry = float(headers.get("Retry-After", 60))
+                self._blocked_until = max(self._blocked_until, now + retry)
+
 @dataclass
 class BinanceExchangeAdapter(AbstractExchangeAdapter):
     api_key: str = os.getenv("BINANCE_API_KEY", "")
     api_secret: str = os.getenv("BINANCE_API_SECRET", "")
     testnet: bool = (os.getenv("BINANCE_TESTNET", "true").lower() == "true")
+    pool_size: int = 10
+    filters_ttl: float = 3600.0   # сек; после — фоновое обновление, старые фильтры пока в ходу
 
     def __post_init__(self):
         if not self.api_key or not self.api_secret:
             raise RuntimeError("BINANCE_API_KEY / BINANCE_API_SECRET are required")
         self._base = _base_url(self.testnet)
-        self._exchange_info_cache: Dict[str, Any] = {}
+        self._filters: Dict[str, SymbolFilters] = {}
+        self._filters_refreshing: set = set()
+        self._filters_lock = threading.Lock()
+        # keep-alive: TCP+TLS рукопожатие один раз, дальше ордера идут по тёплому соединению
+        self._session = requests.Session()
+        self._session.headers.update(self._headers())
+        self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size))
+        self.limits = BinanceRateLimits()
+        self.latency = LatencyRegistry()   # по эндпоинтам: "POST /v3/order" → гистограмма
 
     # ---- helpers ----
     def _headers(self) -> Dict[str, str]:
@@ -31,80 +157,173 @@ class BinanceExchangeAdapter(AbstractExchangeAdapter):
     def _sign(self, qs: str) -> str:
         return hmac.new(self.api_secret.encode(), qs.encode(), hashlib.sha256).hexdigest()
 
-    def _req(self, method: str, path: str, params: Dict[str, Any], signed: bool = False) -> Dict[str, Any]:
+    def _prepare(self, path: str, params: Dict[str, Any], signed: bool) -> Tuple[str, Optional[Dict[str, Any]]]:
         if signed:
             params = {**params, "timestamp": int(time.time() * 1000), "recvWindow": 5000}
             qs = "&".join(f"{k}={params[k]}" for k in sorted(params.keys()) if params[k] is not None)
             sig = self._sign(qs)
-            url = f"{self._base}{path}?{qs}&signature={sig}"
-            r = requests.request(method, url, headers=self._headers(), timeout=15)
-        else:
-            url = f"{self._base}{path}"
-            r = requests.request(method, url, params=params, headers=self._headers(), timeout=15)
+            return f"{self._base}{path}?{qs}&signature={sig}", None
+        return f"{self._base}{path}", params
+
+    def _req(self, method: str, path: str, params: Dict[str, Any], signed: bool = False) -> Dict[str, Any]:
+        while True:
+            wait = self.limits.wait_time(method, path)
+            if wait <= 0:
+                break
+            time.sleep(wait)
+        url, query = self._prepare(path, params, signed)
+        t0 = time.perf_counter_ns()
+        r = self._session.request(method, url, params=query, timeout=15)
+        self.latency.record(f"{method} {path}", time.perf_counter_ns() - t0)
+        self.limits.update(r.status_code, r.headers)
         try:
             r.raise_for_status()
         except Exception:
             raise RuntimeError(f"Binance error [{r.status_code}]: {r.text}")
         return r.json()
 
-    def _exchange_info(self, symbol: str) -> Dict[str, Any]:
-        if not self._exchange_info_cache:
-            info = self._req("GET", "/v3/exchangeInfo", {}, signed=False)
-            for s in info.get("symbols", []):
-                self._exchange_info_cache[s["symbol"]] = s
-        return self._exchange_info_cache[symbol]
+    def _fetch_filters(self, symbols: Iterable[str]) -> List[SymbolFilters]:
+        # exchangeInfo только по нужным символам: килобайты вместо мегабайтов полного ответа
+        symbols = list(symbols)
+        params = {"symbol": symbols[0]} if len(symbols) == 1 else {"symbols": json.dumps(symbols, separators=(",", ":"))}
+        info = self._req("GET", "/v3/exchangeInfo", params, signed=False)
+        now = time.time()
+        out = [SymbolFilters.from_symbol_info(s, now) for s in info.get("symbols", [])]
+        with self._filters_lock:
+            for f in out:
+                self._filters[f.symbol] = f
+        return out
 
-    @staticmethod
-    def _round_step(value: float, step: float) -> float:
-        if step == 0:
-            return value
-        return math.floor(value / step) * step
+    def _refresh_in_background(self, symbol: str) -> None:
+        with self._filters_lock:
+            if symbol in self._filters_refreshing:
+                return
+            self._filters_refreshing.add(symbol)
+
+        def run():
+            try:
+                self._fetch_filters([symbol])
+            except Exception as e:
+                print(f"[BINANCE] filters refresh failed for {symbol}: {e}")
+            finally:
+                with self._filters_lock:
+                    self._filters_refreshing.discard(symbol)
+        threading.Thread(target=run, daemon=True).start()
+
+    def symbol_filters(self, symbol: str) -> SymbolFilters:
+        f = self._filters.get(symbol)
+        if f is None:
+            return self._fetch_filters([symbol])[0]
+        if time.time() - f.fetched_at > self.filters_ttl:
+            self._refresh_in_background(symbol)
+        return f
+
+    def prefetch_filters(self, pairs: Iterable[str]) -> None:
+        """Прогреть фильтры на старте, чтобы первый ордер не ждал exchangeInfo."""
+        symbols = [_to_symbol(p) for p in pairs]
+        if symbols:
+            self._fetch_filters(symbols)
 
     def _normalize_qty_price(self, symbol: str, qty: float, price: Optional[float] = None) -> Dict[str, float]:
-        info = self._exchange_info(symbol)
-        qty_step = 0.0
-        tick_size = 0.0
-        min_notional = 0.0
-        for f in info.get("filters", []):
-            if f["filterType"] == "LOT_SIZE":
-                qty_step = float(f["stepSize"])
-            elif f["filterType"] == "PRICE_FILTER":
-                tick_size = float(f["tickSize"])
-            elif f["filterType"] in ("NOTIONAL", "MIN_NOTIONAL"):
-                min_notional = float(f.get("minNotional", f.get("notional", 0)))
-        q = self._round_step(qty, qty_step or 1e-6)
-        p = price
-        if p is not None and tick_size:
-            p = self._round_step(p, tick_size)
-        if p and q and p * q < (min_notional or 0):
-            raise ValueError(f"Order notional too small: {p*q} < {min_notional}")
-        return {"qty": q, "price": p}
+        return self.symbol_filters(symbol).normalize(qty, price)
 
     # ---- public api ----
-    def buy_market(self, pair: str, qty: float, client_order_id: Optional[str] = None) -> Dict[str, Any]:
+    def _market_params(self, side: str, pair: str, qty: float, client_order_id: Optional[str]) -> Dict[str, Any]:
         symbol = _to_symbol(pair)
         norm = self._normalize_qty_price(symbol, qty)
-        params = {
-            "symbol": symbol, "side": "BUY", "type": "MARKET",
+        if norm["qty"] <= 0:
+            # не тратим запрос и order count на заведомый -1013; minNotional рыночного ордера биржа
+            # проверяет по своей средней цене — локально цены нет, тут только LOT_SIZE
+            raise ValueError(f"Order quantity {qty} below LOT_SIZE minQty for {symbol}")
+        return {
+            "symbol": symbol, "side": side, "type": "MARKET",
             "quantity": f"{norm['qty']:.8f}",
-            "newClientOrderId": client_order_id or f"BUY:{symbol}:{int(time.time())}"
+            "newClientOrderId": client_order_id or f"{side}:{symbol}:{int(time.time())}",
+            "newOrderRespType": "FULL",   # статус/исполнение сразу в ответе → OrderTracker.on_order_response
         }
-        return self._req("POST", "/v3/order", params, signed=True)
+
+    def buy_market(self, pair: str, qty: float, client_order_id: Optional[str] = None) -> Dict[str, Any]:
+        return self._req("POST", "/v3/order", self._market_params("BUY", pair, qty, client_order_id), signed=True)
 
     def sell_market(self, pair: str, qty: float, client_order_id: Optional[str] = None) -> Dict[str, Any]:
-        symbol = _to_symbol(pair)
-        norm = self._normalize_qty_price(symbol, qty)
-        params = {
-            "symbol": symbol, "side": "SELL", "type": "MARKET",
-            "quantity": f"{norm['qty']:.8f}",
-            "newClientOrderId": client_order_id or f"SELL:{symbol}:{int(time.time())}"
-        }
-        return self._req("POST", "/v3/order", params, signed=True)
+        return self._req("POST", "/v3/order", self._market_params("SELL", pair, qty, client_order_id), signed=True)
 
     def cancel_order(self, pair: str, order_id: str) -> Dict[str, Any]:
         symbol = _to_symbol(pair)
         return self._req("DELETE", "/v3/order", {"symbol": symbol, "orderId": order_id}, signed=True)
 
-    def get_order(self, pair: str, order_id: str) -> Dict[str, Any]:
-        symbol = _to_symbol(pair)
-        return self._req("GET", "/v3/order", {"symbol": symbol, "orderId": order_id}, signed=True)
+    @staticmethod
+    def _order_query(pair: str, order_id: Optional[str], client_order_id: Optional[str]) -> Dict[str, Any]:
+        if order_id is None and client_order_id is None:
+            raise ValueError("order_id or client_order_id is required")
+        if order_id is not None:
+            return {"symbol": _to_symbol(pair), "orderId": order_id}
+        return {"symbol": _to_symbol(pair), "origClientOrderId": client_order_id}
+
+    def get_order(self, pair: str, order_id: Optional[str] = None, client_order_id: Optional[str] = None) -> Dict[str, Any]:
+        return self._req("GET", "/v3/order", self._order_query(pair, order_id, client_order_id), signed=True)
+
+
+@dataclass
+class AsyncBinanceExchangeAdapter(BinanceExchangeAdapter, AsyncAbstractExchangeAdapter):
+    """
+    Тот же адаптер на aiohttp: один пул keep-alive соединений на процесс,
+    ордера по нескольким парам идут параллельно, не блокируя event loop.
+    place_orders()/cancel_orders() — из AsyncAbstractExchangeAdapter (у spot нет batch-эндпоинта,
+    поэтому пачка — это параллельные запросы по тёплым соединениям).
+    Закрывать через `await adapter.close()`.
+    """
+
+    def __post_init__(self):
+        super().__post_init__()
+        self._aio = None
+
+    def _aio_session(self):
+        import aiohttp
+        if self._aio is None or self._aio.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60, ttl_dns_cache=300)
+            self._aio = aiohttp.ClientSession(connector=connector, headers=self._headers())
+        return self._aio
+
+    async def close(self):
+        if self._aio is not None:
+            await self._aio.close()
+        self._session.close()
+
+    async def _areq(self, method: str, path: str, params: Dict[str, Any], signed: bool = False) -> Dict[str, Any]:
+        import aiohttp
+        while True:
+            wait = self.limits.wait_time(method, path)
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+        url, query = self._prepare(path, params, signed)
+        t0 = time.perf_counter_ns()
+        async with self._aio_session().request(method, url, params=query,
+                                               timeout=aiohttp.ClientTimeout(total=15)) as r:
+            body = await r.text()
+        self.latency.record(f"{method} {path}", time.perf_counter_ns() - t0)
+        self.limits.update(r.status, r.headers)
+        if r.status >= 400:
+            raise RuntimeError(f"Binance error [{r.status}]: {body}")
+        return json.loads(body)
+
+    async def _amarket_params(self, side: str, pair: str, qty: float, client_order_id: Optional[str]) -> Dict[str, Any]:
+        if _to_symbol(pair) not in self._filters:
+            # холодный кэш фильтров грузим вне event loop
+            await asyncio.to_thread(self.symbol_filters, _to_symbol(pair))
+        return self._market_params(side, pair, qty, client_order_id)
+
+    async def buy_market(self, pair: str, qty: float, client_order_id: Optional[str] = None) -> Dict[str, Any]:
+        params = await self._amarket_params("BUY", pair, qty, client_order_id)
+        return await self._areq("POST", "/v3/order", params, signed=True)
+
+    async def sell_market(self, pair: str, qty: float, client_order_id: Optional[str] = None) -> Dict[str, Any]:
+        params = await self._amarket_params("SELL", pair, qty, client_order_id)
+        return await self._areq("POST", "/v3/order", params, signed=True)
+
+    async def cancel_order(self, pair: str, order_id: str) -> Dict[str, Any]:
+        return await self._areq("DELETE", "/v3/order", {"symbol": _to_symbol(pair), "orderId": order_id}, signed=True)
+
+    async def get_order(self, pair: str, order_id: Optional[str] = None, client_order_id: Optional[str] = None) -> Dict[str, Any]:
+        return await self._areq("GET", "/v3/order", self._order_query(pair, order_id, client_order_id), signed=True)
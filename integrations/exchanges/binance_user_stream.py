@@ -0,0 +1,66 @@
+# integrations/exchanges/binance_user_stream.py
+from __future__ import annotations
+import asyncio, json
+from typing import Any, AsyncIterator, Dict, Optional
+
+import aiohttp
+
+def _ws_base_url(testnet: bool) -> str:
+    return "wss://stream.testnet.binance.vision" if testnet else "wss://stream.binance.com:9443"
+
+def _rest_base_url(testnet: bool) -> str:
+    return "https://testnet.binance.vision/api" if testnet else "https://api.binance.com/api"
+
+
+class BinanceUserDataStream:
+    """
+    executionReport/outboundAccountPosition через listenKey.
+    Ключ продлевается каждые 30 минут; при обрыве — новый ключ и переподключение.
+    Ордера, исполненные за время обрыва, стоит сверить через get_order (OrderTracker.open_orders()).
+    """
+
+    KEEPALIVE_SEC = 30 * 60
+
+    def __init__(self, api_key: str, testnet: bool = True,
+                 ws_base: Optional[str] = None, rest_base: Optional[str] = None):
+        self.api_key = api_key
+        self.ws_base = ws_base or _ws_base_url(testnet)
+        self.rest_base = rest_base or _rest_base_url(testnet)
+
+    async def _listen_key(self, session: aiohttp.ClientSession, method: str = "POST", key: str = "") -> str:
+        params = {"listenKey": key} if key else None
+        async with session.request(method, f"{self.rest_base}/v3/userDataStream", params=params,
+                                   headers={"X-MBX-APIKEY": self.api_key}) as r:
+            r.raise_for_status()
+            return (await r.json()).get("listenKey", key)
+
+    async def _keepalive(self, session: aiohttp.ClientSession, key: str):
+        while True:
+            await asyncio.sleep(self.KEEPALIVE_SEC)
+            try:
+                await self._listen_key(session, "PUT", key)
+            except aiohttp.ClientError as e:
+                print(f"[USER STREAM] keepalive error: {e}")
+
+    async def events(self) -> AsyncIterator[Dict[str, Any]]:
+        delay = 1.0
+        async with aiohttp.ClientSession() as session:
+            while True:
+                keepalive = None
+                try:
+                    key = await self._listen_key(session)
+                    keepalive = asyncio.create_task(self._keepalive(session, key))
+                    async with session.ws_connect(f"{self.ws_base}/ws/{key}", heartbeat=30) as ws:
+                        delay = 1.0
+                        async for msg in ws:
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                yield json.loads(msg.data)
+                            elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                                break
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    print(f"[USER STREAM] error: {e}")
+                finally:
+                    if keepalive is not None:
+                        keepalive.cancel()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
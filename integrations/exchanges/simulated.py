@@ -0,0 +1,190 @@
+# integrations/exchanges/simulated.py
+# Бумажная биржа: рыночные ордера исполняются по последнему бару или синтетическому стакану,
+# с комиссией, проскальзыванием и задержкой. Формат ответов и executionReport — как у Binance.
+from __future__ import annotations
+import asyncio, itertools, random, time
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from core.interfaces import AbstractExchangeAdapter, AsyncAbstractExchangeAdapter
+from integrations.exchanges.binance import SymbolFilters, _to_symbol
+
+
+@dataclass
+class SyntheticBook:
+    """
+    Стакан вокруг mid: лучшая цена на half_spread_bps от mid, дальше уровни через level_bps,
+    на каждом level_qty. Средняя цена исполнения qty считается в замкнутой форме (O(1)).
+    """
+    half_spread_bps: float = 1.0
+    level_bps: float = 0.5
+    level_qty: float = 1.0
+
+    def avg_price(self, mid: float, qty: float, side: str) -> float:
+        sign = 1.0 if side == "BUY" else -1.0
+        best = mid * (1.0 + sign * self.half_spread_bps / 1e4)
+        step = sign * self.level_bps / 1e4
+        k, rest = divmod(qty, self.level_qty)
+        # Σ_{i<k} L·best·(1+i·step) + rest·best·(1+k·step)
+        cost = self.level_qty * best * (k + step * k * (k - 1) / 2.0) + rest * best * (1.0 + k * step)
+        return cost / qty
+
+
+@dataclass
+class LatencyModel:
+    """Задержка ответа: base_ms + экспоненциальный хвост со средним jitter_ms."""
+    base_ms: float = 0.0
+    jitter_ms: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        extra = rng.expovariate(1.0 / self.jitter_ms) if self.jitter_ms > 0 else 0.0
+        return (self.base_ms + extra) / 1000.0
+
+
+@dataclass
+class SimulatedExchangeAdapter(AbstractExchangeAdapter):
+    """
+    Рыночные ордера по цене последнего бара пары (on_bar) ± slippage_bps,
+    либо через SyntheticBook (book), если он задан. Комиссия taker_fee_pct берётся в quote.
+    Количество/цена проходят SymbolFilters.normalize — те же правила, что у BinanceExchangeAdapter.
+    Балансы ведутся по активам (BASE/QUOTE); нехватка средств — ошибка, как у биржи.
+    """
+    filters: Dict[str, SymbolFilters] = field(default_factory=dict)   # SYMBOL → фильтры
+    balances: Dict[str, float] = field(default_factory=lambda: {"USDT": 10_000.0})
+    quote_asset: str = "USDT"
+    taker_fee_pct: float = 0.1
+    slippage_bps: float = 0.0
+    book: Optional[SyntheticBook] = None
+    latency: LatencyModel = field(default_factory=LatencyModel)
+    check_balance: bool = True
+    user_stream: Any = None            # LocalUserDataStream: executionReport на каждый fill
+    seed: int = 0
+
+    def __post_init__(self):
+        self._prices: Dict[str, float] = {}
+        self._orders: Dict[Tuple[str, int], Dict[str, Any]] = {}    # (symbol, orderId) -> ответ
+        self._by_client_id: Dict[Tuple[str, str], int] = {}          # (symbol, clientOrderId) -> последний orderId
+        self._ids = itertools.count(1)
+        self._rng = random.Random(self.seed)
+        self.orders_filled = 0
+
+    # ---- рынок ----
+
+    def on_bar(self, pair: str, bar: Mapping[str, Any]) -> None:
+        self._prices[_to_symbol(pair)] = float(bar["close"])
+
+    def set_price(self, pair: str, price: float) -> None:
+        self._prices[_to_symbol(pair)] = price
+
+    def symbol_filters(self, symbol: str) -> SymbolFilters:
+        f = self.filters.get(symbol)
+        if f is None:
+            f = self.filters[symbol] = SymbolFilters(symbol=symbol)
+        return f
+
+    def _base_asset(self, symbol: str) -> str:
+        return symbol[: -len(self.quote_asset)] if symbol.endswith(self.quote_asset) else symbol
+
+    # ---- исполнение ----
+
+    def _fill(self, side: str, pair: str, qty: float, client_order_id: Optional[str]) -> Dict[str, Any]:
+        symbol = _to_symbol(pair)
+        mid = self._prices.get(symbol)
+        if mid is None:
+            raise RuntimeError(f"Simulated exchange [400]: no price for {symbol}")
+        filters = self.symbol_filters(symbol)
+        norm = filters.normalize(qty, mid)
+        q = norm["qty"]
+        if q <= 0:
+            raise RuntimeError(f"Simulated exchange [400]: quantity {qty} below LOT_SIZE/NOTIONAL for {symbol}")
+        if self.book is not None:
+            px = self.book.avg_price(mid, q, side)
+        else:
+            px = mid * (1.0 + (self.slippage_bps if side == "BUY" else -self.slippage_bps) / 1e4)
+        if filters.tick_size:
+            # цена сделки — ближайший тик (floor из normalize тут занижал бы buy на тик из-за float)
+            px = float((Decimal(repr(px)) / filters.tick_size).to_integral_value() * filters.tick_size)
+        quote = px * q
+        fee = quote * self.taker_fee_pct / 100.0
+
+        base = self._base_asset(symbol)
+        bal = self.balances
+        if side == "BUY":
+            if self.check_balance and bal.get(self.quote_asset, 0.0) < quote + fee:
+                raise RuntimeError(f"Simulated exchange [400]: insufficient {self.quote_asset} balance")
+            bal[self.quote_asset] = bal.get(self.quote_asset, 0.0) - quote - fee
+            bal[base] = bal.get(base, 0.0) + q
+        else:
+            if self.check_balance and bal.get(base, 0.0) < q - 1e-12:
+                raise RuntimeError(f"Simulated exchange [400]: insufficient {base} balance")
+            bal[base] = bal.get(base, 0.0) - q
+            bal[self.quote_asset] = bal.get(self.quote_asset, 0.0) + quote - fee
+
+        order_id = next(self._ids)
+        coid = client_order_id or f"sim-{order_id}"
+        now_ms = int(time.time() * 1000)
+        resp = {
+            "symbol": symbol, "orderId": order_id, "clientOrderId": coid, "transactTime": now_ms,
+            "price": "0.00000000", "origQty": f"{q:.8f}", "executedQty": f"{q:.8f}",
+            "cummulativeQuoteQty": f"{quote:.8f}", "status": "FILLED", "type": "MARKET", "side": side,
+            "fills": [{"price": f"{px:.8f}", "qty": f"{q:.8f}", "commission": f"{fee:.8f}",
+                       "commissionAsset": self.quote_asset}],
+        }
+        self._orders[(symbol, order_id)] = resp
+        self._by_client_id[(symbol, coid)] = order_id
+        self.orders_filled += 1
+        if self.user_stream is not None:
+            self.user_stream.publish({
+                "e": "executionReport", "E": now_ms, "s": symbol, "c": coid, "S": side, "o": "MARKET",
+                "q": resp["origQty"], "X": "FILLED", "x": "TRADE", "i": order_id,
+                "l": resp["executedQty"], "z": resp["executedQty"], "L": f"{px:.8f}",
+                "Z": resp["cummulativeQuoteQty"], "n": f"{fee:.8f}", "N": self.quote_asset, "T": now_ms,
+            })
+        return resp
+
+    def buy_market(self, pair: str, qty: float, client_order_id: Optional[str] = None) -> Dict[str, Any]:
+        return self._fill("BUY", pair, qty, client_order_id)
+
+    def sell_market(self, pair: str, qty: float, client_order_id: Optional[str] = None) -> Dict[str, Any]:
+        return self._fill("SELL", pair, qty, client_order_id)
+
+    def get_order(self, pair: str, order_id: Optional[str] = None, client_order_id: Optional[str] = None) -> Dict[str, Any]:
+        # как GET /v3/order: поиск в пределах символа, orderId приоритетнее origClientOrderId
+        if order_id is None and client_order_id is None:
+            raise ValueError("order_id or client_order_id is required")
+        symbol = _to_symbol(pair)
+        if order_id is not None:
+            oid = int(order_id) if str(order_id).isdigit() else None
+        else:
+            oid = self._by_client_id.get((symbol, str(client_order_id)))
+        resp = self._orders.get((symbol, oid))
+        if resp is None:
+            raise RuntimeError(f"Simulated exchange [400]: -2013 Order does not exist ({symbol} {order_id or client_order_id})")
+        return resp
+
+    def cancel_order(self, pair: str, order_id: str) -> Dict[str, Any]:
+        # рыночные ордера исполняются сразу — отменять нечего, как у Binance (-2011)
+        raise RuntimeError(f"Simulated exchange [400]: unknown order {order_id}")
+
+
+class AsyncSimulatedExchangeAdapter(SimulatedExchangeAdapter, AsyncAbstractExchangeAdapter):
+    """Та же биржа для TradingRuntime: ответ приходит через LatencyModel (asyncio.sleep), ордера не блокируют друг друга."""
+
+    async def _afill(self, side: str, pair: str, qty: float, client_order_id: Optional[str]) -> Dict[str, Any]:
+        delay = self.latency.sample(self._rng)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return self._fill(side, pair, qty, client_order_id)
+
+    async def buy_market(self, pair: str, qty: float, client_order_id: Optional[str] = None) -> Dict[str, Any]:
+        return await self._afill("BUY", pair, qty, client_order_id)
+
+    async def sell_market(self, pair: str, qty: float, client_order_id: Optional[str] = None) -> Dict[str, Any]:
+        return await self._afill("SELL", pair, qty, client_order_id)
+
+    async def get_order(self, pair: str, order_id: Optional[str] = None, client_order_id: Optional[str] = None) -> Dict[str, Any]:
+        return SimulatedExchangeAdapter.get_order(self, pair, order_id, client_order_id)
+
+    async def cancel_order(self, pair: str, order_id: str) -> Dict[str, Any]:
+        return SimulatedExchangeAdapter.cancel_order(self, pair, order_id)
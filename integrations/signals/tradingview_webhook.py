@@ -1,12 +1,29 @@
 from __future__ import annotations
 import hmac, hashlib, os, json
-from fastapi import APIRouter, Request, HTTPException
+from fastapi import APIRouter, Depends, Request, HTTPException
 from pydantic import BaseModel, Field
-from datetime import datetime
+from datetime import datetime, timezone
+
+from services.signal_router import Signal, enqueue_signal
 
 router = APIRouter()
 TV_SECRET = os.getenv("TV_WEBHOOK_SECRET", "changeme")
 
+_redis = None
+
+def get_redis():
+    # async-клиент на процесс (пул соединений); в тестах подменяется через app.dependency_overrides
+    global _redis
+    if _redis is None:
+        import redis.asyncio as aioredis
+        _redis = aioredis.Redis(
+            host=os.getenv("REDIS_HOST", "localhost"),
+            port=int(os.getenv("REDIS_PORT", 6379)),
+            db=int(os.getenv("REDIS_DB", 0)),
+            decode_responses=True,
+        )
+    return _redis
+
 class TVPayload(BaseModel):
     symbol: str
     timeframe: str
@@ -23,7 +40,7 @@ def _verify(req: Request, raw_body: bytes):
         raise HTTPException(401, "bad signature")
 
 @router.post("/tv/webhook")
-async def tv_webhook(req: Request):
+async def tv_webhook(req: Request, r=Depends(get_redis)):
     raw = await req.body()
     _verify(req, raw)
     try:
@@ -31,19 +48,17 @@ async def tv_webhook(req: Request):
     except Exception:
         raise HTTPException(400, "bad json")
 
-    # дедуп по (symbol,timeframe,ts,signal)
-    key = f"{payload.symbol}:{payload.timeframe}:{payload.ts}:{payload.signal}"
-    # TODO: Redis SETNX(key, 1) EX 900 → если уже есть — 200 OK и return
-
-    # Отправляем в роутер сигналов
-    from services.signal_router import route_signal
-    route_signal(
+    sig = Signal(
         symbol=payload.symbol.replace("PERP","").replace("BINANCE:",""),  # нормализация
         timeframe=payload.timeframe,
         signal=payload.signal,
         price=payload.price,
-        bar_ts=datetime.fromtimestamp(payload.ts/1000.0),
+        bar_ts=datetime.fromtimestamp(payload.ts/1000.0, tz=timezone.utc),
         source="tradingview",
-        meta={}
+        meta={},
     )
-    return {"ok": True}
+    # дедуп по (symbol,timeframe,ts,signal) + XADD; роутинг делают воркеры services.signal_router
+    msg_id = await enqueue_signal(r, sig, payload.ts)
+    if msg_id is None:
+        return {"ok": True, "duplicate": True}
+    return {"ok": True, "id": msg_id}
@@ -1,5 +1,7 @@
 import os
 import time
+import logging
+import threading
 import requests
 from dotenv import load_dotenv
 
@@ -10,20 +12,20 @@ LWA_CLIENT_SECRET = os.getenv("LWA_CLIENT_SECRET")
 REFRESH_TOKEN = os.getenv("LWA_REFRESH_TOKEN")
 
 TOKEN_ENDPOINT = "https://api.amazon.com/auth/o2/token"
+REFRESH_AHEAD_SEC = 300  # фоновое обновление за 5 минут до истечения
+
+logger = logging.getLogger(__name__)
 
 _cached_token = {
     "access_token": None,
     "expires_at": 0
 }
+_token_lock = threading.Lock()
+_refresher = None
 
 
-def get_access_token() -> str:
-    """Получить или вернуть кэшированный access_token от LWA."""
-
+def _fetch_access_token() -> None:
     now = int(time.time())
-    if _cached_token["access_token"] and _cached_token["expires_at"] > now:
-        return _cached_token["access_token"]
-
     response = requests.post(
         TOKEN_ENDPOINT,
         data={
@@ -34,17 +36,55 @@ def get_access_token() -> str:
         },
         headers={
             "Content-Type": "application/x-www-form-urlencoded"
-        }
+        },
+        timeout=15,
     )
 
     if response.status_code != 200:
         raise Exception(f"Failed to get access token: {response.text}")
 
     data = response.json()
-    access_token = data["access_token"]
-    expires_in = data["expires_in"]
+    _cached_token["access_token"] = data["access_token"]
+    _cached_token["expires_at"] = now + data["expires_in"] - 30  # запас в 30 сек
+
+
+def get_access_token() -> str:
+    """Получить или вернуть кэшированный access_token от LWA."""
+
+    if _cached_token["access_token"] and _cached_token["expires_at"] > time.time():
+        return _cached_token["access_token"]
+    # под локом: при пачке параллельных запросов токен запрашивается один раз
+    with _token_lock:
+        if not (_cached_token["access_token"] and _cached_token["expires_at"] > time.time()):
+            _fetch_access_token()
+        return _cached_token["access_token"]
+
+
+def invalidate_access_token(token: str) -> None:
+    """SP-API отверг токен — сбросить кэш, если его ещё никто не обновил."""
+    with _token_lock:
+        if _cached_token["access_token"] == token:
+            _cached_token["expires_at"] = 0
+
+
+def _refresh_loop() -> None:
+    while True:
+        wait = _cached_token["expires_at"] - REFRESH_AHEAD_SEC - time.time()
+        if wait > 0:
+            time.sleep(min(wait, 60))
+            continue
+        try:
+            with _token_lock:
+                _fetch_access_token()
+        except Exception as e:
+            logger.warning(f"LWA token refresh failed: {e}")
+            time.sleep(10)
 
-    _cached_token["access_token"] = access_token
-    _cached_token["expires_at"] = now + expires_in - 30  # запас в 30 сек
 
-    return access_token
+def start_token_refresher() -> None:
+    """Фоновый поток, который обновляет токен заранее, чтобы запросы не ждали LWA."""
+    global _refresher
+    with _token_lock:
+        if _refresher is None or not _refresher.is_alive():
+            _refresher = threading.Thread(target=_refresh_loop, name="lwa-token-refresher", daemon=True)
+            _refresher.start()
@@ -1,36 +1,29 @@
 # services/amazon/order_api.py
-import os
-import requests
+from typing import Optional
 
-SP_API_BASE = "https://sellingpartnerapi-na.amazon.com"
+from services.amazon.sp_api import get_client
 
-def get_order_details(order_id: str, access_token: str, marketplace_id: str):
-    url = f"{SP_API_BASE}/orders/v0/orders/{order_id}"
-    headers = {
-        "x-amz-access-token": access_token,
-        "Content-Type": "application/json"
-    }
+
+# access_token=None — токен берёт SpApiClient (и обновляет его на 403)
+def get_order_details(order_id: str, marketplace_id: str, access_token: Optional[str] = None):
     params = {
         "MarketplaceIds": marketplace_id
     }
 
-    response = requests.get(url, headers=headers, params=params)
+    response = get_client().request("getOrder", "GET", f"/orders/v0/orders/{order_id}",
+                                    params=params, access_token=access_token)
     response.raise_for_status()
 
     return response.json()
 
 
-def get_order_items_details(order_id: str, access_token: str, marketplace_id: str):
-    url = f"{SP_API_BASE}/orders/v0/orders/{order_id}/orderItems"
-    headers = {
-        "x-amz-access-token": access_token,
-        "Content-Type": "application/json"
-    }
+def get_order_items_details(order_id: str, marketplace_id: str, access_token: Optional[str] = None):
     params = {
         "MarketplaceIds": marketplace_id
     }
 
-    response = requests.get(url, headers=headers, params=params)
+    response = get_client().request("getOrderItems", "GET", f"/orders/v0/orders/{order_id}/orderItems",
+                                    params=params, access_token=access_token)
     response.raise_for_status()
 
-    return response.json()
\ No newline at end of file
+    return response.json()
@@ -0,0 +1,165 @@
+# асинхронный обход отзывов по ASIN: общий aiohttp-пул, лимит параллельности и темпа на хост,
+# пагинация до уже известного отзыва, watermark последнего увиденного отзыва в Redis
+import asyncio
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Set
+from urllib.parse import quote, urlsplit
+
+import aiohttp
+
+from services.amazon.reviews.parser import build_headers, parse_reviews_from_html
+from utils.rate_limit import TokenBucket, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+SCRAPERAPI_KEY = os.getenv("SCRAPERAPI_KEY")
+REVIEWS_PER_PAGE = 10
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def scraperapi_url(asin: str, page: int) -> str:
+    # sortBy=recent — новые сверху, иначе «дойти до известного отзыва» не работает
+    target = f"https://www.amazon.com/product-reviews/{asin}?sortBy=recent&pageNumber={page}"
+    return f"http://api.scraperapi.com/?api_key={SCRAPERAPI_KEY}&url={quote(target, safe='')}"
+
+
+class RedisWatermarks:
+    """asin → id самого свежего обработанного отзыва (один HASH)."""
+
+    def __init__(self, r, key: str = "reviews:watermark"):
+        self.r, self.key = r, key
+
+    def get_many(self, asins: List[str]) -> Dict[str, Optional[str]]:
+        return dict(zip(asins, self.r.hmget(self.key, asins))) if asins else {}
+
+    def set(self, asin: str, review_id: str) -> None:
+        self.r.hset(self.key, asin, review_id)
+
+
+@dataclass
+class CrawlResult:
+    asin: str
+    reviews: List[dict] = field(default_factory=list)   # только новые, от свежих к старым
+    pages: int = 0
+    newest_id: Optional[str] = None                      # кандидат в watermark
+    unchanged: bool = False
+    error: Optional[str] = None
+
+
+class ReviewCrawler:
+    """
+    crawl(asins) отдаёт результаты по мере готовности. Одновременно не больше concurrency ASIN,
+    запросы к одному хосту — не чаще host_rps. Страницы ASIN идут подряд, пока не встретится
+    watermark или отзыв, который known() считает сохранённым (первый обход или пропавший watermark).
+    Watermark двигает commit() — вызывающий зовёт его после того, как сохранил отзывы.
+    """
+
+    def __init__(self, watermarks: Optional[RedisWatermarks] = None,
+                 known: Optional[Callable[[List[str]], Set[str]]] = None,
+                 url_for: Callable[[str, int], str] = scraperapi_url, concurrency: int = 8,
+                 host_rps: float = 5.0, max_pages: int = 10, timeout: float = 70.0, retries: int = 3,
+                 backoff: float = 2.0):
+        self.watermarks = watermarks
+        self.known = known
+        self.url_for = url_for
+        self.concurrency = concurrency
+        self.host_rps = host_rps
+        self.max_pages = max_pages
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self._hosts: Dict[str, TokenBucket] = {}
+
+    def _bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        b = self._hosts.get(host)
+        if b is None:
+            b = self._hosts[host] = TokenBucket(rate=self.host_rps, capacity=max(1.0, self.host_rps))
+        return b
+
+    async def _get(self, session: aiohttp.ClientSession, url: str) -> Optional[str]:
+        bucket = self._bucket(url)
+        for attempt in range(self.retries + 1):
+            await bucket.aacquire()
+            try:
+                async with session.get(url, headers=build_headers()) as r:
+                    if r.status == 404:
+                        return None
+                    if r.status == 200:
+                        return await r.text()
+                    if r.status not in RETRY_STATUSES or attempt == self.retries:
+                        raise RuntimeError(f"status {r.status}")
+                    wait = parse_retry_after(r.headers.get("Retry-After"))
+                    if wait is None:
+                        wait = self.backoff * 2 ** attempt * (0.5 + random.random() / 2)
+                    if r.status == 429:
+                        bucket.drain(wait)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.retries:
+                    raise
+                wait = self.backoff * 2 ** attempt
+                logger.warning(f"Review fetch error {e!r}, retry in {wait:.1f}s")
+            await asyncio.sleep(wait)
+        raise RuntimeError("unreachable")
+
+    async def crawl_asin(self, session: aiohttp.ClientSession, asin: str, watermark: Optional[str]) -> CrawlResult:
+        res = CrawlResult(asin)
+        for page in range(1, self.max_pages + 1):
+            html = await self._get(session, self.url_for(asin, page))
+            res.pages = page
+            if html is None:
+                break
+            # парсинг — CPU, не держим на нём event loop
+            reviews = await asyncio.to_thread(parse_reviews_from_html, html)
+            # у отзыва два ключа: id и legacy_id (хеш, под которым его сохраняли раньше) — совпадение по любому
+            keys = [{r["id"], r.get("legacy_id")} - {None} for r in reviews]
+            if page == 1 and reviews:
+                res.newest_id = reviews[0]["id"]
+                if watermark in keys[0]:
+                    res.unchanged = True
+                    return res
+            stop_at = next((i for i, k in enumerate(keys) if watermark in k), None)
+            # watermark'а нет на странице (первый обход, или отзыв-watermark удалён) — спрашиваем БД
+            if stop_at is None and self.known is not None and keys:
+                seen = await asyncio.to_thread(self.known, [key for k in keys for key in k])
+                stop_at = next((i for i, k in enumerate(keys) if k & seen), None)
+            if stop_at is not None:
+                res.reviews.extend(reviews[:stop_at])
+                return res
+            res.reviews.extend(reviews)
+            if len(reviews) < REVIEWS_PER_PAGE:
+                break
+        return res
+
+    async def crawl(self, asins: Iterable[str]) -> AsyncIterator[CrawlResult]:
+        asins = list(dict.fromkeys(asins))
+        marks = await asyncio.to_thread(self.watermarks.get_many, asins) if self.watermarks else {}
+        sem = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+
+        async with aiohttp.ClientSession(timeout=self.timeout, connector=connector) as session:
+            async def one(asin: str) -> CrawlResult:
+                async with sem:
+                    try:
+                        return await self.crawl_asin(session, asin, marks.get(asin))
+                    except Exception as e:
+                        logger.error(f"Review crawl failed for {asin}: {e}")
+                        return CrawlResult(asin, error=str(e))
+
+            t0 = time.monotonic()
+            tasks = [asyncio.create_task(one(a)) for a in asins]
+            try:
+                for fut in asyncio.as_completed(tasks):
+                    yield await fut
+            finally:
+                for t in tasks:
+                    t.cancel()
+            logger.info(f"Crawled {len(asins)} ASINs in {time.monotonic() - t0:.1f}s")
+
+    def commit(self, res: CrawlResult) -> None:
+        if self.watermarks is not None and res.newest_id and not res.unchanged and not res.error:
+            self.watermarks.set(res.asin, res.newest_id)
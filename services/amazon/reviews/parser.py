@@ -1,14 +1,19 @@
-import json
+import logging
+import re
 from dotenv import load_dotenv
 import requests
-from requests_html import AsyncHTMLSession
 import hashlib
 import random
 import os
+from typing import Iterator, Union
+
+import lxml.html
+from lxml import etree
 
 load_dotenv()
 
 SCRAPERAPI_KEY = os.getenv("SCRAPERAPI_KEY")
+logger = logging.getLogger(__name__)
 
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
@@ -26,47 +31,99 @@ def build_headers():
         "Connection": "keep-alive"
     }
 
-def parse_reviews_from_html(html: str) -> list:
-    print(f"response received: {html}")
-    from bs4 import BeautifulSoup
-    soup = BeautifulSoup(html, "html.parser")
-    review_blocks = soup.select(".review")
-
-    reviews = []
-    for block in review_blocks:
-        title = block.select_one(".review-title span")
-        text = block.select_one(".review-text span")
-        rating = block.select_one(".review-rating span")
-        date = block.select_one(".review-date")
-
-        body = text.text.strip() if text else ''
-        date_str = date.text.strip() if date else ''
-        review_id = hashlib.sha256(f"{body}_{date_str}".encode()).hexdigest()
-
-        reviews.append({
-            'id': review_id,
-            'title': title.text.strip() if title else '',
+
+def _cls(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# XPath компилируются один раз при импорте. Блок отзыва — самый вложенный элемент
+# с data-hook="review" / классом review (Amazon оборачивает <div id="R..."> в <li data-hook="review">).
+_IS_BLOCK = f"(@data-hook='review' or {_cls('review')})"
+_BLOCKS = etree.XPath(f"//*[{_IS_BLOCK} and not(.//*[{_IS_BLOCK}])]")
+_TITLE = etree.XPath(
+    f"normalize-space((.//*[@data-hook='review-title' or {_cls('review-title')}]"
+    f"//span[not(ancestor::i)][normalize-space()])[1])"
+)
+_RATING = etree.XPath(
+    f"normalize-space((.//*[@data-hook='review-star-rating' or @data-hook='cmps-review-star-rating'"
+    f" or {_cls('review-rating')}]//span)[1])"
+)
+_DATE = etree.XPath(f"normalize-space((.//*[@data-hook='review-date' or {_cls('review-date')}])[1])")
+_BODY = etree.XPath(f"(.//*[@data-hook='review-body' or {_cls('review-text')}])[1]")
+# то, что хешировала прежняя версия на BeautifulSoup: первый span в .review-text и .review-date как есть
+_LEGACY_TEXT = etree.XPath(f"(.//*[{_cls('review-text')}]//span)[1]")
+_LEGACY_DATE = etree.XPath(f"(.//*[{_cls('review-date')}])[1]")
+_VERIFIED = etree.XPath("boolean(.//*[@data-hook='avp-badge' or @data-hook='avp-badge-linkless'])")
+_HELPFUL = etree.XPath("normalize-space((.//*[@data-hook='helpful-vote-statement'])[1])")
+_VOTES = re.compile(r"([\d,]+)")
+
+
+def _helpful_votes(statement: str) -> int:
+    if not statement:
+        return 0
+    m = _VOTES.search(statement)
+    if m:
+        return int(m.group(1).replace(",", ""))
+    return 1 if statement.lower().startswith("one") else 0
+
+
+def _legacy_id(block) -> str:
+    # text_content, как .text у bs4, склеивает строки вокруг <br> без перевода строки — до _body_text
+    text, date = _LEGACY_TEXT(block), _LEGACY_DATE(block)
+    body = text[0].text_content().strip() if text else ''
+    date_str = date[0].text_content().strip() if date else ''
+    return hashlib.sha256(f"{body}_{date_str}".encode()).hexdigest()
+
+
+def _body_text(block) -> str:
+    nodes = _BODY(block)
+    if not nodes:
+        return ''
+    node = nodes[0]
+    for br in node.iter("br"):   # <br> → перевод строки, как было у get_text
+        br.tail = "\n" + (br.tail or "")
+    return node.text_content().strip()
+
+
+def iter_reviews(html: Union[str, bytes]) -> Iterator[dict]:
+    """Отзывы со страницы по одному, в порядке документа."""
+    if not html:
+        return
+    doc = lxml.html.fromstring(html)
+    for block in _BLOCKS(doc):
+        # id из DOM (R...); хеш — только для разметки без id. legacy_id — ключ, под которым отзыв
+        # сохраняли раньше (хеш текста и даты): по нему дедуп не считает старые строки новыми
+        legacy_id = _legacy_id(block)
+        body = _body_text(block)
+        date_str = _DATE(block)
+        yield {
+            'id': block.get("id") or legacy_id,
+            'legacy_id': legacy_id,
+            'title': _TITLE(block),
             'text': body,
-            'rating': rating.text.strip() if rating else '',
-            'date': date_str
-        })
+            'rating': _RATING(block),
+            'date': date_str,
+            'verified': _VERIFIED(block),
+            'helpful_votes': _helpful_votes(_HELPFUL(block)),
+        }
 
-    print(f"reviews: {reviews}")
 
+def parse_reviews_from_html(html: str) -> list:
+    reviews = list(iter_reviews(html))
+    logger.debug(f"Parsed {len(reviews)} reviews from {len(html)} bytes of HTML")
     return reviews
 
 def fetch_reviews(asin: str) -> list:
 
     base_url = f"https://www.amazon.com/product-reviews/{asin}"
     api_url = f"http://api.scraperapi.com/?api_key={SCRAPERAPI_KEY}&url={base_url}"
-    print(f"api url: {api_url}")
-    resp = requests.get(api_url)
+    resp = requests.get(api_url, timeout=70)
+
+    logger.info(f"Reviews page for {asin}: status {resp.status_code}, {len(resp.content)} bytes")
 
-    print(f"Status code: {resp.status_code}")
-    
     if resp.status_code == 404:
         return []
     if resp.status_code != 200:
         raise Exception(f"Failed to fetch reviews for {asin}, status {resp.status_code}")
 
-    return parse_reviews_from_html(resp.text)
\ No newline at end of file
+    return parse_reviews_from_html(resp.text)
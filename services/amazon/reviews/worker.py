@@ -1,9 +1,11 @@
 import asyncio
+import html
 import time
-from services.amazon.reviews.parser import fetch_reviews
+from services.amazon.reviews.crawler import CrawlResult, RedisWatermarks, ReviewCrawler
+from cache.redis_client import redis_client
 from database.db import SessionLocal
 from database.db import get_db_session
-from database.crud import review_exists, save_review
+from database.crud import existing_review_ids, save_reviews_bulk
 from database.models import Product, User
 from telegram import Bot
 from dotenv import load_dotenv
@@ -17,6 +19,12 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("review_worker")
 
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+REVIEW_INTERVAL = int(os.getenv("REVIEW_INTERVAL", 3600))           # секунд между началами обходов
+REVIEW_CONCURRENCY = int(os.getenv("REVIEW_CONCURRENCY", 8))        # ASIN одновременно
+REVIEW_HOST_RPS = float(os.getenv("REVIEW_HOST_RPS", 5))            # запросов в секунду на хост
+REVIEW_MAX_PAGES = int(os.getenv("REVIEW_MAX_PAGES", 10))
+TELEGRAM_MAX_LEN = 4096
+REVIEW_TEXT_LIMIT = 600   # в сводке — начало текста; экранирование не раздувает часть сверх лимита
 
 bot = Bot(token=TELEGRAM_TOKEN)
 
@@ -25,44 +33,99 @@ def get_authorized_user_ids():
     with get_db_session() as session:
         users = session.query(User).filter_by(amazon_authorized=True).all()
         return [int(user.telegram_id) for user in users if user.telegram_id]
-    
-def notify_users(message: str, user_ids: list[int]):
-    for uid in user_ids:
+
+
+def get_active_asins() -> list[str]:
+    with get_db_session() as session:
+        rows = session.query(Product.asin).filter(Product.active.isnot(False)).all()
+        return [row.asin for row in rows]
+
+
+def known_review_ids(review_ids: list[str]) -> set[str]:
+    with get_db_session() as session:
+        return existing_review_ids(session, review_ids)
+
+
+async def notify_users(message: str, user_ids: list[int]):
+    async def send(uid: int):
         try:
-            bot.send_message(chat_id=uid, text=message, parse_mode="HTML")
+            await bot.send_message(chat_id=uid, text=message, parse_mode="HTML")
         except Exception as e:
             logger.warning(f"Failed to send message to {uid}: {e}")
+    await asyncio.gather(*(send(uid) for uid in user_ids))
 
-def send_to_telegram(review: dict):
-    authorized_users = get_authorized_user_ids()
-    text = f"🟡 Новый отзыв на товар\n⭐ {review['rating']}\n📌 {review['title']}\n📝 {review['text']}"
-    notify_users(text, authorized_users)
 
-def monitor_asin(asin: str):
-    session = SessionLocal()
-    try:
-        reviews = fetch_reviews(asin)
-        for r in reviews:
-            if review_exists(session, r['id']):
-                break
-            if save_review(session, asin, r):
-                send_to_telegram(r)
-    finally:
-        session.close()
+def _review_text(review: dict) -> str:
+    text = review['text']
+    if len(text) > REVIEW_TEXT_LIMIT:
+        text = text[:REVIEW_TEXT_LIMIT].rstrip() + "…"
+    return (f"⭐ {html.escape(review['rating'])}\n📌 {html.escape(review['title'][:100])}\n"
+            f"📝 {html.escape(text)}")
+
+
+def review_digest(asin: str, reviews: list[dict]) -> list[str]:
+    """Новые отзывы по ASIN одним сообщением (или несколькими, если не влезают в лимит Telegram)."""
+    head = f"🟡 Новые отзывы на товар {html.escape(asin)}: {len(reviews)}"
+    messages, cur = [], head
+    for r in reviews:
+        part = "\n\n" + _review_text(r)
+        if len(cur) + len(part) > TELEGRAM_MAX_LEN:
+            messages.append(cur)
+            cur = head + " (продолжение)"
+        cur += part
+    messages.append(cur)
+    return messages
+
 
-def run_review_monitor():
+async def send_to_telegram(asin: str, reviews: list[dict], user_ids: list[int]):
+    for message in review_digest(asin, reviews):
+        await notify_users(message, user_ids)
+
+
+def save_new_reviews(res: CrawlResult) -> list[dict]:
+    """Одна транзакция на ASIN; возвращает реально добавленные."""
     session = SessionLocal()
     try:
-        products = session.query(Product.asin).all()
-        print(f"products: {products}")
-        asins = [row.asin for row in products]
+        return save_reviews_bulk(session, res.asin, list(reversed(res.reviews)))
     finally:
         session.close()
 
-    for asin in asins:
-        monitor_asin(asin)
-    print(f"Sleep for 3600")
-    time.sleep(3600)
+
+async def run_review_monitor():
+    crawler = ReviewCrawler(
+        watermarks=RedisWatermarks(redis_client), known=known_review_ids,
+        concurrency=REVIEW_CONCURRENCY, host_rps=REVIEW_HOST_RPS, max_pages=REVIEW_MAX_PAGES,
+    )
+    while True:
+        started = time.monotonic()
+        try:
+            asins = await asyncio.to_thread(get_active_asins)
+            user_ids = await asyncio.to_thread(get_authorized_user_ids)
+            unchanged = failed = 0
+            async for res in crawler.crawl(asins):
+                if res.error:
+                    failed += 1
+                    continue
+                if res.unchanged or not res.reviews:
+                    unchanged += 1
+                    crawler.commit(res)
+                    continue
+                # сбой одного ASIN не обрывает проход; watermark не двигаем — на следующем обходе повтор
+                try:
+                    saved = await asyncio.to_thread(save_new_reviews, res)
+                    if saved:
+                        await send_to_telegram(res.asin, saved, user_ids)
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"Review save/notify failed for {res.asin}: {e}")
+                    continue
+                crawler.commit(res)
+            logger.info(f"Review pass: {len(asins)} ASINs, {unchanged} unchanged, {failed} failed")
+        except Exception as e:
+            logger.error(f"Review monitor error: {e}")
+        delay = max(0.0, REVIEW_INTERVAL - (time.monotonic() - started))
+        logger.info(f"Sleep for {delay:.0f}")
+        await asyncio.sleep(delay)
 
 if __name__ == "__main__":
     asyncio.run(run_review_monitor())
@@ -1,27 +1,27 @@
 import os
 import logging
-import requests
-from services.amazon.amazon_client import get_access_token
+from typing import Optional
+from services.amazon.sp_api import get_client
 
-SP_API_BASE = "https://sellingpartnerapi-na.amazon.com"
 logger = logging.getLogger(__name__)
 MARKETPLACE_ID = os.getenv("SP_MARKETPLACE_ID", "ATVPDKIKX0DER")
 
 
-def get_review_eligibility(order_id: str) -> bool:
-    """Return True if review solicitation is available."""
-    url = f"{SP_API_BASE}/solicitations/v1/orders/{order_id}"
+def get_review_eligibility(order_id: str) -> Optional[bool]:
+    """
+    Return True if review solicitation is available, False if it is not (200 without the action, 404),
+    None if the answer is unknown (throttled / 5xx / auth after retries) — such a result must not be cached.
+    """
     params = {"marketplaceIds": MARKETPLACE_ID}
-    headers = {
-        "x-amz-access-token": get_access_token(),
-        "Content-Type": "application/json",
-    }
-    resp = requests.get(url, headers=headers, params=params)
+    resp = get_client().request("getSolicitationActionsForOrder", "GET",
+                                f"/solicitations/v1/orders/{order_id}", params=params)
     logger.info(
         f"Solicitations eligibility response ({resp.status_code}): {resp.text}"
     )
-    if resp.status_code != 200:
+    if resp.status_code == 404:
         return False
+    if resp.status_code != 200:
+        return None
     data = resp.json()
     actions = data.get("actions", [])
     for action in actions:
@@ -32,13 +32,11 @@ def get_review_eligibility(order_id: str) -> bool:
 
 def send_review_request(order_id: str) -> bool:
     """Send the product review and seller feedback request."""
-    url = f"{SP_API_BASE}/solicitations/v1/orders/{order_id}/solicitations/productReviewAndSellerFeedback"
     params = {"marketplaceIds": MARKETPLACE_ID}
-    headers = {
-        "x-amz-access-token": get_access_token(),
-        "Content-Type": "application/json",
-    }
-    resp = requests.post(url, headers=headers, params=params)
+    resp = get_client().request(
+        "createProductReviewAndSellerFeedbackSolicitation", "POST",
+        f"/solicitations/v1/orders/{order_id}/solicitations/productReviewAndSellerFeedback", params=params,
+    )
     logger.info(
         f"Solicitations send response ({resp.status_code}): {resp.text}"
     )
@@ -0,0 +1,129 @@
+# общий клиент SP-API: один пул соединений, лимитер на каждую операцию, повтор на 429 (и 5xx для GET)
+import os
+import time
+import random
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from services.amazon.amazon_client import get_access_token, invalidate_access_token, start_token_refresher
+from utils.rate_limit import TokenBucket, parse_retry_after
+
+SP_API_BASE = os.getenv("SP_API_BASE", "https://sellingpartnerapi-na.amazon.com")
+logger = logging.getLogger(__name__)
+
+# (rate в секунду, burst) — документированные usage plans SP-API
+OPERATION_LIMITS = {
+    "getOrder": (0.5, 30),
+    "getOrderItems": (0.5, 30),
+    "getSolicitationActionsForOrder": (1.0, 5),
+    "createProductReviewAndSellerFeedbackSolicitation": (1.0, 5),
+}
+DEFAULT_LIMIT = (0.5, 5)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = ("GET", "HEAD")
+
+
+class SpApiClient:
+    """
+    Потокобезопасен: sqs_listener и воркеры отзывов зовут его из пула потоков.
+    Каждая операция идёт через свой TokenBucket; на 429 бакет «осушается» на время
+    паузы, чтобы соседние потоки не добивали тот же лимит.
+    """
+
+    def __init__(self, base_url: str = SP_API_BASE, pool_size: int = 32, max_retries: int = 5,
+                 backoff: float = 1.0, timeout=(5, 30), session: Optional[requests.Session] = None,
+                 limits: Optional[Dict[str, tuple]] = None, token_provider=get_access_token):
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.token_provider = token_provider
+        self.session = session or requests.Session()
+        if session is None:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+        self.limits = {**OPERATION_LIMITS, **(limits or {})}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, operation: str) -> TokenBucket:
+        b = self._buckets.get(operation)
+        if b is None:
+            with self._lock:
+                rate, burst = self.limits.get(operation, DEFAULT_LIMIT)
+                b = self._buckets.setdefault(operation, TokenBucket(rate=rate, capacity=burst))
+        return b
+
+    def _retry_after(self, resp: requests.Response, attempt: int) -> float:
+        # Retry-After: секунды или HTTP-date; иначе экспоненциальный backoff с jitter
+        wait = parse_retry_after(resp.headers.get("Retry-After"))
+        if wait is not None:
+            return wait
+        return self.backoff * 2 ** attempt * (0.5 + random.random() / 2)
+
+    def request(self, operation: str, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+                json: Any = None, access_token: Optional[str] = None,
+                idempotent: Optional[bool] = None) -> requests.Response:
+        """
+        Ответ после повторов; статус проверяет вызывающий (как и раньше с requests.get/post).
+        5xx и сетевые ошибки повторяются только для идемпотентных запросов (по умолчанию GET/HEAD):
+        POST мог дойти до Amazon, повтор создал бы второй solicitation. 429 повторяется всегда —
+        запрос отклонён до обработки.
+        """
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        bucket = self.bucket(operation)
+        url = f"{self.base_url}{path}"
+        token_refreshed = False
+        resp = None
+        for attempt in range(self.max_retries + 1):
+            bucket.acquire()
+            token = access_token or self.token_provider()
+            headers = {"x-amz-access-token": token, "Content-Type": "application/json"}
+            try:
+                resp = self.session.request(method, url, headers=headers, params=params, json=json,
+                                            timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries or not idempotent:
+                    raise
+                wait = self.backoff * 2 ** attempt
+                logger.warning(f"SP-API {operation} network error ({e}), retry in {wait:.1f}s")
+                time.sleep(wait)
+                continue
+            if resp.status_code == 403 and access_token is None and not token_refreshed:
+                # токен мог протухнуть раньше срока — один повтор со свежим
+                invalidate_access_token(token)
+                token_refreshed = True
+                continue
+            if resp.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return resp
+            if resp.status_code != 429 and not idempotent:
+                return resp
+            wait = self._retry_after(resp, attempt)
+            logger.warning(f"SP-API {operation} -> {resp.status_code}, retry {attempt + 1} in {wait:.1f}s")
+            if resp.status_code == 429:
+                # паузу выдержит bucket.acquire() в начале следующей попытки — вместе с соседними потоками
+                bucket.drain(wait)
+            else:
+                time.sleep(wait)
+        return resp
+
+
+_client: Optional[SpApiClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> SpApiClient:
+    """Один клиент на процесс; при первом вызове стартует фоновое обновление LWA-токена."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                start_token_refresher()
+                _client = SpApiClient()
+    return _client
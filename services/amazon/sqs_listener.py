@@ -1,19 +1,16 @@
 import os
 import time
-import boto3
 import logging
-import redis
 import asyncio
-import telegram
 import json
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from database.db import get_db_session
 from database.models import User
-from cache.redis_client import redis_client
 from dotenv import load_dotenv
-from services.amazon.amazon_client import get_access_token
 from services.amazon.order_api import get_order_details, get_order_items_details
 from services.amazon.order_parser import parse_order_data, parse_order_items
+from services.streams.review_queue import schedule_review
 
 
 def extract_order_status(raw_body: str) -> tuple[str | None, str | None]:
@@ -37,21 +34,29 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("sqs_listener")
 
-# Telegram Bot
+# Telegram Bot и SQS создаются при первом обращении: импорт модуля не требует boto3/telegram и env
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-bot = telegram.Bot(token=TELEGRAM_TOKEN)
-
-region_name=os.getenv("AWS_REGION")
-aws_access_key_id=os.getenv("AWS_ACCESS_KEY")
-aws_secret_access_key=os.getenv("AWS_SECRET_KEY")
-
-# SQS
-sqs = boto3.client(
-    "sqs",
-    region_name=region_name,
-    aws_access_key_id=aws_access_key_id,
-    aws_secret_access_key=aws_secret_access_key,
-)
+_bot = None
+
+
+def get_bot():
+    global _bot
+    if _bot is None:
+        import telegram
+        _bot = telegram.Bot(token=TELEGRAM_TOKEN)
+    return _bot
+
+
+def get_sqs_client():
+    import boto3
+    return boto3.client(
+        "sqs",
+        region_name=os.getenv("AWS_REGION"),
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY"),
+        aws_secret_access_key=os.getenv("AWS_SECRET_KEY"),
+    )
+
+
 QUEUE_URL = os.getenv("SQS_QUEUE_URL")
 
 def get_authorized_user_ids():
@@ -68,135 +73,269 @@ def process_message(message_body: str):
         f"{message_body}"
         )
 
+MARKETPLACE_ID = "ATVPDKIKX0DER"  # для amazon.com
+
+
 def get_order(order_id: str):
-    access_token = get_access_token()
-    marketplace_id = "ATVPDKIKX0DER"  # для amazon.com
-    return get_order_details(order_id, access_token, marketplace_id)
+    return get_order_details(order_id, MARKETPLACE_ID)
+
 
 def get_items(order_id: str):
-    access_token = get_access_token()
-    marketplace_id = "ATVPDKIKX0DER"  # для amazon.com
-    return get_order_items_details(order_id, access_token, marketplace_id)
+    return get_order_items_details(order_id, MARKETPLACE_ID)
 
-def format_amazon_notification(raw_body: str) -> str:
-    try:
-        outer = json.loads(raw_body)
-        payload = outer.get("Payload", {})
-        notif = payload.get("OrderChangeNotification", {})
-        summary = notif.get("Summary", {})
-        order_id = notif.get("AmazonOrderId")
-        status = summary.get("OrderStatus")
-        sku = summary.get("OrderItems", [{}])[0].get("SellerSKU")
-        quantity = summary.get("OrderItems", [{}])[0].get("Quantity")
-        purchase_date = summary.get("PurchaseDate")
-        fulfillment = summary.get("FulfillmentType")
-
-        pretty_status = {
-            "Pending": "🆕 Новый заказ!",
-            "Unshipped": "📦 Подтверждён, готов к отгрузке!",
-            "Shipped": "🚚 Заказ отправлен!",
-            "Canceled": "❌ 	Заказ отменён!",
-            "Delivered": "✅ Заказ доставлен!",
-        }.get(status, status)
-
-        formatted_date = (
-            datetime.fromisoformat(purchase_date.replace("Z", "+00:00"))
-            .strftime("%d.%m.%Y, %H:%M") if purchase_date else "—"
-        )
+def _parse_summary(raw_body: str) -> dict:
+    outer = json.loads(raw_body)
+    payload = outer.get("Payload", {})
+    notif = payload.get("OrderChangeNotification", {})
+    summary = notif.get("Summary", {})
+    return {
+        "order_id": notif.get("AmazonOrderId"),
+        "status": summary.get("OrderStatus"),
+        "quantity": summary.get("OrderItems", [{}])[0].get("Quantity"),
+        "purchase_date": summary.get("PurchaseDate"),
+        "fulfillment": summary.get("FulfillmentType"),
+    }
 
-        fulfillment_type = "FBA" if fulfillment == "AFN" else fulfillment
 
-        # Детали
-        order_data = parse_order_data(get_order(order_id))
-        order_items = parse_order_items(get_items(order_id))
-        print(order_items)
-
-        # Title
-        titles = [item.get("Title", "Unknown Item") for item in order_items]
-        combined_title = ", ".join(titles)
-
-        # 💰 Сумма заказа
-        order_total = order_data.get("OrderTotal", {})
-        amount = order_total.get("Amount")
-        currency = order_total.get("CurrencyCode")
-        total_str = f"{amount} {currency}" if amount and currency else "—"
-
-        # 📍 Адрес
-        address = order_data.get("ShippingAddress", {})
-        city = address.get("City")
-        region = address.get("StateOrRegion")
-        postal = address.get("PostalCode")
-        country = address.get("CountryCode")
-
-        address_str = (
-            f"{city}, {region}, {postal}, {country}"
-            if all([city, region, postal, country])
-            else "—"
-        )
+def _render_notification(info: dict, order_data: dict, order_items: list) -> str:
+    status = info["status"]
+    pretty_status = {
+        "Pending": "🆕 Новый заказ!",
+        "Unshipped": "📦 Подтверждён, готов к отгрузке!",
+        "Shipped": "🚚 Заказ отправлен!",
+        "Canceled": "❌ 	Заказ отменён!",
+        "Delivered": "✅ Заказ доставлен!",
+    }.get(status, status)
 
-        return (
-            f"<b>{pretty_status}</b>\n\n"
-            f"🛍️ <b>Товары:</b> {combined_title}\n"
-            f"🔢 <b>Кол-во:</b> {quantity or '—'}\n"
-            f"📅 <b>Дата покупки:</b> {formatted_date}\n"
-            f"💵 <b>Сумма:</b> {total_str}\n"
-            f"📍 <b>Адрес доставки:</b> {address_str}\n"
-            f"🛒 <b>Номер:</b> {order_id}\n"
-            f"🔁 <b>Тип выполнения:</b> {fulfillment_type}"
-        )
+    purchase_date = info["purchase_date"]
+    formatted_date = (
+        datetime.fromisoformat(purchase_date.replace("Z", "+00:00"))
+        .strftime("%d.%m.%Y, %H:%M") if purchase_date else "—"
+    )
+
+    fulfillment = info["fulfillment"]
+    fulfillment_type = "FBA" if fulfillment == "AFN" else fulfillment
+
+    # Title
+    titles = [item.get("Title", "Unknown Item") for item in order_items]
+    combined_title = ", ".join(titles)
+
+    # 💰 Сумма заказа
+    order_total = order_data.get("OrderTotal", {})
+    amount = order_total.get("Amount")
+    currency = order_total.get("CurrencyCode")
+    total_str = f"{amount} {currency}" if amount and currency else "—"
+
+    # 📍 Адрес
+    address = order_data.get("ShippingAddress", {})
+    city = address.get("City")
+    region = address.get("StateOrRegion")
+    postal = address.get("PostalCode")
+    country = address.get("CountryCode")
+
+    address_str = (
+        f"{city}, {region}, {postal}, {country}"
+        if all([city, region, postal, country])
+        else "—"
+    )
+
+    return (
+        f"<b>{pretty_status}</b>\n\n"
+        f"🛍️ <b>Товары:</b> {combined_title}\n"
+        f"🔢 <b>Кол-во:</b> {info['quantity'] or '—'}\n"
+        f"📅 <b>Дата покупки:</b> {formatted_date}\n"
+        f"💵 <b>Сумма:</b> {total_str}\n"
+        f"📍 <b>Адрес доставки:</b> {address_str}\n"
+        f"🛒 <b>Номер:</b> {info['order_id']}\n"
+        f"🔁 <b>Тип выполнения:</b> {fulfillment_type}"
+    )
+
+
+def format_amazon_notification(raw_body: str) -> str:
+    try:
+        info = _parse_summary(raw_body)
+        # Детали
+        order_data = parse_order_data(get_order(info["order_id"]))
+        order_items = parse_order_items(get_items(info["order_id"]))
+        return _render_notification(info, order_data, order_items)
     except Exception as e:
         return f"⚠️ Ошибка при обработке уведомления: {e}"
 
 
+async def aformat_amazon_notification(raw_body: str) -> str:
+    """
+    То же, но заказ и позиции запрашиваются параллельно и вне event loop (requests блокирующий).
+    Ошибки не глотаем: сообщение не удаляется из SQS и придёт снова, а не уходит пользователям текстом ошибки.
+    """
+    info = _parse_summary(raw_body)
+    order, items = await asyncio.gather(
+        asyncio.to_thread(get_order, info["order_id"]),
+        asyncio.to_thread(get_items, info["order_id"]),
+    )
+    return _render_notification(info, parse_order_data(order), parse_order_items(items))
+
+
 async def notify_users(message: str, user_ids: list[int]):
-    for uid in user_ids:
+    bot = get_bot()
+
+    async def send(uid: int):
         try:
             await bot.send_message(chat_id=uid, text=message, parse_mode="HTML")
         except Exception as e:
             logger.warning(f"Failed to send message to {uid}: {e}")
+    await asyncio.gather(*(send(uid) for uid in user_ids))
 
 
-async def listen_to_queue():
-    logger.info("Listening to SQS...")
+def enqueue_review(order_id: str):
+    ready_at = datetime.now(timezone.utc) + timedelta(days=5, hours=2)
+    expire_at = ready_at + timedelta(days=2)
+    if schedule_review(order_id, ready_at.timestamp(), expire_at.timestamp()):
+        logger.info(f"Scheduled review for order {order_id} at {ready_at}")
 
-    while True:
-        try:
-            response = sqs.receive_message(
-                QueueUrl=QUEUE_URL,
-                MaxNumberOfMessages=10,
-                WaitTimeSeconds=20,
-            )
-
-            messages = response.get("Messages", [])
-            if messages:
-                authorized_users = get_authorized_user_ids()
+
+async def handle_message(msg_body: str, authorized_users: list[int]):
+    logger.info(f"Received SQS notification: {msg_body}")
+    prepared_message = await aformat_amazon_notification(msg_body)
+    processed = process_message(prepared_message)
+    await notify_users(processed, authorized_users)
+
+    order_id, status = extract_order_status(msg_body)
+    if status == "Shipped" and order_id:
+        enqueue_review(order_id)
+
+
+SQS_WORKERS = int(os.getenv("SQS_WORKERS", 16))                  # сообщений в обработке одновременно
+SQS_VISIBILITY_TIMEOUT = int(os.getenv("SQS_VISIBILITY_TIMEOUT", 60))
+DELETE_FLUSH_SEC = 1.0                                            # сколько копим пачку на delete_message_batch
+SQS_BATCH = 10                                                    # лимит SQS на receive/delete/change batch
+SQS_MAX_RECEIVES = int(os.getenv("SQS_MAX_RECEIVES", 5))          # после стольких неудачных получений сообщение удаляем
+
+
+class SqsPipeline:
+    """
+    receive (long poll, в потоке) → очередь → SQS_WORKERS обработчиков → delete_message_batch.
+    Пока сообщение не удалено, его visibility timeout продлевается пачками,
+    так что медленные заказы не всплывают у второго получателя. Сообщение, на котором
+    обработчик упал, не удаляется — SQS вернёт его после таймаута; на max_receives-й
+    попытке (ApproximateReceiveCount) оно удаляется с ошибкой в логе. Не-OrderChange
+    уведомления и битый JSON удаляются сразу — повтор их не починит.
+    """
+
+    def __init__(self, sqs_client, queue_url: str, workers: int = SQS_WORKERS,
+                 visibility_timeout: int = SQS_VISIBILITY_TIMEOUT, max_receives: int = SQS_MAX_RECEIVES):
+        self.sqs = sqs_client
+        self.queue_url = queue_url
+        self.workers = workers
+        self.visibility_timeout = visibility_timeout
+        self.max_receives = max_receives
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)   # backpressure на receive
+        self._to_delete: asyncio.Queue = asyncio.Queue()
+        self._inflight: dict[str, float] = {}    # ReceiptHandle → когда последний раз продлевали
+
+    async def _receive_loop(self):
+        while True:
+            try:
+                response = await asyncio.to_thread(
+                    self.sqs.receive_message,
+                    QueueUrl=self.queue_url,
+                    MaxNumberOfMessages=SQS_BATCH,
+                    WaitTimeSeconds=20,
+                    VisibilityTimeout=self.visibility_timeout,
+                    AttributeNames=["ApproximateReceiveCount"],
+                )
+                messages = response.get("Messages", [])
+                if not messages:
+                    continue
+                authorized_users = await asyncio.to_thread(get_authorized_user_ids)
+                now = time.monotonic()
                 for msg in messages:
-                    msg_body = msg["Body"]
-                    logger.info(f"Received SQS notification: {msg_body}")
-                    prepared_message = format_amazon_notification(msg_body)
-                    processed = process_message(prepared_message)
-                    await notify_users(processed, authorized_users)
-
-                    order_id, status = extract_order_status(msg_body)
-                    if status == "Shipped" and order_id:
-                        ready_at = datetime.utcnow() + timedelta(days=5, hours=2)
-                        expire_at = ready_at + timedelta(days=2)
-                        redis_client.xadd(
-                            "review_queue",
-                            {
-                                "orderId": order_id,
-                                "ready_at": str(ready_at.timestamp()),
-                                "expire_at": str(expire_at.timestamp()),
-                            },
-                        )
-                        logger.info(
-                            f"Added order {order_id} to review_queue with ready_at {ready_at}"
-                        )
-                    # Удаляем сообщение из очереди
-                    sqs.delete_message(
-                        QueueUrl=QUEUE_URL,
-                        ReceiptHandle=msg["ReceiptHandle"]
-                    )
-        except Exception as e:
-            logger.error(f"Error while polling SQS: {e}")
-            time.sleep(5)  # wait before retry
+                    self._inflight[msg["ReceiptHandle"]] = now
+                    await self._queue.put((msg, authorized_users))
+            except Exception as e:
+                logger.error(f"Error while polling SQS: {e}")
+                await asyncio.sleep(5)  # wait before retry
+
+    async def _worker(self):
+        while True:
+            msg, authorized_users = await self._queue.get()
+            try:
+                order_id, _ = extract_order_status(msg["Body"])
+                if not order_id:
+                    logger.warning(f"Dropping SQS message {msg.get('MessageId')}: not an order change notification")
+                    await self._to_delete.put(msg["ReceiptHandle"])
+                    continue
+                await handle_message(msg["Body"], authorized_users)
+                await self._to_delete.put(msg["ReceiptHandle"])
+            except Exception as e:
+                receives = int(msg.get("Attributes", {}).get("ApproximateReceiveCount", 1))
+                if receives >= self.max_receives:
+                    logger.error(f"Dropping SQS message {msg.get('MessageId')} after {receives} receives: {e}")
+                    await self._to_delete.put(msg["ReceiptHandle"])
+                else:
+                    logger.error(f"Failed to process SQS message {msg.get('MessageId')} (receive {receives}): {e}")
+                    self._inflight.pop(msg["ReceiptHandle"], None)
+            finally:
+                self._queue.task_done()
+
+    async def _delete_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._to_delete.get()]
+            deadline = loop.time() + DELETE_FLUSH_SEC
+            while len(batch) < SQS_BATCH:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._to_delete.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            entries = [{"Id": str(i), "ReceiptHandle": h} for i, h in enumerate(batch)]
+            try:
+                resp = await asyncio.to_thread(self.sqs.delete_message_batch, QueueUrl=self.queue_url, Entries=entries)
+                for f in resp.get("Failed", []):
+                    logger.warning(f"SQS delete failed: {f}")
+            except Exception as e:
+                logger.error(f"SQS delete_message_batch error: {e}")
+            for h in batch:
+                self._inflight.pop(h, None)
+
+    async def _visibility_loop(self):
+        # продлеваем всё, что держим дольше половины таймаута; проверяем в два раза чаще
+        half = self.visibility_timeout / 2
+        while True:
+            await asyncio.sleep(half / 2)
+            now = time.monotonic()
+            due = [h for h, t in list(self._inflight.items()) if now - t >= half]
+            for i in range(0, len(due), SQS_BATCH):
+                chunk = due[i:i + SQS_BATCH]
+                entries = [{"Id": str(j), "ReceiptHandle": h, "VisibilityTimeout": self.visibility_timeout}
+                           for j, h in enumerate(chunk)]
+                try:
+                    await asyncio.to_thread(self.sqs.change_message_visibility_batch,
+                                            QueueUrl=self.queue_url, Entries=entries)
+                except Exception as e:
+                    logger.warning(f"SQS change_message_visibility_batch error: {e}")
+                    continue
+                for h in chunk:
+                    if h in self._inflight:
+                        self._inflight[h] = now
+
+    async def run(self):
+        # to_thread берёт default executor (min(32, cpu+4) потоков) — на маленькой машине это узкое место:
+        # каждому обработчику нужно до двух потоков (заказ + позиции), плюс receive/delete
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=self.workers * 2 + 2))
+        tasks = [asyncio.create_task(self._receive_loop()),
+                 asyncio.create_task(self._delete_loop()),
+                 asyncio.create_task(self._visibility_loop())]
+        tasks += [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for t in tasks:
+                t.cancel()
+
+
+async def listen_to_queue():
+    logger.info("Listening to SQS...")
+    await SqsPipeline(get_sqs_client(), QUEUE_URL).run()
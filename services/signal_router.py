@@ -0,0 +1,220 @@
+# Очередь внешних сигналов (TradingView и т.п.): дедуп + Redis Stream + consumer group воркеров
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from redis.exceptions import ResponseError
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = "signals"
+GROUP_NAME = "signal_router"
+DEAD_LETTER_KEY = "signals:dead"
+DEDUP_TTL = 900                 # сек; TradingView ретраит вебхук, пока не получит 2xx
+STREAM_MAXLEN = 100_000         # приблизительный cap стрима (XADD MAXLEN ~)
+
+
+@dataclass
+class Signal:
+    symbol: str
+    timeframe: str
+    signal: str                 # "BUY" | "SELL"
+    price: float
+    bar_ts: datetime
+    source: str = ""
+    meta: Dict[str, Any] = field(default_factory=dict)
+
+    def to_fields(self) -> Dict[str, str]:
+        return {
+            "symbol": self.symbol, "timeframe": self.timeframe, "signal": self.signal,
+            "price": repr(self.price), "bar_ts": str(int(self.bar_ts.timestamp() * 1000)),
+            "source": self.source, "meta": json.dumps(self.meta),
+        }
+
+    @classmethod
+    def from_fields(cls, f: Dict[str, str]) -> "Signal":
+        return cls(
+            symbol=f["symbol"], timeframe=f["timeframe"], signal=f["signal"], price=float(f["price"]),
+            bar_ts=datetime.fromtimestamp(int(f["bar_ts"]) / 1000.0, tz=timezone.utc),
+            source=f.get("source", ""), meta=json.loads(f.get("meta") or "{}"),
+        )
+
+
+# ===== роутинг: кто получает сигнал =====
+
+Handler = Callable[[Signal], Any]
+_handlers: List[Tuple[Optional[str], Optional[str], Handler]] = []
+
+
+def register(handler: Handler, symbol: Optional[str] = None, timeframe: Optional[str] = None) -> Handler:
+    """Подписать обработчик на сигналы (None — любые символ/таймфрейм)."""
+    _handlers.append((symbol, timeframe, handler))
+    return handler
+
+
+def on_signal(symbol: Optional[str] = None, timeframe: Optional[str] = None):
+    """Декоратор для register()."""
+    return lambda fn: register(fn, symbol, timeframe)
+
+
+def unregister_all() -> None:
+    _handlers.clear()
+
+
+def route_signal(symbol: str, timeframe: str, signal: str, price: float, bar_ts: datetime,
+                 source: str = "", meta: Optional[Dict[str, Any]] = None) -> int:
+    """Синхронно раздать сигнал подписанным обработчикам; возвращает число обработчиков.
+    Исключение обработчика пробрасывается — воркер тогда не ACK'ает сообщение."""
+    sig = Signal(symbol, timeframe, signal, price, bar_ts, source, meta or {})
+    n = 0
+    for sym, tf, handler in list(_handlers):
+        if (sym is None or sym == symbol) and (tf is None or tf == timeframe):
+            handler(sig)
+            n += 1
+    return n
+
+
+# ===== приём: дедуп + XADD =====
+
+def dedup_key(symbol: str, timeframe: str, ts: int, signal: str) -> str:
+    return f"signal:dedup:{symbol}:{timeframe}:{ts}:{signal}"
+
+
+async def enqueue_signal(r, sig: Signal, ts_key: int) -> Optional[str]:
+    """
+    redis.asyncio клиент. SET NX EX — атомарный дедуп: первый запрос ставит ключ и кладёт
+    сигнал в стрим, повторы получают None. Если XADD упал — ключ снимаем, чтобы ретрай прошёл.
+    """
+    key = dedup_key(sig.symbol, sig.timeframe, ts_key, sig.signal)
+    if not await r.set(key, "1", nx=True, ex=DEDUP_TTL):
+        return None
+    try:
+        return await r.xadd(STREAM_KEY, sig.to_fields(), maxlen=STREAM_MAXLEN, approximate=True)
+    except Exception:
+        await r.delete(key)
+        raise
+
+
+# ===== воркеры consumer group =====
+
+class SignalWorker:
+    """
+    Один потребитель группы GROUP_NAME (синхронный redis клиент, свой поток).
+    At-least-once: ACK только после успешного route_signal хотя бы одним обработчиком. Зависшие у упавших
+    потребителей сообщения забираются через XAUTOCLAIM после claim_idle_ms;
+    после max_deliveries попыток сообщение уходит в DEAD_LETTER_KEY.
+    """
+
+    def __init__(self, r, consumer: Optional[str] = None, stream: str = STREAM_KEY, group: str = GROUP_NAME,
+                 batch: int = 100, block_ms: int = 1000, claim_idle_ms: int = 60_000, max_deliveries: int = 5):
+        self.r = r
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}-{threading.get_ident()}"
+        self.stream, self.group = stream, group
+        self.batch, self.block_ms = batch, block_ms
+        self.claim_idle_ms, self.max_deliveries = claim_idle_ms, max_deliveries
+        self.processed = 0
+        self.failed = 0
+
+    def ensure_group(self) -> None:
+        try:
+            self.r.xgroup_create(name=self.stream, groupname=self.group, id="0-0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):       # группа уже есть — ок; остальное не глотаем
+                raise
+
+    def _deliveries(self, ids: List[str]) -> Dict[str, int]:
+        if not ids:
+            return {}
+        rows = self.r.xpending_range(self.stream, self.group, min=ids[0], max=ids[-1], count=len(ids) * 2)
+        return {row["message_id"]: row["times_delivered"] for row in rows}
+
+    def _handle(self, msg_id: str, fields: Dict[str, str]) -> bool:
+        try:
+            sig = Signal.from_fields(fields)
+            if not route_signal(sig.symbol, sig.timeframe, sig.signal, sig.price, sig.bar_ts, sig.source, sig.meta):
+                # никто не подписан — не ACK'аем: повторится и после max_deliveries уйдёт в dead letter
+                raise LookupError(f"no handler for {sig.symbol} {sig.timeframe}")
+        except Exception as e:
+            self.failed += 1
+            logger.warning(f"Signal {msg_id} failed: {e}")
+            return False
+        self.processed += 1
+        return True
+
+    def _dead_letter(self, msg_id: str, fields: Dict[str, str]) -> None:
+        logger.error(f"Signal {msg_id} moved to {DEAD_LETTER_KEY} after {self.max_deliveries} attempts")
+        pipe = self.r.pipeline()
+        pipe.xadd(DEAD_LETTER_KEY, {**fields, "orig_id": msg_id})
+        pipe.xack(self.stream, self.group, msg_id)
+        pipe.execute()
+
+    def poll(self) -> int:
+        """Одна итерация: забрать зависшие, прочитать новые, обработать, ACK пачкой."""
+        claimed = self.r.xautoclaim(self.stream, self.group, self.consumer,
+                                    min_idle_time=self.claim_idle_ms, start_id="0-0", count=self.batch)
+        messages = [m for m in claimed[1] if m[1]]          # удалённые из стрима приходят как (id, None)
+        deliveries = self._deliveries([m[0] for m in messages])
+        if not messages:
+            resp = self.r.xreadgroup(self.group, self.consumer, {self.stream: ">"},
+                                     count=self.batch, block=self.block_ms)
+            messages = [m for _stream, msgs in resp or [] for m in msgs]
+
+        acks = []
+        for msg_id, fields in messages:
+            if self._handle(msg_id, fields):
+                acks.append(msg_id)
+            elif deliveries.get(msg_id, 1) >= self.max_deliveries:
+                self._dead_letter(msg_id, fields)
+        if acks:
+            self.r.xack(self.stream, self.group, *acks)
+        return len(messages)
+
+    def run(self, stop: Optional[threading.Event] = None) -> None:
+        self.ensure_group()
+        while stop is None or not stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                logger.exception(f"Signal worker {self.consumer} error: {e}")
+                (stop or threading.Event()).wait(1.0)
+
+
+def run_workers(r, n: int = 4, stop: Optional[threading.Event] = None, **kw) -> List[threading.Thread]:
+    """n потоков-потребителей одной группы (клиент redis потокобезопасен)."""
+    threads = []
+    for i in range(n):
+        w = SignalWorker(r, consumer=f"{socket.gethostname()}-{os.getpid()}-{i}", **kw)
+        t = threading.Thread(target=w.run, args=(stop,), name=f"signal-worker-{i}", daemon=True)
+        t.start()
+        threads.append(t)
+    return threads
+
+
+def register_runtime(runtime, loop: asyncio.AbstractEventLoop, timeout: float = 30.0) -> List[Handler]:
+    """
+    Обработчик на каждую подписку (pair, tf) рантайма: сигнал уходит в runtime.on_signal в его event loop,
+    поток воркера ждёт результата — ошибка рантайма (нет баров, ордер в полёте) оставляет сообщение без ACK.
+    """
+    def forward(pair: str, tf: str) -> Handler:
+        def handler(sig: Signal) -> int:
+            fut = asyncio.run_coroutine_threadsafe(
+                runtime.on_signal(pair, tf, sig.signal, sig.price, reason=sig.source or "signal"), loop)
+            return fut.result(timeout)
+        return handler
+    # TradingView шлёт ETHUSDT, рантайм живёт на ETH/USDT
+    return [register(forward(pair, tf), symbol=pair.replace("/", ""), timeframe=tf)
+            for pair, tf in runtime.subscriptions]
+
+
+if __name__ == "__main__":
+    # рантайм apps.runner (бары, индикаторы, риск, биржа) + воркеры, раздающие ему сигналы из стрима
+    from apps.runner import main
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(signal_workers=int(os.getenv("SIGNAL_WORKERS", "4"))))
@@ -0,0 +1,132 @@
+# отложенные задачи в Redis: ZSET по времени готовности + аренда (lease) для нескольких потребителей
+import json
+import time
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Забирает просроченные аренды (упавший потребитель) — первыми, затем готовые задачи из due, всего не больше
+# limit, в leased со сроком аренды; не влезшие просроченные возвращаются в due. Порядок — как в _claim_watch.
+# Атомарно: две копии воркера не получат одну и ту же задачу.
+# KEYS: due, leased, jobs; ARGV: now, limit, lease_until
+CLAIM_LUA = """
+local limit = tonumber(ARGV[2])
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1], 'LIMIT', 0, 100)
+local ids, seen = {}, {}
+for _, id in ipairs(expired) do
+  if #ids < limit then
+    table.insert(ids, id)
+    seen[id] = true
+  else
+    redis.call('ZREM', KEYS[2], id)
+    redis.call('ZADD', KEYS[1], ARGV[1], id)
+  end
+end
+if #ids < limit then
+  for _, id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, limit)) do
+    if #ids >= limit then break end
+    if not seen[id] then table.insert(ids, id) end
+  end
+end
+local out = {}
+for _, id in ipairs(ids) do
+  redis.call('ZREM', KEYS[1], id)
+  redis.call('ZADD', KEYS[2], ARGV[3], id)
+  table.insert(out, id)
+  table.insert(out, redis.call('HGET', KEYS[3], id))
+end
+return out
+"""
+
+
+class DelayQueue:
+    """
+    <name>:due    — ZSET job_id → ready_at (unix-время)
+    <name>:leased — ZSET job_id → до какого времени задача за потребителем
+    <name>:jobs   — HASH job_id → payload (json)
+
+    claim() стоит O(log N + k) от числа готовых задач k, а не от размера очереди.
+    Задача, которую потребитель не ack/retry за lease_sec, возвращается в due.
+    use_lua=False — claim через WATCH/MULTI (Redis без скриптов, fakeredis в тестах).
+    """
+
+    def __init__(self, r: redis.Redis, name: str, lease_sec: float = 300, use_lua: bool = True):
+        self.r = r
+        self.name = name
+        self.due, self.leased, self.jobs = f"{name}:due", f"{name}:leased", f"{name}:jobs"
+        self.lease_sec = lease_sec
+        self.use_lua = use_lua
+        self._claim_script = r.register_script(CLAIM_LUA) if use_lua else None
+
+    def schedule(self, job_id: str, payload: Dict[str, Any], ready_at: float) -> bool:
+        """Добавить задачу; повторный schedule того же job_id ничего не меняет (дедуп). True — если новая."""
+        pipe = self.r.pipeline()
+        pipe.hsetnx(self.jobs, job_id, json.dumps(payload))
+        pipe.zadd(self.due, {job_id: ready_at}, nx=True)
+        added, _ = pipe.execute()
+        return bool(added)
+
+    def claim(self, limit: int = 50, now: Optional[float] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        now = time.time() if now is None else now
+        if self.use_lua:
+            flat = self._claim_script(keys=[self.due, self.leased, self.jobs],
+                                      args=[now, limit, now + self.lease_sec])
+        else:
+            flat = self._claim_watch(now, limit)
+        out = []
+        for job_id, raw in zip(flat[::2], flat[1::2]):
+            if raw is None:   # задачу уже ack'нули — только почистить аренду
+                self.r.zrem(self.leased, job_id)
+                continue
+            out.append((job_id, json.loads(raw)))
+        return out
+
+    def _claim_watch(self, now: float, limit: int) -> list:
+        with self.r.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(self.due, self.leased)
+                    expired = pipe.zrangebyscore(self.leased, "-inf", now, start=0, num=100)
+                    ids = pipe.zrangebyscore(self.due, "-inf", now, start=0, num=limit)
+                    ids = (list(expired) + [i for i in ids if i not in expired])[:limit]
+                    expired_left = [i for i in expired if i not in ids]
+                    raws = pipe.hmget(self.jobs, ids) if ids else []
+                    pipe.multi()
+                    if expired_left:
+                        pipe.zrem(self.leased, *expired_left)
+                        pipe.zadd(self.due, {i: now for i in expired_left})
+                    if ids:
+                        pipe.zrem(self.due, *ids)
+                        pipe.zadd(self.leased, {i: now + self.lease_sec for i in ids})
+                    pipe.execute()
+                    return [x for pair in zip(ids, raws) for x in pair]
+                except redis.WatchError:
+                    continue   # другой потребитель успел раньше — перечитать
+
+    def ack(self, job_id: str) -> None:
+        """Задача выполнена (или отброшена) — удалить совсем."""
+        pipe = self.r.pipeline()
+        pipe.zrem(self.leased, job_id)
+        pipe.zrem(self.due, job_id)
+        pipe.hdel(self.jobs, job_id)
+        pipe.execute()
+
+    def retry(self, job_id: str, payload: Dict[str, Any], ready_at: float) -> None:
+        """Вернуть задачу в очередь на ready_at с обновлённым payload (счётчик попыток и т.п.)."""
+        pipe = self.r.pipeline()
+        pipe.zrem(self.leased, job_id)
+        pipe.hset(self.jobs, job_id, json.dumps(payload))
+        pipe.zadd(self.due, {job_id: ready_at})
+        pipe.execute()
+
+    def next_due(self) -> Optional[float]:
+        """Время ближайшей задачи (или None) — чтобы спать ровно до неё."""
+        first = self.r.zrange(self.due, 0, 0, withscores=True)
+        return first[0][1] if first else None
+
+    def size(self) -> Tuple[int, int]:
+        """(ждут, в работе)."""
+        return self.r.zcard(self.due), self.r.zcard(self.leased)
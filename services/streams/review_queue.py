@@ -0,0 +1,15 @@
+# очередь запросов на отзыв: sqs_listener кладёт, review_stream_worker разбирает
+import os
+from cache.redis_client import redis_client
+from services.streams.delay_queue import DelayQueue
+
+QUEUE_NAME = "review_delay"
+LEASE_SEC = 15 * 60
+
+review_queue = DelayQueue(redis_client, QUEUE_NAME, lease_sec=LEASE_SEC,
+                          use_lua=os.getenv("REVIEW_QUEUE_LUA", "1") != "0")
+
+
+def schedule_review(order_id: str, ready_at: float, expire_at: float, queue: DelayQueue = review_queue) -> bool:
+    """job_id = order_id: повторное уведомление о том же заказе не создаёт вторую задачу."""
+    return queue.schedule(order_id, {"orderId": order_id, "expire_at": expire_at, "attempts": 0}, ready_at)
@@ -1,64 +1,149 @@
 import asyncio
 import logging
+import os
+import socket
 import time
+from concurrent.futures import ThreadPoolExecutor
 from cache.redis_client import redis_client as redis
-from bots.telegram.handlers.review_handler import send_review_prompt
+from bots.telegram.handlers.review_handler import send_review_prompts
 from services.amazon.solicitations import get_review_eligibility
+from services.streams.delay_queue import DelayQueue
+from services.streams.review_queue import QUEUE_NAME, review_queue, schedule_review
 
 logger = logging.getLogger(__name__)
 
-STREAM_KEY = "review_queue"
-GROUP_NAME = "review_bot"
-CONSUMER_NAME = "bot1"
-CHECK_INTERVAL = 2 * 60 * 60  # 2 hours
+STREAM_KEY = "review_queue"            # старый stream — только для миграции
+CONSUMER_NAME = os.getenv("REVIEW_CONSUMER", socket.gethostname())
+CLAIM_BATCH = 50
+MAX_IDLE = 10 * 60                     # проверяем очередь не реже раза в 10 минут
+RETRY_BASE = 2 * 60 * 60               # «ещё не eligible» — повтор через 2ч, 4ч, 8ч ...
+RETRY_MAX = 24 * 60 * 60
+# SP-API getSolicitationActionsForOrder: 1 rps, burst 5 — темп держит лимитер клиента,
+# здесь только сколько запросов одновременно в полёте (и потоков под них)
+ELIGIBILITY_CONCURRENCY = 5
+ELIGIBLE_TTL = 6 * 60 * 60             # кэш результата проверки
+NOT_ELIGIBLE_TTL = 60 * 60
 
-async def run_stream_worker(app):
+# свой пул: блокирующие запросы не занимают default executor бота
+_eligibility_pool = ThreadPoolExecutor(max_workers=ELIGIBILITY_CONCURRENCY, thread_name_prefix="review-eligibility")
+
+
+def migrate_stream(queue: DelayQueue = review_queue, r=redis, batch: int = 500) -> int:
+    """
+    Переносит записи из старого stream review_queue в delay-очередь. Удаляются (XDEL) только
+    перенесённые записи: то, что старый продюсер допишет во время миграции, перенесёт следующий запуск.
+    """
+    moved = 0
+    while True:
+        entries = r.xrange(STREAM_KEY, count=batch)
+        if not entries:
+            break
+        for _msg_id, data in entries:
+            order_id = data.get("orderId")
+            if order_id:
+                moved += schedule_review(order_id, float(data.get("ready_at", "0")),
+                                         float(data.get("expire_at", "0")), queue)
+        r.xdel(STREAM_KEY, *(msg_id for msg_id, _ in entries))
+    if moved:
+        logger.info(f"Migrated {moved} orders from {STREAM_KEY} to {QUEUE_NAME}")
+    return moved
+
+
+async def check_eligibility(order_ids: list[str], r=redis) -> dict[str, bool]:
+    """Параллельная проверка пачки заказов; свежие результаты берутся из Redis (review_eligible:<id>)."""
+    cached = r.mget([f"review_eligible:{o}" for o in order_ids]) if order_ids else []
+    result = {o: v == "1" for o, v in zip(order_ids, cached) if v is not None}
+    missing = [o for o in order_ids if o not in result]
+    if not missing:
+        return result
+    loop = asyncio.get_running_loop()
+
+    async def check(order_id: str):
+        # None — ответа нет (ошибка или не-200/404): не кэшируем и не переносим, задача вернётся по аренде
+        try:
+            eligible = await loop.run_in_executor(_eligibility_pool, get_review_eligibility, order_id)
+        except Exception as e:
+            logger.error(f"Eligibility check failed for {order_id}: {e}")
+            return None
+        if eligible is None:
+            logger.warning(f"Eligibility for {order_id} unknown, retry after lease")
+        return eligible
+
+    checked = await asyncio.gather(*(check(o) for o in missing))
+    pipe = r.pipeline()
+    for order_id, eligible in zip(missing, checked):
+        if eligible is None:
+            continue
+        result[order_id] = eligible
+        pipe.setex(f"review_eligible:{order_id}", ELIGIBLE_TTL if eligible else NOT_ELIGIBLE_TTL,
+                   "1" if eligible else "0")
+    pipe.execute()
+    return result
+
+
+def _reschedule(queue: DelayQueue, job_id: str, job: dict, now: float):
+    order_id = job.get("orderId") or job_id
+    expire_at = float(job.get("expire_at") or 0)
+    attempts = int(job.get("attempts", 0)) + 1
+    ready_at = now + min(RETRY_BASE * 2 ** (attempts - 1), RETRY_MAX)
+    if expire_at and ready_at >= expire_at:
+        ready_at = expire_at - 60   # последняя попытка перед истечением окна
+        if ready_at <= now:
+            logger.info(f"Order {order_id} not eligible before expiry, dropping")
+            queue.ack(job_id)
+            return
+    logger.info(f"Order {order_id} not eligible yet, retry #{attempts} at {ready_at:.0f}")
+    queue.retry(job_id, {**job, "attempts": attempts}, ready_at)
+
+
+async def process_batch(app, queue: DelayQueue, jobs: list, now: float) -> None:
+    live = []
+    for job_id, job in jobs:
+        expire_at = float(job.get("expire_at") or 0)
+        if expire_at and now >= expire_at:
+            logger.info(f"Order {job.get('orderId') or job_id} expired, removing from queue")
+            queue.ack(job_id)
+        else:
+            live.append((job_id, job))
+    if not live:
+        return
+    eligible = await check_eligibility([job.get("orderId") or job_id for job_id, job in live])
+    logger.info(f"Eligibility batch: {sum(eligible.values())}/{len(live)} eligible")
+
+    ready = [(job_id, job) for job_id, job in live if eligible.get(job.get("orderId") or job_id)]
+    if ready:
+        await send_review_prompts(app, [job.get("orderId") or job_id for job_id, job in ready])
+        for job_id, _ in ready:
+            queue.ack(job_id)
+    for job_id, job in live:
+        order_id = job.get("orderId") or job_id
+        if order_id in eligible and not eligible[order_id]:
+            _reschedule(queue, job_id, job, now)
+        # ошибка проверки — не трогаем: аренда истечёт, и задача вернётся в очередь
+
+
+async def run_stream_worker(app, queue: DelayQueue = review_queue):
+    """Можно запускать в нескольких процессах: задачи разбираются через аренду в Redis."""
     try:
-        redis.xgroup_create(name=STREAM_KEY, groupname=GROUP_NAME, id="0-0", mkstream=True)
-    except Exception:
-        pass  # group may already exist
+        migrate_stream(queue)
+    except Exception as e:
+        logger.error(f"Review stream migration failed: {e}")
 
     while True:
         try:
-            messages = redis.xreadgroup(
-                groupname=GROUP_NAME,
-                consumername=CONSUMER_NAME,
-                streams={STREAM_KEY: '>'},
-                block=0,
-            )
-            for _stream, msgs in messages:
-                for msg_id, msg_data in msgs:
-                    logger.info(f"Read from {STREAM_KEY}: {msg_data}")
-                    order_id = msg_data.get("orderId")
-                    ready_at = float(msg_data.get("ready_at", "0"))
-                    expire_at = float(msg_data.get("expire_at", "0"))
-                    now = time.time()
-                    if now < ready_at:
-                        logger.info(f"Order {order_id} not ready yet")
-                        redis.xadd(STREAM_KEY, msg_data)
-                        redis.xack(STREAM_KEY, GROUP_NAME, msg_id)
-                        redis.xdel(STREAM_KEY, msg_id)
-                        continue
-                    if expire_at and now >= expire_at:
-                        logger.info(
-                            f"Order {order_id} expired, removing from queue")
-                        redis.xack(STREAM_KEY, GROUP_NAME, msg_id)
-                        redis.xdel(STREAM_KEY, msg_id)
-                        continue
-                    if order_id:
-                        eligible = get_review_eligibility(order_id)
-                        logger.info(f"Eligibility for {order_id}: {eligible}")
-                        if eligible:
-                            await send_review_prompt(app, order_id)
-                            redis.xack(STREAM_KEY, GROUP_NAME, msg_id)
-                            redis.xdel(STREAM_KEY, msg_id)
-                        else:
-                            logger.info(
-                                f"Order {order_id} not eligible yet, will retry"
-                            )
-                            redis.xadd(STREAM_KEY, msg_data)
-                            redis.xack(STREAM_KEY, GROUP_NAME, msg_id)
-                            redis.xdel(STREAM_KEY, msg_id)
+            now = time.time()
+            jobs = queue.claim(CLAIM_BATCH, now)
+            if jobs:
+                try:
+                    await process_batch(app, queue, jobs, now)
+                except Exception as e:
+                    # аренда истечёт, и задачи заберёт следующий цикл
+                    logger.error(f"Review batch of {len(jobs)} failed on {CONSUMER_NAME}: {e}")
+            if len(jobs) == CLAIM_BATCH:
+                continue
+            nxt = queue.next_due()
+            delay = MAX_IDLE if nxt is None else min(max(nxt - time.time(), 1), MAX_IDLE)
         except Exception as e:
             logger.error(f"Stream worker error: {e}")
-        await asyncio.sleep(CHECK_INTERVAL)
+            delay = 30
+        await asyncio.sleep(delay)
@@ -0,0 +1,85 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.aggregator import BarAggregator, parse_timeframe, resample
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)   # понедельник
+
+
+def _minute_bars(n, seed=0):
+    rng = np.random.default_rng(seed)
+    c = 100 + np.cumsum(rng.normal(0, 1, n))
+    return [{"ts": T0 + timedelta(minutes=i), "open": c[i] - 0.1, "high": c[i] + 0.5,
+             "low": c[i] - 0.5, "close": c[i], "volume": float(i % 7 + 1)} for i in range(n)]
+
+
+def test_parse_timeframe():
+    assert parse_timeframe("7m") == ("time", 420.0)
+    assert parse_timeframe("1w") == ("time", 604800.0)
+    assert parse_timeframe("volume:500") == ("volume", 500.0)
+    assert parse_timeframe("range:2.5") == ("range", 2.5)
+    for bad in ("15", "0m", "1y", "range:-1", "ticks:5"):
+        with pytest.raises(ValueError):
+            parse_timeframe(bad)
+
+
+def test_time_bars_from_1m_match_pandas_resample_in_one_pass():
+    bars = _minute_bars(600)
+    agg = BarAggregator(["5m", "15m", "1h", "7m"], input_tf="1m")
+    got = {}
+    for b in bars:
+        for spec, out in agg.on_bar(b):
+            got.setdefault(spec, []).append(out)
+
+    df = pd.DataFrame(bars).set_index("ts")
+    for spec, rule in (("5m", "5min"), ("15m", "15min"), ("1h", "1h"), ("7m", "7min")):
+        ref = df.resample(rule, origin="epoch").agg(
+            {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"})
+        ref = ref[ref.index + pd.Timedelta(rule) <= df.index[-1] + pd.Timedelta("1min")]   # только закрытые
+        ref = ref[ref.index >= df.index[0]]                  # 7m: первая корзина по epoch началась до T0
+        out = pd.DataFrame(got[spec]).set_index("ts")
+        pd.testing.assert_frame_equal(out, ref, check_freq=False, check_names=False)
+
+
+def test_leading_partial_bucket_is_dropped_unless_asked():
+    bars = _minute_bars(50)[20:]                          # подключились в 00:20
+    agg = BarAggregator(["15m", "volume:10"], input_tf="1m")
+    got = [(spec, out["ts"]) for b in bars for spec, out in agg.on_bar(b)]
+    assert [ts for spec, ts in got if spec == "15m"] == [T0 + timedelta(minutes=30)]    # 00:15 неполный
+    assert got[0] == ("volume:10", T0 + timedelta(minutes=20))                         # объёмный — с первого входа
+    keep = BarAggregator(["15m"], input_tf="1m", drop_partial=False)
+    assert [out["ts"] for b in bars for _, out in keep.on_bar(b)][0] == T0 + timedelta(minutes=15)
+
+
+def test_trades_volume_and_range_bars():
+    agg = BarAggregator(["1m", "volume:10", "range:1.0"])
+    t = int(T0.timestamp() * 1000)
+    out = []
+    for i, (px, qty) in enumerate([(100, 4), (100.4, 4), (101.1, 3), (100.9, 1)]):
+        out += agg.on_trade(t + i * 20_000, px, qty)     # 0s, 20s, 40s, 60s
+    specs = [s for s, _ in out]
+    assert specs == ["volume:10", "range:1.0", "1m"]      # порядок specs внутри одного входа
+    rng_bar = out[1][1]
+    assert (rng_bar["open"], rng_bar["high"], rng_bar["low"], rng_bar["close"]) == (100, 101.1, 100, 101.1)
+    assert out[0][1]["volume"] == 11
+    assert out[2][1]["volume"] == 11 and out[2][1]["close"] == 101.1
+    assert agg.flush(t + 120_000)[0][1]["close"] == 100.9     # хвост 1m по таймеру
+
+
+def test_resample_stream_derives_timeframes_from_one_subscription():
+    async def events():
+        for b in _minute_bars(30):
+            yield "ETH/USDT", "1m", b
+
+    async def collect():
+        return [(p, tf) async for p, tf, _ in resample(events(), {"ETH/USDT": ["1m", "15m"]})]
+
+    got = asyncio.run(collect())
+    assert got.count(("ETH/USDT", "1m")) == 30 and got.count(("ETH/USDT", "15m")) == 2
@@ -0,0 +1,73 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from core.backtest import compute_features, run_backtest
+from core.risk import RiskConfig, RiskEngine
+from core.strategy import TrendFollowingStrategy
+from core.types import Position, Side
+
+PARAMS = {
+    "ema_fast": 5, "ema_slow": 13, "rsi_len": 14, "atr_len": 14,
+    "entry_rsi": 65, "exit_rsi": 75, "cooldown_bars": 3,
+    "stop_atr_mult": 50.0,  # стоп далеко: TrendFollowingStrategy сам стопы не проверяет
+}
+RISK = RiskConfig(per_trade_risk_pct=0.7, max_daily_loss_pct=100.0, stop_atr_mult=50.0)
+
+
+def _bars(n=500, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    t0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return pd.DataFrame({
+        "ts": [t0 + timedelta(minutes=15 * i) for i in range(n)],
+        "open": close + rng.normal(0, 0.3, n),
+        "high": close + rng.uniform(0, 1, n),
+        "low": close - rng.uniform(0, 1, n),
+        "close": close,
+        "volume": rng.uniform(1, 10, n),
+    })
+
+
+def test_backtest_matches_strategy_replay():
+    df = _bars()
+    res = run_backtest(df, PARAMS, RISK)
+
+    # эталон: тот же путь, что в live — on_bar по растущему DataFrame
+    full = df.assign(**compute_features(df, PARAMS))
+    strat = TrendFollowingStrategy(PARAMS)
+    risk = RiskEngine(RISK, equity_provider=lambda: 10_000.0)
+    pos = Position(side=Side.FLAT, meta={})
+    actions = []
+    for i in range(1, len(full)):
+        sig = strat.on_bar(full.iloc[: i + 1], pos)
+        if sig["action"] == "BUY":
+            row = full.iloc[i]
+            if risk.position_size(row["close"], row["atr"]) > 0:
+                pos = Position(side=Side.LONG, qty=1.0, entry=row["close"], meta={})
+                actions.append(("BUY", i))
+        elif sig["action"] == "SELL":
+            pos = Position(side=Side.FLAT, meta={})
+            actions.append(("SELL", i))
+
+    ts_to_i = {t: i for i, t in enumerate(df["ts"].to_numpy())}
+    got = []
+    for t in res.trades:
+        got.append(("BUY", ts_to_i[t.entry_ts]))
+        if t.reason == "exit":
+            got.append(("SELL", ts_to_i[t.exit_ts]))
+    assert got == actions
+    assert len(res.trades) > 0
+
+
+def test_equity_curve_and_summary():
+    df = _bars()
+    res = run_backtest(df, PARAMS, RISK, fee_pct=0.1)
+    assert len(res.equity) == len(df)
+    assert np.isclose(res.equity[-1], 10_000.0 + sum(t.pnl for t in res.trades))
+    s = res.summary()
+    assert s["trades"] == len(res.trades)
+    assert s["max_drawdown_pct"] <= 0
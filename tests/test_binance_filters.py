@@ -0,0 +1,56 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from decimal import Decimal
+
+import pytest
+
+from integrations.exchanges.binance import BinanceExchangeAdapter, SymbolFilters
+
+INFO = {
+    "symbol": "ETHUSDT",
+    "filters": [
+        {"filterType": "PRICE_FILTER", "minPrice": "0.01", "maxPrice": "1000000", "tickSize": "0.01"},
+        {"filterType": "LOT_SIZE", "minQty": "0.00010000", "maxQty": "9000", "stepSize": "0.00010000"},
+        {"filterType": "NOTIONAL", "minNotional": "5.00000000", "applyMinToMarket": True},
+    ],
+}
+
+
+def test_from_symbol_info_parses_filters():
+    f = SymbolFilters.from_symbol_info(INFO, fetched_at=12.0)
+    assert (f.step_size, f.tick_size, f.min_qty, f.min_notional) == (
+        Decimal("0.0001"), Decimal("0.01"), Decimal("0.0001"), Decimal("5"))
+    assert f.fetched_at == 12.0
+    legacy = SymbolFilters.from_symbol_info({"symbol": "X", "filters": [{"filterType": "MIN_NOTIONAL", "minNotional": "10"}]})
+    assert legacy.min_notional == Decimal("10") and legacy.step_size == 0
+
+
+@pytest.mark.parametrize("qty, price, expected", [
+    (0.123456, None, {"qty": 0.1234, "price": None}),              # вниз по stepSize
+    (0.1, 2000.129, {"qty": 0.1, "price": 2000.12}),               # вниз по tickSize
+    (0.3, 1999.99, {"qty": 0.3, "price": 1999.99}),                # уже на сетке — float не сдвигает
+    (1.0000999, 0.07, {"qty": 0.0, "price": 0.07}),                # 1.0 · 0.07 < minNotional
+    (0.00009, None, {"qty": 0.0, "price": None}),                  # < minQty после округления
+    (0.0025, 2000.0, {"qty": 0.0025, "price": 2000.0}),            # ровно 5 USDT — проходит
+    (0.0024, 2000.0, {"qty": 0.0, "price": 2000.0}),
+])
+def test_normalize_rounds_and_enforces_minimums(qty, price, expected):
+    assert SymbolFilters.from_symbol_info(INFO).normalize(qty, price) == expected
+
+
+def test_normalize_without_filters_keeps_default_precision():
+    assert SymbolFilters("X").normalize(1.23456789) == {"qty": 1.234567, "price": None}
+
+
+def test_market_order_below_min_qty_is_not_sent():
+    ex = BinanceExchangeAdapter(api_key="k", api_secret="s")
+    ex._filters["ETHUSDT"] = SymbolFilters.from_symbol_info(INFO)
+
+    class NoNetwork:
+        def request(self, *a, **kw):
+            raise AssertionError("order below minQty must not reach the exchange")
+    ex._session = NoNetwork()
+    with pytest.raises(ValueError, match="minQty"):
+        ex.buy_market("ETH/USDT", 0.00005, "c1")
+    params = ex._market_params("SELL", "ETH/USDT", 0.98765, "c2")
+    assert params["quantity"] == "0.98760000" and params["newClientOrderId"] == "c2"
@@ -0,0 +1,133 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import threading, time
+
+import numpy as np
+import pytest
+
+from core.bar_store import BarStore
+from integrations.datafeeds.binance_history import PAGE_LIMIT, BinanceHistoryLoader, _parse_page
+
+MIN = 60_000
+
+
+class FakeResponse:
+    def __init__(self, rows=None, status=200, headers=None):
+        self.rows, self.status_code, self.headers = rows, status, headers or {}
+
+    def json(self):
+        return self.rows
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"status {self.status_code}")
+
+
+class FakeBinance:
+    """/v3/klines по startTime/endTime/limit; бары 1m в [first, now], кроме missing. Открытая свеча тоже отдаётся."""
+
+    def __init__(self, first_ms, missing=(), throttle=0):
+        self.first_ms, self.missing, self.throttle = first_ms, set(missing), throttle
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def get(self, url, params, timeout):
+        with self._lock:
+            self.calls.append((params["startTime"], params["endTime"]))
+            if self.throttle:
+                self.throttle -= 1
+                return FakeResponse(status=429, headers={"Retry-After": "0.01"})
+        now = int(time.time() * 1000)
+        start = max(params["startTime"], self.first_ms)
+        start += -start % MIN
+        rows = []
+        for t in range(start, min(params["endTime"], now) + 1, MIN):
+            if t not in self.missing:
+                rows.append([t, "1", "2", "0.5", str(t / MIN), "10", t + MIN - 1, "0", 1, "0", "0", "0"])
+            if len(rows) == params["limit"]:
+                break
+        return FakeResponse(rows)
+
+
+def _loader(tmp_path, fake, **kw):
+    loader = BinanceHistoryLoader(BarStore(str(tmp_path)), max_workers=4, **kw)
+    loader._session = fake
+    return loader
+
+
+def test_parse_page_keeps_dtypes_for_empty_pages():
+    empty = _parse_page([])
+    assert empty["ts"].dtype == np.int64 and empty["close_ts"].dtype == np.int64
+    full = _parse_page([[MIN, "1", "2", "0.5", "1.5", "10", 2 * MIN - 1]])
+    for c in empty:
+        assert np.concatenate([full[c], empty[c]]).dtype == full[c].dtype
+
+
+def test_fetch_pages_in_parallel_with_gaps_and_drops_open_bar(tmp_path):
+    now = int(time.time() * 1000)
+    start = now - now % MIN - 2500 * MIN
+    missing = {start + 10 * MIN, start + 1000 * MIN, start + 1001 * MIN}   # в т.ч. на границе страниц
+    fake = FakeBinance(start - 100 * MIN, missing)
+    cols = _loader(tmp_path, fake).fetch("ETH/USDT", "1m", start + 17)   # start не по сетке
+    ts = cols["ts"]
+    assert ts.dtype == np.int64
+    assert len(fake.calls) == 3 and all(e - s == PAGE_LIMIT * MIN - 1 for s, e in fake.calls[:-1])
+    assert ts[-1] + 2 * MIN > now - now % MIN and ts[-1] + MIN <= int(time.time() * 1000)   # до последней закрытой
+    expected = [t for t in range(start + MIN, int(ts[-1]) + 1, MIN) if t not in missing]
+    assert ts.tolist() == expected                     # без дублей и пропусков сверх реальных
+    assert cols["close"].tolist() == [t / MIN for t in expected]
+
+
+def test_sync_reuses_cache_and_fetches_only_tail(tmp_path):
+    now = int(time.time() * 1000)
+    start = now - now % MIN - 1500 * MIN
+    fake = FakeBinance(start)
+    loader = _loader(tmp_path, fake)
+    first = loader.sync("ETH/USDT", "1m", start)
+    n, last = len(first["ts"]), int(first["ts"][-1])
+    assert isinstance(first["ts"], np.memmap) and len(fake.calls) == 2
+
+    fake.calls.clear()
+    again = _loader(tmp_path, fake).sync("ETH/USDT", "1m", start)   # новый процесс — тот же кэш
+    assert len(again["ts"]) >= n and int(again["ts"][n - 1]) == last
+    assert all(s >= last + MIN for s, _ in fake.calls)                # только хвост после кэша
+    assert np.all(np.diff(again["ts"]) == MIN)
+
+
+def test_history_returns_last_closed_bars_as_dicts(tmp_path):
+    now = int(time.time() * 1000)
+    fake = FakeBinance(now - now % MIN - 3000 * MIN)
+    bars = _loader(tmp_path, fake).history("BTC/USDT", "1m", limit=300)
+    assert len(bars) == 300
+    assert set(bars[0]) == {"ts", "open", "high", "low", "close", "volume"}
+    last_ms = int(bars[-1]["ts"].timestamp() * 1000)
+    assert last_ms + MIN <= now                                        # последний бар уже закрыт
+    assert all((b["ts"] - a["ts"]).total_seconds() == 60 for a, b in zip(bars, bars[1:]))
+
+
+def test_rate_limited_page_is_retried_after_retry_after(tmp_path):
+    now = int(time.time() * 1000)
+    fake = FakeBinance(now - now % MIN - 50 * MIN, throttle=2)
+    loader = _loader(tmp_path, fake)
+    cols = loader.fetch("ETH/USDT", "1m", now - 50 * MIN)
+    assert len(cols["ts"]) >= 49 and len(fake.calls) == 3
+
+    fake.throttle = 10
+    with pytest.raises(RuntimeError, match="rate limited"):
+        loader.fetch("ETH/USDT", "1m", now - 50 * MIN)
+
+
+def test_bar_store_append_dedups_and_realigns_torn_columns(tmp_path):
+    store = BarStore(str(tmp_path))
+    cols = lambda ts: {"ts": np.array(ts, dtype=np.int64),
+                       **{c: np.array(ts, dtype=np.float64) for c in ("open", "high", "low", "close", "volume")}}
+    assert store.append("ETH/USDT", "1m", cols([3, 1, 2, 2])) == 3
+    assert store.append("ETH/USDT", "1m", cols([2, 3, 4])) == 1       # старые бары не дописываются
+    # сбой посреди дозаписи: ts длиннее остальных колонок
+    with open(store._path("ETH/USDT", "1m", "ts"), "ab") as f:
+        f.write(np.array([5], dtype="<i8").tobytes())
+    assert store.count("ETH/USDT", "1m") == 4 and store.last_ts("ETH/USDT", "1m") == 4
+    assert store.append("ETH/USDT", "1m", cols([5, 6])) == 2
+    assert store.load("ETH/USDT", "1m")["ts"].tolist() == [1, 2, 3, 4, 5, 6]
+    assert store.load_frame("ETH/USDT", "1m")["close"].tolist() == [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+    assert store.load("BTC/USDT", "1m")["ts"].dtype == np.int64
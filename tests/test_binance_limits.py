@@ -0,0 +1,121 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pytest
+
+from core.metrics import LatencyHistogram, LatencyRegistry, _bucket, _bucket_upper
+from integrations.exchanges import binance as binance_mod
+from integrations.exchanges.binance import BinanceExchangeAdapter, BinanceRateLimits
+
+NOW = 1_700_000_000.0 - 1_700_000_000.0 % 60 + 5   # 5 с от начала минуты
+
+
+def test_weight_is_reserved_locally_and_resynced_from_headers():
+    lim = BinanceRateLimits(weight_limit=100, headroom=0.9)
+    assert lim.wait_time("GET", "/v3/order", NOW) == 0 and lim.used_weight == 4
+    # сервер знает больше (другие процессы с того же IP) — верим заголовку
+    lim.update(200, {"x-mbx-used-weight-1m": "88"}, NOW)
+    assert lim.used_weight == 88
+    assert lim.wait_time("GET", "/v3/ticker/price", NOW) == 0      # 89 ≤ 90
+    assert lim.wait_time("GET", "/v3/order", NOW) == pytest.approx(55.0)   # ждём следующую минуту
+    assert lim.wait_time("GET", "/v3/order", NOW + 55) == 0 and lim.used_weight == 4
+
+
+def test_order_count_windows():
+    lim = BinanceRateLimits(orders_10s=10, orders_1d=12, headroom=1.0)
+    for _ in range(10):
+        assert lim.wait_time("POST", "/v3/order", NOW) == 0
+    assert lim.wait_time("POST", "/v3/order", NOW) == pytest.approx(5.0)
+    assert lim.wait_time("GET", "/v3/order", NOW) == 0             # не-ордера окно не трогает
+    lim.update(200, {"X-MBX-ORDER-COUNT-10S": "0", "X-MBX-ORDER-COUNT-1D": "12"}, NOW)
+    with pytest.raises(RuntimeError, match="daily order limit"):
+        lim.wait_time("POST", "/v3/order", NOW)
+
+
+@pytest.mark.parametrize("status", [418, 429])
+def test_ban_status_blocks_for_retry_after(status):
+    lim = BinanceRateLimits()
+    lim.update(status, {"Retry-After": "30"}, NOW)
+    assert lim.wait_time("GET", "/v3/ticker/price", NOW + 10) == pytest.approx(20.0)
+    assert lim.wait_time("GET", "/v3/ticker/price", NOW + 30) == 0
+    lim.update(status, {}, NOW + 40)                                # без Retry-After — минута
+    assert lim.wait_time("GET", "/v3/ticker/price", NOW + 41) == pytest.approx(59.0)
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses, self.calls = list(responses), []
+
+    def request(self, method, url, params=None, timeout=None):
+        self.calls.append((method, url))
+        return self.responses.pop(0)
+
+
+class FakeResponse:
+    def __init__(self, status, headers=None, body=None):
+        self.status_code, self.headers, self._body = status, headers or {}, body or {}
+        self.text = str(self._body)
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+
+def test_adapter_backs_off_after_429_and_records_latency(monkeypatch):
+    clock = [NOW]
+    sleeps = []
+    monkeypatch.setattr(binance_mod.time, "time", lambda: clock[0])
+    monkeypatch.setattr(binance_mod.time, "sleep", lambda s: (sleeps.append(s), clock.__setitem__(0, clock[0] + s)))
+    ex = BinanceExchangeAdapter(api_key="k", api_secret="s")
+    ex._session = FakeSession([
+        FakeResponse(429, {"Retry-After": "7", "X-MBX-USED-WEIGHT-1M": "5999"}),
+        FakeResponse(200, {"X-MBX-USED-WEIGHT-1M": "10"}, {"orderId": 1}),
+    ])
+    with pytest.raises(RuntimeError, match="429"):
+        ex.get_order("ETH/USDT", "1")
+    assert ex.get_order("ETH/USDT", "1") == {"orderId": 1}
+    # ждали не меньше Retry-After и до новой минуты (вес из заголовка исчерпан)
+    assert sum(sleeps) >= 7 and int(clock[0] // 60) > int(NOW // 60)
+    assert ex.limits.used_weight == 10
+    assert ex.latency.get("GET /v3/order").count == 2
+
+
+def test_bucket_bounds_error_within_one_sixteenth():
+    rng = np.random.default_rng(3)
+    for ns in list(range(40)) + [int(x) for x in rng.integers(1, 10**12, 2000)]:
+        i = _bucket(ns)
+        assert _bucket_upper(i) >= ns
+        assert _bucket_upper(i) - ns <= max(1, ns / 16)
+        assert ns == 0 or _bucket(ns - 1) <= i                    # бакеты монотонны по ns
+
+
+def test_histogram_percentiles_track_exact_quantiles():
+    rng = np.random.default_rng(7)
+    samples = rng.lognormal(mean=15, sigma=1.0, size=20_000).astype(np.int64)   # ~ms-латентности в ns
+    h = LatencyHistogram()
+    for ns in samples:
+        h.record(int(ns))
+    for q in (50, 90, 99, 99.9):
+        exact = np.percentile(samples, q)
+        assert exact * 0.99 <= h.percentile(q) <= exact * (1 + 1 / 16) + 1
+    assert h.percentile(100) == h.max_ns == samples.max()
+    assert h.count == len(samples) and h.total_ns == samples.sum()
+    cum = [c for _, c in h.buckets()]
+    assert cum == sorted(cum) and cum[-1] == len(samples)
+    assert LatencyHistogram().percentile(99) == 0
+
+
+def test_registry_snapshot_per_name():
+    reg = LatencyRegistry()
+    for ms in (1, 2, 3, 4):
+        reg.record("POST /v3/order", ms * 1_000_000)
+    reg.record("GET /v3/order", 500_000)
+    snap = reg.snapshot()
+    assert set(snap) == {"POST /v3/order", "GET /v3/order"}
+    assert snap["POST /v3/order"]["count"] == 4 and snap["POST /v3/order"]["max_ms"] == 4.0
+    assert snap["POST /v3/order"]["mean_ms"] == pytest.approx(2.5)
+    assert 2.0 <= snap["POST /v3/order"]["p50_ms"] <= 2.0 * (1 + 1 / 16)
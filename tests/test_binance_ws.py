@@ -0,0 +1,143 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import asyncio, json
+
+from aiohttp import web
+
+from integrations.datafeeds.binance_ws import BinanceKlineStream
+
+MIN = 60_000
+T0 = 1_700_000_000_000 - 1_700_000_000_000 % MIN
+
+
+def _kline(symbol, open_ms, closed, close=100.0):
+    return json.dumps({
+        "stream": f"{symbol.lower()}@kline_1m",
+        "data": {"e": "kline", "s": symbol, "k": {
+            "t": open_ms, "T": open_ms + MIN - 1, "s": symbol, "i": "1m",
+            "o": "1", "h": "2", "l": "0.5", "c": str(close), "v": "10", "x": closed,
+        }},
+    })
+
+
+async def _run_fake_server():
+    connections = []
+
+    async def ws_handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        connections.append(request.query["streams"])
+        if len(connections) == 1:
+            await ws.send_str(_kline("ETHUSDT", T0, closed=False))
+            await ws.send_str(_kline("ETHUSDT", T0, closed=True))
+            await ws.send_str(_kline("BTCUSDT", T0, closed=True))
+            await ws.close()  # обрыв: клиент должен переподключиться и догрузить пропуск
+        else:
+            # T0+2MIN уже отдан через REST backfill — дубль не должен пройти
+            await ws.send_str(_kline("ETHUSDT", T0 + 2 * MIN, closed=True))
+            await ws.send_str(_kline("ETHUSDT", T0 + 3 * MIN, closed=True))
+            await ws.receive()  # до закрытия клиентом
+        return ws
+
+    async def klines_handler(request):
+        start = int(request.query["startTime"])
+        if request.query["symbol"] != "ETHUSDT":
+            return web.json_response([])
+        rows = [[t, "1", "2", "0.5", "99", "10", t + MIN - 1] for t in (T0 + MIN, T0 + 2 * MIN) if t >= start]
+        return web.json_response(rows)
+
+    app = web.Application()
+    app.router.add_get("/stream", ws_handler)
+    app.router.add_get("/api/v3/klines", klines_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, port, connections
+
+
+def test_multiplexed_stream_reconnects_and_backfills():
+    async def scenario():
+        runner, port, connections = await _run_fake_server()
+        feed = BinanceKlineStream(
+            [("ETH/USDT", "1m"), ("BTC/USDT", "1m")],
+            ws_base=f"http://127.0.0.1:{port}",
+            rest_base=f"http://127.0.0.1:{port}/api",
+            reconnect_delay=0.01,
+        )
+        got = []
+        events = feed.stream()
+        try:
+            async for pair, tf, bar in events:
+                got.append((pair, int(bar["ts"].timestamp() * 1000)))
+                if len(got) == 5:
+                    break
+        finally:
+            await events.aclose()
+            await runner.cleanup()
+        return feed, got, connections
+
+    feed, got, connections = asyncio.run(asyncio.wait_for(scenario(), 10))
+    assert connections[0] == "ethusdt@kline_1m/btcusdt@kline_1m"
+    assert got == [
+        ("ETH/USDT", T0),
+        ("BTC/USDT", T0),
+        ("ETH/USDT", T0 + MIN),       # backfill
+        ("ETH/USDT", T0 + 2 * MIN),   # backfill
+        ("ETH/USDT", T0 + 3 * MIN),   # снова WS
+    ]
+    assert feed.reconnects == 1
+
+
+def test_first_connect_backfills_from_start_after_in_pages():
+    calls = []
+
+    async def ws_handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        # T0+4MIN уже пришёл из backfill — дубль отбрасывается
+        await ws.send_str(_kline("ETHUSDT", T0 + 4 * MIN, closed=True))
+        await ws.send_str(_kline("ETHUSDT", T0 + 5 * MIN, closed=True))
+        await ws.receive()
+        return ws
+
+    async def klines_handler(request):
+        start, limit = int(request.query["startTime"]), int(request.query["limit"])
+        calls.append(start)
+        rows = [[t, "1", "2", "0.5", "99", "10", t + MIN - 1] for t in range(T0, T0 + 5 * MIN, MIN) if t >= start]
+        return web.json_response(rows[:limit])
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_get("/stream", ws_handler)
+        app.router.add_get("/api/v3/klines", klines_handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        feed = BinanceKlineStream(
+            [("ETH/USDT", "1m")],
+            ws_base=f"http://127.0.0.1:{port}",
+            rest_base=f"http://127.0.0.1:{port}/api",
+            start_after={("ETH/USDT", "1m"): T0},   # history() закончился на T0
+            backfill_limit=2,
+        )
+        got = []
+        events = feed.stream()
+        try:
+            async for _pair, _tf, bar in events:
+                got.append(int(bar["ts"].timestamp() * 1000))
+                if len(got) == 5:
+                    break
+        finally:
+            await events.aclose()
+            await runner.cleanup()
+        return feed, got
+
+    feed, got = asyncio.run(asyncio.wait_for(scenario(), 10))
+    assert got == [T0 + i * MIN for i in range(1, 6)]
+    # страницы по 2: [T0+1, T0+2], [T0+3, T0+4], пустая — догнали
+    assert calls == [T0 + 1, T0 + 2 * MIN + 1, T0 + 4 * MIN + 1]
+    assert feed.reconnects == 0
@@ -0,0 +1,45 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pandas as pd
+
+from core.buffers import BarRingBuffer
+from core.strategy import TrendFollowingStrategy
+from core.types import Bar, Position, Side
+
+
+def test_ring_buffer_wraps_and_returns_views():
+    buf = BarRingBuffer(("close", "rsi"), capacity=4)
+    for i in range(11):
+        buf.append({"close": float(i), "rsi": 10.0 * i}, ts=i)
+        lo = max(0, i - 3)
+        assert buf["close"].tolist() == [float(x) for x in range(lo, i + 1)]
+        assert buf.last("close") == i
+    assert len(buf) == 4 and buf.count == 11
+    assert buf.tail("rsi", 2).tolist() == [90.0, 100.0]
+    assert buf.ts().tolist() == [7, 8, 9, 10]
+    assert np.shares_memory(buf["close"], buf._data)        # без копий
+    assert buf.last("close", 4) == 7.0
+
+
+def test_append_bar_takes_ohlcv_from_bar_and_indicators_from_extra():
+    buf = BarRingBuffer(("open", "high", "low", "close", "volume", "atr"), capacity=8)
+    ts = pd.Timestamp("2024-01-01", tz="UTC").to_pydatetime()
+    buf.append_bar(Bar(ts, 1.0, 2.0, 0.5, 1.5, 10.0), {"atr": 0.3})
+    assert buf.frame().iloc[0].to_dict() == {"ts": pd.Timestamp(ts), "open": 1.0, "high": 2.0,
+                                            "low": 0.5, "close": 1.5, "volume": 10.0, "atr": 0.3}
+
+
+def test_strategy_reads_ring_buffer_like_dataframe():
+    rows = [
+        {"close": 100.0, "ema_fast": 9.0, "ema_slow": 10.0, "rsi": 50.0, "atr": 1.0},
+        {"close": 101.0, "ema_fast": 11.0, "ema_slow": 10.0, "rsi": 50.0, "atr": 1.0},
+    ]
+    buf = BarRingBuffer(("close", "ema_fast", "ema_slow", "rsi", "atr"), capacity=2)
+    buf.extend(rows)
+    params = {"entry_rsi": 65, "exit_rsi": 75, "stop_atr_mult": 2.0}
+    flat = Position(side=Side.FLAT, meta={})
+    a = TrendFollowingStrategy(params).on_bar(buf, flat)
+    b = TrendFollowingStrategy(params).on_bar(pd.DataFrame(rows), flat)
+    assert a == b and a["action"] == "BUY" and a["stop"] == 99.0
@@ -0,0 +1,146 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import threading
+
+import fakeredis
+import pytest
+
+from services.streams.delay_queue import DelayQueue
+
+
+def _queue(server=None, lease=60):
+    r = fakeredis.FakeRedis(server=server or fakeredis.FakeServer(), decode_responses=True)
+    # fakeredis без lupa не исполняет Lua — проверяем WATCH/MULTI-вариант claim
+    return DelayQueue(r, "t", lease_sec=lease, use_lua=False)
+
+
+def test_claims_only_due_jobs_and_dedups_schedule():
+    q = _queue()
+    assert q.schedule("a", {"n": 1}, 100)
+    assert not q.schedule("a", {"n": 2}, 50)   # повтор не меняет ни payload, ни время
+    q.schedule("b", {"n": 3}, 200)
+    assert q.claim(now=99) == []
+    assert q.claim(now=150) == [("a", {"n": 1})]
+    assert q.size() == (1, 1)
+    assert q.next_due() == 200
+
+
+def test_retry_reschedules_and_ack_removes():
+    q = _queue()
+    q.schedule("a", {"attempts": 0}, 10)
+    (job_id, job), = q.claim(now=10)
+    q.retry(job_id, {**job, "attempts": 1}, 500)
+    assert q.claim(now=100) == []
+    assert q.claim(now=500) == [("a", {"attempts": 1})]
+    q.ack("a")
+    assert q.size() == (0, 0) and q.claim(now=10_000) == []
+
+
+def test_expired_lease_returns_job_to_queue():
+    q = _queue(lease=30)
+    q.schedule("a", {}, 0)
+    assert [j for j, _ in q.claim(now=1)] == ["a"]
+    assert q.claim(now=20) == []             # ещё в аренде
+    assert [j for j, _ in q.claim(now=40)] == ["a"]   # потребитель пропал — задачу забрал другой
+
+
+def test_concurrent_consumers_never_share_a_job():
+    server = fakeredis.FakeServer()
+    q = _queue(server)
+    for i in range(300):
+        q.schedule(f"j{i}", {"i": i}, i % 7)
+    got, lock = [], threading.Lock()
+
+    def consume():
+        c = _queue(server)
+        while True:
+            jobs = c.claim(limit=7, now=10)
+            if not jobs:
+                return
+            with lock:
+                got.extend(j for j, _ in jobs)
+
+    threads = [threading.Thread(target=consume) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(got) == sorted(f"j{i}" for i in range(300))
+
+
+def _scenario(q):
+    for i in range(6):
+        q.schedule(f"j{i}", {"i": i}, i)
+    first = q.claim(limit=3, now=10)
+    q.ack("j1")
+    q.retry("j2", {"i": 2, "attempts": 1}, 100)
+    expired = q.claim(limit=10, now=10 + q.lease_sec + 1)   # j0 вернулся из аренды
+    return first, expired, q.size()
+
+
+def test_lua_claim_matches_watch_claim():
+    pytest.importorskip("lupa")                # без lupa fakeredis не исполняет EVAL
+    r = fakeredis.FakeRedis(decode_responses=True)
+    lua = DelayQueue(r, "lua", lease_sec=30, use_lua=True)
+    first, expired, size = _scenario(lua)
+    assert [j for j, _ in first] == ["j0", "j1", "j2"]
+    assert [j for j, _ in expired] == ["j0", "j3", "j4", "j5"]     # просроченная аренда — первой
+    assert (first, expired, size) == _scenario(_queue(lease=30))
+
+    # просроченных больше limit: лишние возвращаются в due со временем now — за уже готовыми
+    def crowded(q):
+        for i in range(5):
+            q.schedule(f"j{i}", {"i": i}, i)
+        q.claim(limit=3, now=10)
+        return q.claim(limit=2, now=10 + q.lease_sec + 1), q.claim(limit=10, now=10 + q.lease_sec + 1), q.size()
+    got = crowded(DelayQueue(r, "lua2", lease_sec=30, use_lua=True))
+    assert [[j for j, _ in batch] for batch in got[:2]] == [["j0", "j1"], ["j3", "j4", "j2"]]
+    assert got == crowded(_queue(lease=30))
+
+
+def test_migrate_stream_deletes_only_migrated_entries():
+    pytest.importorskip("telegram")            # review_stream_worker тянет хендлеры бота
+    from services.streams import review_stream_worker as w
+    r = fakeredis.FakeRedis(decode_responses=True)
+    q = DelayQueue(r, "t", use_lua=False)
+    for i in range(5):
+        r.xadd(w.STREAM_KEY, {"orderId": f"o{i}", "ready_at": "1", "expire_at": "2"})
+    r.xadd(w.STREAM_KEY, {"junk": "1"})
+
+    real_xrange = r.xrange
+    def xrange_then_late_write(*a, **kw):      # старый продюсер дописывает посреди миграции
+        out = real_xrange(*a, **kw)
+        if out and not r.exists("late"):
+            r.set("late", 1)
+            r.xadd(w.STREAM_KEY, {"orderId": "late"})
+        return out
+    r.xrange = xrange_then_late_write
+
+    assert w.migrate_stream(q, r, batch=4) == 6
+    assert q.size() == (6, 0) and r.xlen(w.STREAM_KEY) == 0
+
+
+def test_unknown_eligibility_is_neither_cached_nor_rescheduled(monkeypatch):
+    pytest.importorskip("telegram")
+    import asyncio
+    from services.streams import review_stream_worker as w
+    answers = {"yes": True, "no": False, "throttled": None}
+    monkeypatch.setattr(w, "get_review_eligibility", answers.get)
+    r = fakeredis.FakeRedis(decode_responses=True)
+    assert asyncio.run(w.check_eligibility(list(answers), r)) == {"yes": True, "no": False}
+    assert r.get("review_eligible:throttled") is None and r.get("review_eligible:no") == "0"
+
+    q = DelayQueue(r, "t", use_lua=False)
+    for order_id in answers:
+        q.schedule(order_id, {"orderId": order_id}, 0)
+    sent = []
+    async def send_review_prompts(app, order_ids):
+        sent.extend(order_ids)
+    monkeypatch.setattr(w, "send_review_prompts", send_review_prompts)
+    check = w.check_eligibility
+    monkeypatch.setattr(w, "check_eligibility", lambda order_ids: check(order_ids, r))
+    r.delete("review_eligible:yes", "review_eligible:no")
+    asyncio.run(w.process_batch(None, q, q.claim(now=1), now=1))
+    assert sent == ["yes"]
+    assert q.r.zscore(q.leased, "throttled") is not None        # остался в аренде, не перенесён
+    assert q.r.zscore(q.due, "no") > 1                          # «нет» — перенесён на потом
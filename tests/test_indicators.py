@@ -0,0 +1,65 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from core.indicators import ema, rsi, atr, IndicatorEngine
+from core.types import Bar
+
+
+def _random_bars(n=600, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    if n > 60:
+        close[50:60] = close[49]  # плоский участок: loss == 0
+    high = close + rng.uniform(0, 2, n)
+    low = close - rng.uniform(0, 2, n)
+    open_ = close + rng.normal(0, 0.5, n)
+    t0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return pd.DataFrame({
+        "ts": [t0 + timedelta(minutes=i) for i in range(n)],
+        "open": open_, "high": high, "low": low, "close": close,
+        "volume": rng.uniform(1, 10, n),
+    })
+
+
+SPEC = {
+    "ema_fast": {"type": "EMA", "length": 20},
+    "ema_slow": {"type": "EMA", "length": 50},
+    "rsi": {"type": "RSI", "length": 14},
+    "atr": {"type": "ATR", "length": 14},
+}
+
+
+def test_streaming_matches_vectorized():
+    df = _random_bars()
+    expected = pd.DataFrame({
+        "ema_fast": ema(df["close"], 20),
+        "ema_slow": ema(df["close"], 50),
+        "rsi": rsi(df["close"], 14),
+        "atr": atr(df["high"], df["low"], df["close"], 14),
+    })
+
+    engine = IndicatorEngine(SPEC)
+    # половина — как backfill из history() (dict), остальное — по одному Bar
+    records = df.to_dict("records")
+    engine.seed(records[:300])
+    rows = []
+    for r in records[300:]:
+        rows.append(dict(engine.update(Bar(**r))))
+
+    got = pd.DataFrame(rows, index=df.index[300:])
+    for col in SPEC:
+        np.testing.assert_allclose(got[col], expected[col].iloc[300:], rtol=1e-9, atol=1e-9)
+
+
+def test_warmup_is_nan_like_vectorized():
+    df = _random_bars(n=30)
+    engine = IndicatorEngine(SPEC)
+    for i, r in enumerate(df.to_dict("records")):
+        vals = engine.update(r)
+        assert np.isnan(vals["rsi"]) == np.isnan(rsi(df["close"], 14).iloc[i])
+        assert np.isnan(vals["atr"]) == np.isnan(atr(df["high"], df["low"], df["close"], 14).iloc[i])
+    assert engine.ready
@@ -0,0 +1,148 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from datetime import datetime, timedelta, timezone
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.backtest import compute_features, default_signals, run_backtest, simulate
+from core.optimizer import Optimizer, SharedBars, _views, grid, random_sample, walk_forward_windows
+from core.risk import RiskConfig
+from core.rules import compile_rules
+
+BASE = {"ema_fast": 5, "ema_slow": 13, "rsi_len": 14, "atr_len": 14,
+        "entry_rsi": 65, "exit_rsi": 75, "cooldown_bars": 3, "stop_atr_mult": 2.0}
+RISK = RiskConfig(per_trade_risk_pct=0.7, max_daily_loss_pct=100.0, stop_atr_mult=2.0)
+SPACE = {"ema_fast": [3, 5, 8], "ema_slow": [13, 21]}
+
+
+def _bars(n=1200, seed=11):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    t0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return pd.DataFrame({
+        "ts": [t0 + timedelta(minutes=15 * i) for i in range(n)],
+        "open": close + rng.normal(0, 0.3, n),
+        "high": close + rng.uniform(0, 1, n),
+        "low": close - rng.uniform(0, 1, n),
+        "close": close,
+        "volume": rng.uniform(1, 10, n),
+    })
+
+
+def _summary(df, params, start, end, warmup):
+    """Эталон без пула: индикаторы на [start - warmup, end), симуляция только на [start, end)."""
+    lo = max(0, start - warmup)
+    if lo == start:
+        return run_backtest(df.iloc[start:end].reset_index(drop=True), params, RISK).summary()
+    feats = compute_features(df.iloc[lo:end].reset_index(drop=True), params)
+    entry, exit_ = default_signals(feats, params)
+    off, part = start - lo, df.iloc[start:end]
+    return simulate(pd.DatetimeIndex(part["ts"]), part["open"].to_numpy(), part["low"].to_numpy(),
+                    part["close"].to_numpy(), feats["atr"][off:], entry[off:], exit_[off:], params, RISK).summary()
+
+
+def test_grid_and_random_sample():
+    combos = grid(SPACE)
+    assert len(combos) == 6 and {"ema_fast": 8, "ema_slow": 21} in combos
+    a = random_sample({"ema_fast": (3, 9), "entry_rsi": (50.0, 70.0), "cooldown_bars": [0, 2]}, 50, seed=1)
+    assert a == random_sample({"ema_fast": (3, 9), "entry_rsi": (50.0, 70.0), "cooldown_bars": [0, 2]}, 50, seed=1)
+    assert all(isinstance(p["ema_fast"], int) and 3 <= p["ema_fast"] <= 9 for p in a)
+    assert all(isinstance(p["entry_rsi"], float) and 50 <= p["entry_rsi"] <= 70 for p in a)
+    assert {p["cooldown_bars"] for p in a} == {0, 2}
+
+
+@pytest.mark.parametrize("step", [None, 50, 200])
+def test_walk_forward_windows_are_contiguous_and_in_bounds(step):
+    n, train, test = 1000, 300, 100
+    windows = walk_forward_windows(n, train, test, step)
+    assert windows
+    for tr, te in windows:
+        assert tr.stop - tr.start == train and te.stop - te.start == test
+        assert tr.stop == te.start and te.stop <= n          # test сразу за train, без зазора и перекрытия
+    starts = [tr.start for tr, _ in windows]
+    assert np.all(np.diff(starts) == (step or test))
+    if step is None:
+        # шаг = test: тестовые отрезки не перекрываются и идут встык
+        assert all(a[1].stop == b[1].start for a, b in zip(windows, windows[1:]))
+    assert windows[-1][1].stop + (step or test) > n       # следующее окно уже не влезло бы
+    assert walk_forward_windows(100, 80, 30) == []
+
+
+def test_shared_bars_round_trip_and_unlink():
+    df = _bars(50)
+    with SharedBars(df) as shared:
+        shm = shared_memory.SharedMemory(name=shared.spec.name)
+        ohlcv, ts = _views(shm, shared.spec.n)
+        assert np.array_equal(ohlcv[3], df["close"].to_numpy())
+        assert np.array_equal(ts, pd.DatetimeIndex(df["ts"]).asi8)
+        del ohlcv, ts
+        shm.close()
+        name = shared.spec.name
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+
+
+def test_run_matches_sequential_backtest():
+    df = _bars(600)
+    table = Optimizer(df, BASE, RISK, max_workers=2).run(grid(SPACE))
+    assert len(table) == 6
+    for row in table.to_dict("records"):
+        params = {**BASE, "ema_fast": row["ema_fast"], "ema_slow": row["ema_slow"]}
+        assert row["total_return_pct"] == pytest.approx(run_backtest(df, params, RISK).summary()["total_return_pct"])
+    assert table["total_return_pct"].is_monotonic_decreasing
+
+
+def test_run_with_rules_matches_rule_backtest():
+    df = _bars(600)
+    indicators = {"ema_fast": {"type": "EMA", "length": 5}, "ema_slow": {"type": "EMA", "length": 13},
+                  "rsi": {"type": "RSI", "length": 14}, "atr": {"type": "ATR", "length": 14}}
+    entry = {"all": [{"op": "crosses_above", "left": "ema_fast", "right": "ema_slow"},
+                     {"op": "<", "left": "rsi", "right": 65}], "confirm_bars": 2, "cooldown_bars": 4}
+    exit_ = {"any": [{"op": ">", "left": "rsi", "right": 75}]}
+    rules = compile_rules(indicators, entry, exit_)
+    table = Optimizer(df, BASE, RISK, max_workers=2, rules=rules).run(grid(SPACE))
+    assert len(table) == 6
+    for row in table.to_dict("records"):
+        # длины индикаторов правил берутся из кандидата, сигналы — из entry/exit
+        spec = {**indicators, "ema_fast": {"type": "EMA", "length": row["ema_fast"]},
+                "ema_slow": {"type": "EMA", "length": row["ema_slow"]}}
+        expect = run_backtest(df, BASE, RISK, rules=compile_rules(spec, entry, exit_)).summary()
+        assert row["total_return_pct"] == pytest.approx(expect["total_return_pct"])
+        assert row["trades"] == expect["trades"]
+
+
+@pytest.mark.parametrize("warmup", [0, 150])
+def test_parallel_walk_forward_equals_sequential(warmup):
+    df = _bars()
+    train, test = 400, 200
+    cands = grid(SPACE)
+    wf = Optimizer(df, BASE, RISK, max_workers=2, warmup=warmup).walk_forward(cands, train, test)
+
+    windows = walk_forward_windows(len(df), train, test)
+    assert len(wf) == len(windows)
+    for w, (tr, te) in enumerate(windows):
+        scores = [_summary(df, {**BASE, **c}, tr.start, tr.stop, warmup)["total_return_pct"] for c in cands]
+        best = cands[int(np.argmax(scores))]
+        expect = _summary(df, {**BASE, **best}, te.start, te.stop, warmup)
+        row = wf.iloc[w]
+        assert (row["train_start"], row["test_start"], row["test_end"]) == (tr.start, te.start, te.stop)
+        assert (row["ema_fast"], row["ema_slow"]) == (best["ema_fast"], best["ema_slow"])
+        assert row["train_total_return_pct"] == pytest.approx(max(scores))
+        assert row["total_return_pct"] == pytest.approx(expect["total_return_pct"])
+        assert row["trades"] == expect["trades"]
+
+
+def test_walk_forward_does_not_see_future_bars():
+    df = _bars()
+    train, test = 400, 200
+    first_end = walk_forward_windows(len(df), train, test)[0][1].stop
+    shocked = df.copy()
+    # всё после первого test-окна меняем до неузнаваемости — на первое окно это влиять не должно
+    shocked.loc[first_end:, ["open", "high", "low", "close"]] *= 3.0
+    opt = dict(max_workers=2, warmup=100)
+    a = Optimizer(df, BASE, RISK, **opt).walk_forward(grid(SPACE), train, test).iloc[0]
+    b = Optimizer(shocked, BASE, RISK, **opt).walk_forward(grid(SPACE), train, test).iloc[0]
+    pd.testing.assert_series_equal(a, b)
@@ -0,0 +1,133 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import asyncio
+
+from core.interfaces import AsyncAbstractExchangeAdapter
+from core.orders import OrderTracker, LocalUserDataStream
+from core.types import OrderRequest
+
+
+class FakeAdapter(AsyncAbstractExchangeAdapter):
+    """Отвечает NEW сразу, исполнение приходит позже через user data stream."""
+
+    def __init__(self, stream: LocalUserDataStream, delay: float = 0.05):
+        self.stream, self.delay = stream, delay
+        self.in_flight = self.max_in_flight = 0
+        self._next_id = 0
+
+    async def _place(self, side, pair, qty, coid):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        if qty <= 0:
+            raise RuntimeError("Binance error [400]: invalid quantity")
+        self._next_id += 1
+        oid = self._next_id
+        asyncio.get_running_loop().call_later(0.01, self.stream.publish, {
+            "e": "executionReport", "c": coid, "X": "FILLED", "i": oid, "z": str(qty), "Z": str(qty * 100),
+        })
+        return {"clientOrderId": coid, "orderId": oid, "status": "NEW", "executedQty": "0"}
+
+    async def buy_market(self, pair, qty, client_order_id=None):
+        return await self._place("BUY", pair, qty, client_order_id)
+
+    async def sell_market(self, pair, qty, client_order_id=None):
+        return await self._place("SELL", pair, qty, client_order_id)
+
+
+def test_batch_orders_run_concurrently_and_fill_via_stream():
+    async def scenario():
+        stream = LocalUserDataStream()
+        tracker = OrderTracker()
+        consumer = asyncio.create_task(tracker.consume(stream.events()))
+        ex = FakeAdapter(stream)
+        reqs = [OrderRequest(pair=f"P{i}/USDT", side="BUY", qty=1.0 + i) for i in range(10)]
+        reqs.append(OrderRequest(pair="BAD/USDT", side="SELL", qty=0))
+
+        t0 = asyncio.get_running_loop().time()
+        futures = await tracker.submit(ex, reqs)
+        elapsed = asyncio.get_running_loop().time() - t0
+
+        done = await asyncio.wait_for(asyncio.gather(*futures[:-1]), 1)
+        failed = await asyncio.gather(futures[-1], return_exceptions=True)
+        consumer.cancel()
+        return ex, tracker, elapsed, done, failed
+
+    ex, tracker, elapsed, done, failed = asyncio.run(scenario())
+    assert ex.max_in_flight == 11
+    assert elapsed < 0.05 * 3          # не 11 последовательных round-trip'ов
+    assert [s.status for s in done] == ["FILLED"] * 10
+    assert done[3].filled_qty == 4.0 and done[3].avg_price == 100.0
+    assert isinstance(failed[0], RuntimeError)
+    assert tracker.open_orders() == []
+
+
+def test_report_before_registration_and_late_reports():
+    async def scenario():
+        tracker = OrderTracker()
+        tracker.on_execution_report({"e": "executionReport", "c": "x1", "X": "FILLED", "i": 7, "z": "2", "Z": "20"})
+        st = tracker.track(OrderRequest(pair="ETH/USDT", side="BUY", qty=2, client_order_id="x1"))
+        tracker.on_execution_report({"e": "executionReport", "c": "x1", "X": "PARTIALLY_FILLED", "i": 7, "z": "1", "Z": "10"})
+        return await tracker.wait("x1", timeout=0.1), st
+
+    res, st = asyncio.run(scenario())
+    assert res is st and res.status == "FILLED" and res.filled_qty == 2
+
+
+class FlakyAdapter(AsyncAbstractExchangeAdapter):
+    """Ордер доходит до биржи, но ответ теряется (таймаут); get_order знает только реально принятые."""
+
+    def __init__(self):
+        self.accepted = {}
+        self.lookups = []
+
+    async def buy_market(self, pair, qty, client_order_id=None):
+        if qty > 1:
+            self.accepted[client_order_id] = {"clientOrderId": client_order_id, "orderId": 42, "status": "FILLED",
+                                              "executedQty": str(qty), "cummulativeQuoteQty": str(qty * 10)}
+        raise asyncio.TimeoutError()
+
+    async def get_order(self, pair, order_id=None, client_order_id=None):
+        self.lookups.append(client_order_id)
+        if client_order_id == "down":
+            raise RuntimeError("Binance error [503]: service unavailable")
+        if client_order_id not in self.accepted:
+            raise RuntimeError('Binance error [400]: {"code":-2013,"msg":"Order does not exist."}')
+        return self.accepted[client_order_id]
+
+
+def test_lost_response_is_unknown_until_resolved_via_get_order():
+    async def scenario():
+        tracker, ex = OrderTracker(), FlakyAdapter()
+        reqs = [OrderRequest("ETH/USDT", "BUY", 2.0, "placed"), OrderRequest("ETH/USDT", "BUY", 0.5, "lost"),
+                OrderRequest("ETH/USDT", "BUY", 2.0, "down")]
+        futures = await tracker.submit(ex, reqs)
+        statuses = [tracker.get(r.client_order_id).status for r in reqs]
+        pending = [f.done() for f in futures]
+        await tracker.resolve(ex)
+        placed = await asyncio.wait_for(futures[0], 0.1)
+        lost = await asyncio.gather(futures[1], return_exceptions=True)
+        # поздний FILLED из стрима закрывает оставшийся UNKNOWN
+        tracker.on_execution_report({"e": "executionReport", "c": "down", "X": "FILLED", "i": 43, "z": "2", "Z": "20"})
+        down = await asyncio.wait_for(futures[2], 0.1)
+        return statuses, pending, placed, lost, down, ex
+
+    statuses, pending, placed, lost, down, ex = asyncio.run(scenario())
+    assert statuses == ["UNKNOWN"] * 3 and pending == [False] * 3
+    assert placed.status == "FILLED" and placed.order_id == "42" and placed.filled_qty == 2.0
+    assert isinstance(lost[0], RuntimeError) and str(lost[0]) == "TimeoutError"   # исходная ошибка
+    assert down.status == "FILLED" and down.filled_qty == 2.0
+    assert ex.lookups == ["placed", "lost", "down"]
+
+
+def test_exchange_rejection_is_terminal():
+    async def scenario():
+        tracker = OrderTracker()
+        st = tracker.track(OrderRequest("ETH/USDT", "BUY", 1.0, "r1"))
+        tracker.on_error("r1", RuntimeError("Binance error [400]: Filter failure: LOT_SIZE"))
+        tracker.on_execution_report({"e": "executionReport", "c": "r1", "X": "FILLED", "i": 1, "z": "1", "Z": "1"})
+        return st, await asyncio.gather(st.future, return_exceptions=True)
+
+    st, res = asyncio.run(scenario())
+    assert st.status == "REJECTED" and isinstance(res[0], RuntimeError)
@@ -0,0 +1,114 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from core.portfolio import EWCovariance, Portfolio, PortfolioConfig
+
+
+def _feed(pf, closes):
+    """closes: {pair: array} — бары всех пар с общими ts."""
+    n = len(next(iter(closes.values())))
+    for t in range(n):
+        for pair, c in closes.items():
+            pf.on_close(pair, t, c[t])
+    pf.cov.commit()
+
+
+def test_ew_covariance_matches_direct_recursion():
+    rng = np.random.default_rng(0)
+    r = rng.normal(0, 0.01, (300, 3))
+    prices = 100 * np.exp(np.cumsum(r, axis=0))
+    cov = EWCovariance(lam=0.9, capacity=2)          # заодно проверяем рост
+    idx = [cov.add() for _ in range(3)]
+    for t in range(len(prices)):
+        for i in idx:
+            cov.update(i, t, prices[t, i])
+    cov.commit()
+
+    mean, c = np.zeros(3), np.zeros((3, 3))
+    for x in np.diff(np.log(prices), axis=0):
+        d = x - mean
+        mean += 0.1 * d
+        c = 0.9 * (c + 0.1 * np.outer(d, d))
+    assert cov.n == len(prices) - 1
+    assert np.allclose(cov.cov[:3, :3], c)
+
+
+def test_size_scales_down_for_correlated_holdings_and_respects_caps():
+    rng = np.random.default_rng(1)
+    base = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 200)))
+    other = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 200)))
+    cfg = PortfolioConfig(max_concurrent_positions=2, max_total_exposure_pct=1000.0)
+    pf = Portfolio(cfg)
+    _feed(pf, {"A": base, "A2": base * 2, "B": other})
+
+    pf.open("a", "A", 1.0, base[-1])
+    assert np.isclose(pf.size("a2", "A2", 1.0, 10.0, 10_000.0), 5.0)       # корреляция 1 → половина
+    assert pf.size("b", "B", 1.0, 10.0, 10_000.0) > 9.0                    # независимая пара почти не режется
+
+    pf.open("b", "B", 1.0, other[-1])
+    assert pf.size("c", "A2", 1.0, 10.0, 10_000.0) == 0.0                  # max_concurrent_positions
+    pf.close("b")
+    # экспозиция: 10% от equity минус уже открытая A
+    pf.cfg.max_total_exposure_pct = 10.0
+    room = 1_000.0 - base[-1]
+    assert np.isclose(pf.size("b", "B", 1.0, 10_000.0, 10_000.0), room)
+
+
+def test_chandelier_trails_all_open_positions_at_once():
+    pf = Portfolio(PortfolioConfig(max_concurrent_positions=3, trailing_atr_mult=3.0))
+    pf.open("x", "X", 1.0, 100.0, stop=90.0, atr=2.0)
+    pf.open("y", "Y", 1.0, 50.0, stop=None, atr=1.0)
+    pf.trail()
+    assert pf.stop("x") == 94.0 and pf.stop("y") == 47.0
+    pf.mark("x", 110.0, 2.0)
+    pf.mark("y", 49.0, 1.0)      # ниже максимума — стоп не опускается
+    pf.trail()
+    assert pf.stop("x") == 104.0 and pf.stop("y") == 47.0
+
+
+def test_missing_bars_do_not_bias_covariance():
+    rng = np.random.default_rng(2)
+    a = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 400)))
+    b = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 400)))
+    full, gappy = EWCovariance(lam=0.95), EWCovariance(lam=0.95)
+    for cov in (full, gappy):
+        cov.add(), cov.add()
+    for t in range(400):
+        full.update(0, t, a[t])
+        gappy.update(0, t, a[t])
+        if t % 2 == 0:                       # у B бар только на чётных ts (неликвид / другой таймфрейм)
+            gappy.update(1, t, b[t])
+    full.commit(), gappy.commit()
+    # A не зависит от того, были ли бары у B; дисперсия B не тянется к нулю пропусками
+    assert np.isclose(gappy.cov[0, 0], full.cov[0, 0])
+    assert gappy.cov[1, 1] > 0.5 * 2 * 0.02 ** 2
+    assert gappy.nobs[0, 0] == 399 and gappy.nobs[1, 1] == gappy.nobs[0, 1] == 199
+
+
+def test_exposure_cap_uses_portfolio_equity():
+    equity = [50_000.0]
+    pf = Portfolio(PortfolioConfig(max_concurrent_positions=3, max_total_exposure_pct=10.0),
+                   equity_provider=lambda: equity[0])
+    pf.open("a", "A", 10.0, 100.0)
+    assert np.isclose(pf.size("b", "B", 100.0, 1_000.0), (5_000.0 - 1_000.0) / 100.0)
+    equity[0] = 20_000.0
+    assert np.isclose(pf.size("b", "B", 100.0, 1_000.0), 10.0)
+    # без истории корреляций та же пара всё равно считается коррелированной полностью
+    assert np.isclose(pf.size("a2", "A", 100.0, 4.0, 1e9), 2.0)
+
+
+def test_runtime_sums_instance_equity_for_portfolio():
+    from core.indicators import IndicatorEngine
+    from core.risk import RiskConfig, RiskEngine
+    from core.runtime import StrategyInstance, TradingRuntime
+    from core.storage import InMemoryStore
+
+    rt = TradingRuntime(None, portfolio=Portfolio(PortfolioConfig()))
+    own, shared = InMemoryStore(), InMemoryStore()
+    own.set_equity(7_000.0)
+    for pair, store in (("A", own), ("B", shared), ("C", shared)):   # B и C на одном счёте
+        rt.add(StrategyInstance(pair, "1m", None, RiskEngine(RiskConfig(1.0, 5.0, 2.0), store.get_equity),
+                                IndicatorEngine({}), store))
+    assert rt.portfolio.equity() == 17_000.0
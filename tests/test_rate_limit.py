@@ -0,0 +1,45 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import asyncio, threading, time
+
+import pytest
+
+from utils.rate_limit import TokenBucket
+
+
+def test_burst_up_to_capacity_then_wait_at_rate():
+    b = TokenBucket(rate=10, capacity=3)
+    assert [b._reserve(1) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert b._reserve(1) == pytest.approx(0.1, abs=0.01)
+    assert b._reserve(2) == pytest.approx(0.3, abs=0.01)   # долг копится: ждём за всех, кто впереди
+
+
+def test_refill_is_capped_by_capacity():
+    b = TokenBucket(rate=1000, capacity=2)
+    b._reserve(2)
+    time.sleep(0.05)                                         # натекло бы 50 токенов
+    assert b._reserve(2) == 0.0
+    assert b._reserve(1) > 0
+
+
+def test_drain_blocks_for_retry_after():
+    b = TokenBucket(rate=100, capacity=100)
+    b.drain(0.5)
+    assert b._reserve(1) == pytest.approx(0.51, abs=0.02)
+
+
+def test_acquire_paces_threads_and_coroutines():
+    b = TokenBucket(rate=200, capacity=1)
+    t0 = time.monotonic()
+    threads = [threading.Thread(target=b.acquire) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert time.monotonic() - t0 >= 4 / 200 * 0.9
+
+    async def burst():
+        t0 = time.monotonic()
+        await asyncio.gather(*(b.aacquire() for _ in range(5)))
+        return time.monotonic() - t0
+    assert asyncio.run(burst()) >= 4 / 200 * 0.9
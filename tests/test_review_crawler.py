@@ -0,0 +1,225 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import asyncio, time
+from email.utils import formatdate
+
+import fakeredis
+import pytest
+from aiohttp import web
+
+from services.amazon.reviews.crawler import RedisWatermarks, ReviewCrawler
+from services.amazon.reviews.parser import parse_reviews_from_html
+
+
+def _html(reviews, dom_ids=False):
+    blocks = "".join(
+        f'<div class="review"{f" id=R{t}" if dom_ids else ""}><a class="review-title"><span>{t}</span></a>'
+        f'<i class="review-rating"><span>5.0 out of 5 stars</span></i>'
+        f'<span class="review-date">{d}</span><span class="review-text"><span>{t} body</span></span></div>'
+        for t, d in reviews
+    )
+    return f"<html><body>{blocks}</body></html>"
+
+
+class FakeAmazon:
+    """Отзывы по ASIN (новые первыми), по 10 на страницу; считает запросы и параллельность."""
+
+    def __init__(self, catalog, delay=0.0, dom_ids=False):
+        self.catalog, self.delay, self.dom_ids = catalog, delay, dom_ids
+        self.requests = []
+        self.in_flight = self.max_in_flight = 0
+
+    async def handle(self, request):
+        asin, page = request.match_info["asin"], int(request.query["page"])
+        self.requests.append((asin, page))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if asin not in self.catalog:
+                return web.Response(status=404)
+            chunk = self.catalog[asin][(page - 1) * 10: page * 10]
+            return web.Response(text=_html(chunk, self.dom_ids), content_type="text/html")
+        finally:
+            self.in_flight -= 1
+
+
+async def _serve(fake):
+    app = web.Application()
+    app.router.add_get("/{asin}", fake.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, lambda asin, page: f"http://127.0.0.1:{port}/{asin}?page={page}"
+
+
+async def _crawl(crawler, asins):
+    out = {}
+    async for res in crawler.crawl(asins):
+        out[res.asin] = res
+        crawler.commit(res)
+    return out
+
+
+def test_paginates_to_known_review_then_uses_watermark():
+    reviews = [(f"r{i}", f"day {i}") for i in range(30, 0, -1)]   # r30 — самый свежий
+    fake = FakeAmazon({"A1": reviews})
+
+    async def scenario():
+        runner, url_for = await _serve(fake)
+        marks = RedisWatermarks(fakeredis.FakeRedis(decode_responses=True))
+        try:
+            # первый обход без watermark: в БД уже есть r15 и старше
+            all_ids = [r["id"] for r in parse_reviews_from_html(_html(reviews))]
+            db = set(all_ids[15:])
+            crawler = ReviewCrawler(marks, known=lambda ids: db & set(ids), url_for=url_for,
+                                    host_rps=1000, max_pages=5)
+            res = (await _crawl(crawler, ["A1"]))["A1"]
+            assert [r["title"] for r in res.reviews] == [f"r{i}" for i in range(30, 15, -1)]
+            assert fake.requests == [("A1", 1), ("A1", 2)]
+
+            # без изменений — одна страница
+            fake.requests.clear()
+            res = (await _crawl(crawler, ["A1"]))["A1"]
+            assert res.unchanged and fake.requests == [("A1", 1)]
+
+            # новый отзыв сверху — только он
+            reviews.insert(0, ("r31", "day 31"))
+            res = (await _crawl(crawler, ["A1"]))["A1"]
+            assert [r["title"] for r in res.reviews] == ["r31"] and not res.unchanged
+        finally:
+            await runner.cleanup()
+    asyncio.run(scenario())
+
+
+def test_missing_watermark_falls_back_to_known():
+    reviews = [(f"r{i}", f"day {i}") for i in range(30, 0, -1)]
+    fake = FakeAmazon({"A1": reviews})
+
+    async def scenario():
+        runner, url_for = await _serve(fake)
+        marks = RedisWatermarks(fakeredis.FakeRedis(decode_responses=True))
+        marks.set("A1", "deleted-review")           # отзыв-watermark Amazon удалил
+        all_ids = [r["id"] for r in parse_reviews_from_html(_html(reviews))]
+        db = set(all_ids[3:])
+        try:
+            crawler = ReviewCrawler(marks, known=lambda ids: db & set(ids), url_for=url_for,
+                                    host_rps=1000, max_pages=5)
+            res = (await _crawl(crawler, ["A1"]))["A1"]
+        finally:
+            await runner.cleanup()
+        assert [r["title"] for r in res.reviews] == ["r30", "r29", "r28"]
+        assert fake.requests == [("A1", 1)]         # не листаем все max_pages
+        assert marks.get_many(["A1"]) == {"A1": all_ids[0]}
+    asyncio.run(scenario())
+
+
+def test_reviews_stored_under_legacy_hash_stop_the_crawl():
+    reviews = [(f"r{i}", f"day {i}") for i in range(30, 0, -1)]
+    fake = FakeAmazon({"A1": reviews, "A2": list(reviews)}, dom_ids=True)
+
+    async def scenario():
+        runner, url_for = await _serve(fake)
+        parsed = parse_reviews_from_html(_html(reviews, dom_ids=True))
+        marks = RedisWatermarks(fakeredis.FakeRedis(decode_responses=True))
+        marks.set("A1", parsed[0]["legacy_id"])             # watermark из времён хеш-id
+        db = {r["legacy_id"] for r in parsed[15:]}          # старые строки в БД — под хешами
+        try:
+            crawler = ReviewCrawler(marks, known=lambda ids: db & set(ids), url_for=url_for,
+                                    host_rps=1000, max_pages=5)
+            got = await _crawl(crawler, ["A1", "A2"])
+        finally:
+            await runner.cleanup()
+        assert got["A1"].unchanged and got["A1"].reviews == []
+        assert [r["id"] for r in got["A2"].reviews] == [f"Rr{i}" for i in range(30, 15, -1)]
+        assert sorted(fake.requests) == [("A1", 1), ("A2", 1), ("A2", 2)]
+    asyncio.run(scenario())
+
+
+def test_concurrency_cap_and_missing_asin():
+    catalog = {f"A{i}": [(f"x{i}", "d")] for i in range(12)}
+    fake = FakeAmazon(catalog, delay=0.03)
+
+    async def scenario():
+        runner, url_for = await _serve(fake)
+        try:
+            crawler = ReviewCrawler(url_for=url_for, concurrency=3, host_rps=1000)
+            got = await _crawl(crawler, list(catalog) + ["MISSING"])
+        finally:
+            await runner.cleanup()
+        assert len(got) == 13 and got["MISSING"].reviews == [] and got["MISSING"].error is None
+        assert all(len(got[a].reviews) == 1 for a in catalog)
+        assert fake.max_in_flight == 3
+    asyncio.run(scenario())
+
+
+def test_http_date_retry_after_is_honoured():
+    fake = FakeAmazon({"A": [("x", "d")]})
+    throttled = []
+    orig = fake.handle
+
+    async def handle(request):
+        if not throttled:
+            throttled.append(1)     # HTTP-date в прошлом — повтор сразу, без ValueError
+            return web.Response(status=429, headers={"Retry-After": formatdate(time.time() - 5, usegmt=True)})
+        return await orig(request)
+    fake.handle = handle
+
+    async def scenario():
+        runner, url_for = await _serve(fake)
+        try:
+            crawler = ReviewCrawler(url_for=url_for, host_rps=1000, backoff=30.0)
+            t0 = time.monotonic()
+            got = await _crawl(crawler, ["A"])
+        finally:
+            await runner.cleanup()
+        assert got["A"].error is None and [r["title"] for r in got["A"].reviews] == ["x"]
+        assert time.monotonic() - t0 < 5                # не backoff
+    asyncio.run(scenario())
+
+
+def test_monitor_skips_watermark_for_asin_whose_save_failed(monkeypatch):
+    pytest.importorskip("telegram")            # worker создаёт telegram.Bot при импорте
+    from unittest import mock
+    from services.amazon.reviews.crawler import CrawlResult
+    with mock.patch.dict(os.environ, {"DATABASE_URL": os.getenv("DATABASE_URL", "sqlite://")}):
+        from services.amazon.reviews import worker
+
+    committed, sent = [], []
+
+    class Crawler:
+        passes = 0
+
+        def __init__(self, **kw):
+            pass
+
+        async def crawl(self, asins):
+            Crawler.passes += 1
+            if Crawler.passes > 1:
+                raise asyncio.CancelledError      # один проход и выходим из бесконечного цикла
+            for asin in asins:
+                yield CrawlResult(asin, reviews=[{"id": f"{asin}-r", "title": "t", "text": "x", "rating": "5"}])
+
+        def commit(self, res):
+            committed.append(res.asin)
+
+    def save(res):
+        if res.asin == "BAD":
+            raise RuntimeError("db down")
+        return res.reviews
+
+    async def send(asin, reviews, user_ids):
+        sent.append(asin)
+
+    monkeypatch.setattr(worker, "ReviewCrawler", Crawler)
+    monkeypatch.setattr(worker, "RedisWatermarks", lambda r: None)
+    monkeypatch.setattr(worker, "get_active_asins", lambda: ["A", "BAD", "C"])
+    monkeypatch.setattr(worker, "get_authorized_user_ids", lambda: [7])
+    monkeypatch.setattr(worker, "save_new_reviews", save)
+    monkeypatch.setattr(worker, "send_to_telegram", send)
+    monkeypatch.setattr(worker, "REVIEW_INTERVAL", 0)
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(worker.run_review_monitor())
+    assert committed == ["A", "C"] and sent == ["A", "C"]
@@ -0,0 +1,75 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from unittest import mock
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+
+from database.crud import existing_review_ids, insert_reviews_stmt, save_review, save_reviews_bulk
+from database.models import Base, ProductReview
+
+
+def _review(i):
+    return {"id": f"R{i}", "title": f"t{i}", "rating": "5.0 out of 5 stars", "text": f"b{i}", "date": "d"}
+
+
+def _session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reviews.db'}")
+    Base.metadata.create_all(bind=engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    return sessionmaker(bind=engine)(), statements
+
+
+def test_bulk_save_skips_known_and_duplicates_in_few_statements(tmp_path):
+    session, statements = _session(tmp_path)
+    assert save_review(session, "A1", _review(3))
+    statements.clear()
+
+    page = [_review(i) for i in range(10)] + [_review(5)]   # дубль внутри пачки
+    saved = save_reviews_bulk(session, "A1", page)
+    assert [r["id"] for r in saved] == [f"R{i}" for i in range(10) if i != 3]
+    assert len(statements) == 2    # SELECT ... IN + один executemany INSERT
+    assert session.query(ProductReview).count() == 10
+
+    statements.clear()
+    assert existing_review_ids(session, ["R1", "R99", "R3"]) == {"R1", "R3"}
+    assert len(statements) == 1
+    assert save_reviews_bulk(session, "A1", page) == []
+    assert save_reviews_bulk(session, "A1", []) == []
+
+
+def test_postgres_statement_is_single_upsert_with_returning():
+    sql = str(insert_reviews_stmt([{"asin": "A1", "review_id": "R1", "title": "", "rating": "", "text": "",
+                                    "review_date": ""}]).compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (review_id) DO NOTHING" in sql and "RETURNING product_reviews.review_id" in sql
+
+
+def test_rows_saved_under_legacy_hash_are_not_new(tmp_path):
+    session, statements = _session(tmp_path)
+    old = {**_review(1), "id": "h" * 64}                       # строка до перехода на id из DOM
+    assert save_review(session, "A1", old)
+    page = [{**_review(1), "legacy_id": "h" * 64, "verified": True, "helpful_votes": 3},
+            {**_review(2), "legacy_id": "x" * 64, "verified": False, "helpful_votes": 0}]
+    saved = save_reviews_bulk(session, "A1", page)
+    assert [r["id"] for r in saved] == ["R2"]
+    row = session.query(ProductReview).filter_by(review_id="R2").one()
+    assert (row.verified, row.helpful_votes) == (False, 0)
+    assert session.query(ProductReview).count() == 2
+
+
+def test_init_db_adds_new_columns_to_existing_reviews_table(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:                                # схема до verified/helpful_votes
+        conn.execute(text("CREATE TABLE product_reviews (id INTEGER PRIMARY KEY, asin VARCHAR(255) NOT NULL, "
+                          "review_id VARCHAR(255) NOT NULL UNIQUE, title TEXT, rating VARCHAR(255), text TEXT, "
+                          "review_date VARCHAR, created_at DATETIME)"))
+    with mock.patch.dict(os.environ, {"DATABASE_URL": os.getenv("DATABASE_URL", "sqlite://")}):
+        from apps.init_db import add_missing_columns
+    assert add_missing_columns(engine) == ["product_reviews.verified", "product_reviews.helpful_votes"]
+    assert add_missing_columns(engine) == []
+    session = sessionmaker(bind=engine)()
+    assert save_reviews_bulk(session, "A1", [{**_review(1), "verified": True, "helpful_votes": 2}])
+    assert session.query(ProductReview.verified, ProductReview.helpful_votes).one() == (True, 2)
@@ -0,0 +1,61 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import hashlib, types
+
+from services.amazon.reviews.parser import iter_reviews, parse_reviews_from_html
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "amazon_reviews_page.html")
+
+
+def _page():
+    with open(FIXTURE, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_fixture_page_fields():
+    reviews = parse_reviews_from_html(_page())
+    assert len(reviews) == 10                      # вложенные <li>/<div> data-hook=review не дублируются
+    assert len({r["id"] for r in reviews}) == 10
+    first = reviews[0]
+    assert first["id"] == "R3V0K8QO2X1ABC"
+    assert first["title"] == "Exactly what I needed"   # не текст звёзд из иконки в заголовке
+    assert first["rating"] == "5.0 out of 5 stars"
+    assert first["date"] == "Reviewed in the United States on March 3, 2025"
+    assert first["text"] == "Works great with my setup.\nBattery lasts all week & the case feels solid."
+    assert first["verified"] is True and first["helpful_votes"] == 12
+    by_id = {r["id"]: r for r in reviews}
+    assert by_id["R1Z9Y8X7W6V5U4"]["helpful_votes"] == 1          # "One person found this helpful"
+    assert by_id["RQWERTY1234567"]["helpful_votes"] == 1024
+    assert by_id["R2AA11BB22CC33"]["verified"] is False and by_id["R2AA11BB22CC33"]["helpful_votes"] == 0
+
+
+def test_iter_reviews_is_lazy_and_handles_bytes_and_legacy_markup():
+    assert isinstance(iter_reviews(_page()), types.GeneratorType)
+    assert [r["id"] for r in iter_reviews(_page().encode())][:2] == ["R3V0K8QO2X1ABC", "R1Z9Y8X7W6V5U4"]
+    # старая разметка без id и data-hook — классы и id-хеш, как раньше
+    legacy = ('<div class="review"><a class="review-title"><span>T</span></a>'
+              '<i class="review-rating"><span>4.0 out of 5 stars</span></i>'
+              '<span class="review-date">d</span><span class="review-text"><span> b </span></span></div>')
+    (r,) = list(iter_reviews(legacy))
+    assert (r["title"], r["rating"], r["text"], r["verified"]) == ("T", "4.0 out of 5 stars", "b", False)
+    assert len(r["id"]) == 64 and r["legacy_id"] == r["id"]
+    assert list(iter_reviews("")) == []
+
+
+def _bs4_ids(html):
+    """id прежней версии парсера (BeautifulSoup, html.parser) — под ними отзывы лежат в БД."""
+    from bs4 import BeautifulSoup
+    ids = []
+    for block in BeautifulSoup(html, "html.parser").select(".review"):
+        text, date = block.select_one(".review-text span"), block.select_one(".review-date")
+        body = text.text.strip() if text else ''
+        date_str = date.text.strip() if date else ''
+        ids.append(hashlib.sha256(f"{body}_{date_str}".encode()).hexdigest())
+    return list(dict.fromkeys(ids))     # .review — и <li>, и вложенный <div>: каждый отзыв дважды
+
+
+def test_dom_id_reviews_keep_legacy_hash_key():
+    reviews = parse_reviews_from_html(_page())
+    assert all(r["id"].startswith("R") for r in reviews)
+    assert any("\n" in r["text"] for r in reviews)         # многострочные: <br> в тексте, но не в хеше
+    assert [r["legacy_id"] for r in reviews] == _bs4_ids(_page())
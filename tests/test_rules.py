@@ -0,0 +1,50 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.indicators import compute
+from core.rules import compile_rules, validate_rules
+
+INDICATORS = {
+    "ema_fast": {"type": "EMA", "length": 5},
+    "ema_slow": {"type": "EMA", "length": 13},
+    "rsi": {"type": "RSI", "length": 14},
+    "atr": {"type": "ATR", "length": 14},
+}
+ENTRY = {"all": [{"op": "crosses_above", "left": "ema_fast", "right": "ema_slow"},
+                 {"op": "<", "left": "rsi", "right": 65}], "confirm_bars": 1, "cooldown_bars": 2}
+EXIT = {"any": [{"op": "crosses_below", "left": "ema_fast", "right": "ema_slow"},
+                {"op": ">", "left": "rsi", "right": 75}]}
+
+
+def test_unknown_indicator_rejected():
+    bad = {"all": [{"op": "<", "left": "rsi_fast", "right": 30}]}
+    with pytest.raises(ValueError):
+        validate_rules(INDICATORS, bad)
+    with pytest.raises(ValueError):
+        validate_rules(INDICATORS, {"all": [{"op": "~", "left": "rsi", "right": 30}]})
+
+
+@pytest.mark.parametrize("confirm_bars", [1, 3])
+def test_scalar_matches_vector(confirm_bars):
+    rng = np.random.default_rng(5)
+    close = 100 + np.cumsum(rng.normal(0, 1, 800))
+    df = pd.DataFrame({"open": close, "high": close + 1, "low": close - 1, "close": close, "volume": 1.0})
+    cols = {k: df[k].to_numpy() for k in df.columns}
+    cols.update({k: v.to_numpy() for k, v in compute(df, INDICATORS).items()})
+
+    rules = compile_rules(INDICATORS, {**ENTRY, "confirm_bars": confirm_bars}, EXIT)
+    entry_v, exit_v = rules.signals(cols)
+
+    entry_f, exit_f = rules.entry.evaluator(), rules.exit.evaluator()
+    rows = [rules.row({k: cols[k][i] for k in rules.slots}) for i in range(len(df))]
+    nan_row = tuple(float("nan") for _ in rules.slots)
+    entry_s = [entry_f(rows[i], rows[i - 1] if i else nan_row) for i in range(len(df))]
+    exit_s = [exit_f(rows[i], rows[i - 1] if i else nan_row) for i in range(len(df))]
+
+    assert entry_s == entry_v.tolist()
+    assert exit_s == exit_v.tolist()
+    assert any(exit_s)
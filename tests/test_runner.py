@@ -0,0 +1,57 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import time
+from dataclasses import replace
+
+import pytest
+
+from apps.runner import _base_timeframe, _history, _minute_start_after, build_runtime
+from core.bar_store import BarStore
+from core.strategy import RuleStrategy, TrendFollowingStrategy
+from integrations.datafeeds.binance_history import BinanceHistoryLoader
+from tests.test_binance_history import MIN, FakeBinance
+from utils.config import load_config
+
+
+def test_base_timeframe_is_largest_native_divisor():
+    assert [_base_timeframe(tf) for tf in ("6h", "10m", "45m", "1w", "7m", "volume:100")] == \
+        ["2h", "5m", "15m", "1d", "1m", "1m"]
+    with pytest.raises(ValueError):
+        _base_timeframe("90s")
+
+
+def test_resampled_history_has_only_whole_closed_buckets(tmp_path):
+    now = int(time.time() * 1000)
+    fake = FakeBinance(now - now % MIN - 5000 * MIN)
+    loader = BinanceHistoryLoader(BarStore(str(tmp_path)), max_workers=4)
+    loader._session = fake
+    loader.history("ETH/USDT", "1m", limit=30)            # кэш с прошлого запуска короче нужного
+    bars = _history(loader, "ETH/USDT", "7m", bars=60)
+    step = 7 * MIN
+    opens = [int(b["ts"].timestamp() * 1000) for b in bars]
+    assert len(bars) == 60 and all(t % step == 0 for t in opens)
+    assert all(b - a == step for a, b in zip(opens, opens[1:]))
+    assert opens[-1] + step <= int(time.time() * 1000)                    # открытая корзина не отдаётся
+    # close корзины — close её последней минуты: все 7 минут на месте
+    assert [b["close"] for b in bars] == [(t + step - MIN) / MIN for t in opens]
+
+
+def test_minute_backfill_starts_after_last_seeded_bucket():
+    h = 3_600_000
+    after = _minute_start_after({("ETH/USDT", "1h"): 10 * h, ("ETH/USDT", "15m"): 10 * h + 45 * MIN,
+                                 ("BTC/USDT", "volume:5"): 123})
+    assert after == {("ETH/USDT", "1m"): 10 * h + 59 * MIN}
+
+
+def test_runtime_runs_rules_from_config():
+    cfg = load_config(os.path.join(os.path.dirname(__file__), "..", "config.yaml"))
+    runtime = build_runtime(cfg, exchange=None)
+    strategies = [inst.strategy for inst in runtime.all_instances()]
+    assert strategies and all(isinstance(s, RuleStrategy) for s in strategies)
+    assert strategies[0].rules.cooldown_bars == 8
+    if len(strategies) > 1:
+        assert strategies[0]._entry is not strategies[1]._entry      # confirm_bars считается по паре
+
+    plain = replace(cfg, entry_long={}, exit_long={}, pairs=None)
+    assert all(isinstance(inst.strategy, TrendFollowingStrategy)
+               for inst in build_runtime(plain, exchange=None).all_instances())
@@ -0,0 +1,128 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from core.indicators import IndicatorEngine
+from core.interfaces import AsyncAbstractExchangeAdapter
+from core.risk import RiskConfig, RiskEngine
+from core.runtime import StrategyInstance, TradingRuntime
+from core.storage import InMemoryStore
+from core.types import Side
+
+SPEC = {"ema_fast": {"type": "EMA", "length": 2}, "ema_slow": {"type": "EMA", "length": 4},
+        "rsi": {"type": "RSI", "length": 3}, "atr": {"type": "ATR", "length": 3}}
+
+
+class FillAll(AsyncAbstractExchangeAdapter):
+    def __init__(self):
+        self.sent = []
+
+    async def _fill(self, pair, side, qty, coid):
+        self.sent.append((pair, side))
+        return {"clientOrderId": coid, "status": "FILLED", "executedQty": str(qty), "cummulativeQuoteQty": str(qty * 10)}
+
+    async def buy_market(self, pair, qty, client_order_id=None):
+        return await self._fill(pair, "BUY", qty, client_order_id)
+
+    async def sell_market(self, pair, qty, client_order_id=None):
+        return await self._fill(pair, "SELL", qty, client_order_id)
+
+
+class AlwaysBuy:
+    def on_bar(self, df, pos):
+        return {"action": "BUY", "stop": 1.0} if pos.side == Side.FLAT else {"action": "HOLD"}
+
+
+def test_runtime_routes_bars_per_pair_and_tracks_positions():
+    async def go():
+        rt = TradingRuntime(FillAll())
+        for pair in ("A/USDT", "B/USDT"):
+            store = InMemoryStore()
+            rt.add(StrategyInstance(pair, "1m", AlwaysBuy(), RiskEngine(RiskConfig(1.0, 5.0, 2.0), store.get_equity),
+                                    IndicatorEngine(SPEC), store))
+        t0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+        async def events():
+            for i in range(3):
+                bar = {"ts": t0 + timedelta(minutes=i), "open": 10.0, "high": 11.0, "low": 9.0, "close": 10.0, "volume": 1.0}
+                yield "A/USDT", "1m", bar
+        await rt.run(events())
+        await rt.drain()
+        return rt
+
+    rt = asyncio.run(go())
+    a, b = rt.all_instances()
+    assert rt.exchange.sent == [("A/USDT", "BUY")]     # B не получала баров; повторной покупки нет
+    assert a.store.get_position().side == Side.LONG and a.pending is None
+    assert b.store.get_position().side == Side.FLAT
+    assert rt.bar_latency.count == 3
+
+
+def _bar(ts, close=10.0):
+    return {"ts": ts, "open": close, "high": close + 1, "low": close - 1, "close": close, "volume": 1.0}
+
+
+def test_seed_drops_open_bar_and_stream_duplicates():
+    t0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    now = t0 + timedelta(minutes=5, seconds=30)             # бар t0+5m ещё открыт
+
+    async def go():
+        rt = TradingRuntime(FillAll())
+        store = InMemoryStore()
+        inst = rt.add(StrategyInstance("A/USDT", "1m", AlwaysBuy(), RiskEngine(RiskConfig(1.0, 5.0, 2.0), store.get_equity),
+                                       IndicatorEngine(SPEC), store))
+        await rt.seed(lambda pair, tf: [_bar(t0 + timedelta(minutes=i)) for i in range(6)], now=now)
+        seeded = len(inst.bars)
+        await rt.on_event("A/USDT", "1m", _bar(t0 + timedelta(minutes=4)))   # дубль последнего из history
+        dup_orders = list(rt.exchange.sent)
+        await rt.on_event("A/USDT", "1m", _bar(t0 + timedelta(minutes=5), close=12.0))
+        await rt.drain()
+        return rt, inst, seeded, dup_orders
+
+    rt, inst, seeded, dup_orders = asyncio.run(go())
+    assert seeded == 5 and dup_orders == []
+    assert len(inst.bars) == 6 and inst.bars.last("close") == 12.0
+    assert rt.last_bar_ms() == {("A/USDT", "1m"): int((t0 + timedelta(minutes=5)).timestamp() * 1000)}
+    assert rt.exchange.sent == [("A/USDT", "BUY")]
+
+
+class LostResponse(AsyncAbstractExchangeAdapter):
+    """Ответ на ордер теряется; get_order сначала недоступен, потом отдаёт FILLED."""
+
+    def __init__(self):
+        self.lookups = 0
+
+    async def buy_market(self, pair, qty, client_order_id=None):
+        self.coid, self.qty = client_order_id, qty
+        raise asyncio.TimeoutError()
+
+    async def get_order(self, pair, order_id=None, client_order_id=None):
+        self.lookups += 1
+        if self.lookups == 1:
+            raise RuntimeError("Binance error [503]")
+        return {"clientOrderId": client_order_id, "orderId": 9, "status": "FILLED",
+                "executedQty": str(self.qty), "cummulativeQuoteQty": str(self.qty * 10)}
+
+
+def test_fill_timeout_keeps_pending_until_order_is_reconciled():
+    from core.portfolio import Portfolio, PortfolioConfig
+
+    async def go():
+        rt = TradingRuntime(LostResponse(), fill_timeout=0.02, portfolio=Portfolio(PortfolioConfig()))
+        store = InMemoryStore()
+        inst = rt.add(StrategyInstance("A/USDT", "1m", AlwaysBuy(), RiskEngine(RiskConfig(1.0, 5.0, 2.0), store.get_equity),
+                                       IndicatorEngine(SPEC), store))
+        t0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        for i in range(3):
+            await rt.on_event("A/USDT", "1m", _bar(t0 + timedelta(minutes=i)))
+        await asyncio.sleep(0.03)
+        mid = (inst.pending is not None, rt.portfolio.open_count == 1, rt.exchange.lookups)
+        await rt.drain()
+        return rt, inst, store, mid
+
+    rt, inst, store, (pending, reserved, lookups) = asyncio.run(go())
+    assert pending and reserved and lookups == 1       # после первого таймаута ордер не брошен
+    assert rt.exchange.lookups == 2 and inst.pending is None
+    assert store.get_position().side == Side.LONG and store.get_position().qty == rt.exchange.qty
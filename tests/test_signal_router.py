@@ -0,0 +1,145 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio, hashlib, hmac, json, threading, time
+from datetime import datetime, timedelta, timezone
+
+import fakeredis
+import fakeredis.aioredis
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from redis.exceptions import ResponseError
+
+from integrations.signals import tradingview_webhook as tv
+from core.indicators import IndicatorEngine
+from core.risk import RiskConfig, RiskEngine
+from core.runtime import StrategyInstance, TradingRuntime
+from core.storage import InMemoryStore
+from core.types import Side
+from services import signal_router as sr
+from tests.test_runtime import SPEC, FillAll
+
+
+def _app(server):
+    app = FastAPI()
+    app.include_router(tv.router)
+    app.dependency_overrides[tv.get_redis] = lambda: fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+    return TestClient(app)
+
+
+def _post(client, body):
+    raw = json.dumps(body).encode()
+    sig = hmac.new(tv.TV_SECRET.encode(), raw, hashlib.sha256).hexdigest()
+    return client.post("/tv/webhook", content=raw, headers={"X-Signature": sig})
+
+
+def test_webhook_dedups_and_worker_routes_at_least_once():
+    server = fakeredis.FakeServer()
+    client = _app(server)
+    body = {"symbol": "BINANCE:ETHUSDT", "timeframe": "15m", "signal": "BUY", "price": 3000.5, "ts": 1_700_000_000_000}
+
+    first = _post(client, body).json()
+    assert first["ok"] and "id" in first
+    assert _post(client, body).json() == {"ok": True, "duplicate": True}
+    assert _post(client, {**body, "signal": "SELL"}).json()["ok"]
+
+    r = fakeredis.FakeRedis(server=server, decode_responses=True)
+    assert r.xlen(sr.STREAM_KEY) == 2
+
+    got, fail = [], {"left": 1}
+    def handler(sig):
+        if fail["left"]:                    # первая доставка падает → сообщение остаётся в PEL
+            fail["left"] -= 1
+            raise RuntimeError("boom")
+        got.append((sig.symbol, sig.signal, sig.price))
+
+    sr.unregister_all()
+    sr.register(handler, symbol="ETHUSDT")
+    try:
+        crashed = sr.SignalWorker(r, consumer="w1", block_ms=10, claim_idle_ms=1)
+        crashed.ensure_group()
+        crashed.poll()
+        assert got == [("ETHUSDT", "SELL", 3000.5)]
+        time.sleep(0.005)
+        sr.SignalWorker(r, consumer="w2", block_ms=10, claim_idle_ms=1).poll()   # XAUTOCLAIM
+        assert sorted(got) == [("ETHUSDT", "BUY", 3000.5), ("ETHUSDT", "SELL", 3000.5)]
+        assert r.xpending(sr.STREAM_KEY, sr.GROUP_NAME)["pending"] == 0
+    finally:
+        sr.unregister_all()
+
+
+def test_poison_message_goes_to_dead_letter():
+    r = fakeredis.FakeRedis(decode_responses=True)
+    w = sr.SignalWorker(r, consumer="w", block_ms=10, claim_idle_ms=0, max_deliveries=2)
+    w.ensure_group()
+    r.xadd(sr.STREAM_KEY, {"symbol": "X"})          # битое сообщение
+    for _ in range(3):
+        w.poll()
+    assert r.xlen(sr.DEAD_LETTER_KEY) == 1
+    assert r.xpending(sr.STREAM_KEY, sr.GROUP_NAME)["pending"] == 0
+
+
+def test_unrouted_signal_is_not_acked_and_dead_letters():
+    r = fakeredis.FakeRedis(decode_responses=True)
+    w = sr.SignalWorker(r, consumer="w", block_ms=10, claim_idle_ms=0, max_deliveries=2)
+    w.ensure_group()
+    sig = sr.Signal("ETHUSDT", "15m", "BUY", 3000.0, datetime(2024, 1, 1, tzinfo=timezone.utc))
+    r.xadd(sr.STREAM_KEY, sig.to_fields())
+    sr.unregister_all()
+    w.poll()
+    assert w.processed == 0 and r.xpending(sr.STREAM_KEY, sr.GROUP_NAME)["pending"] == 1
+    w.poll()
+    w.poll()
+    assert r.xlen(sr.DEAD_LETTER_KEY) == 1
+    assert r.xpending(sr.STREAM_KEY, sr.GROUP_NAME)["pending"] == 0
+
+
+class Hold:
+    def on_bar(self, df, pos):
+        return {"action": "HOLD"}
+
+
+def test_registered_runtime_trades_routed_signals():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    store = InMemoryStore()
+    rt = TradingRuntime(FillAll())
+    inst = rt.add(StrategyInstance("ETH/USDT", "15m", Hold(), RiskEngine(RiskConfig(1.0, 5.0, 2.0), store.get_equity),
+                                   IndicatorEngine(SPEC), store))
+    t0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    inst.seed([{"ts": t0 + timedelta(minutes=15 * i), "open": 10.0, "high": 11.0, "low": 9.0, "close": 10.0,
+                "volume": 1.0} for i in range(6)])
+
+    r = fakeredis.FakeRedis(decode_responses=True)
+    w = sr.SignalWorker(r, consumer="w", block_ms=10)
+    w.ensure_group()
+    sr.unregister_all()
+    try:
+        sr.register_runtime(rt, loop)
+        r.xadd(sr.STREAM_KEY, sr.Signal("ETHUSDT", "15m", "BUY", 10.0, t0, source="tradingview").to_fields())
+        r.xadd(sr.STREAM_KEY, sr.Signal("BTCUSDT", "15m", "BUY", 10.0, t0).to_fields())    # нет инстанса
+        w.poll()
+        asyncio.run_coroutine_threadsafe(rt.drain(), loop).result(5)
+    finally:
+        sr.unregister_all()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+    assert rt.exchange.sent == [("ETH/USDT", "BUY")]
+    pos = store.get_position()
+    assert pos.side == Side.LONG and pos.stop == 10.0 - 2.0 * inst.bars.last("atr")
+    assert w.processed == 1 and r.xpending(sr.STREAM_KEY, sr.GROUP_NAME)["pending"] == 1
+
+
+def test_ensure_group_is_idempotent_but_surfaces_other_errors():
+    r = fakeredis.FakeRedis(decode_responses=True)
+    w = sr.SignalWorker(r, consumer="w", block_ms=10)
+    w.ensure_group()
+    w.ensure_group()                                # BUSYGROUP — не ошибка
+    assert [g["name"] for g in r.xinfo_groups(sr.STREAM_KEY)] == [sr.GROUP_NAME]
+
+    r.delete(sr.STREAM_KEY)
+    r.set(sr.STREAM_KEY, "not a stream")            # WRONGTYPE глотать нельзя
+    with pytest.raises(ResponseError, match="WRONGTYPE"):
+        w.ensure_group()
@@ -0,0 +1,47 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pandas as pd
+
+from core.signals import (
+    confirm, streak, n_of_m, bars_since, held_since,
+    Confirm, NofM, HeldSince,
+)
+
+
+def _legacy_confirm(series_bool, bars):
+    return series_bool.rolling(bars).apply(lambda x: x.all(), raw=False).astype(bool)
+
+
+def _flags(n=2000, p=0.7, seed=11):
+    return pd.Series(np.random.default_rng(seed).random(n) < p)
+
+
+def test_confirm_matches_legacy_after_warmup():
+    s = _flags()
+    for bars in (1, 2, 5):
+        new, old = confirm(s, bars), _legacy_confirm(s, bars)
+        # старая версия отдавала TRUE на прогреве (NaN → bool)
+        assert new.iloc[bars - 1:].tolist() == old.iloc[bars - 1:].tolist()
+        assert not new.iloc[:bars - 1].any()
+
+
+def test_helpers():
+    s = pd.Series([True, True, False, True, True, True, False])
+    assert streak(s).tolist() == [1, 2, 0, 1, 2, 3, 0]
+    assert n_of_m(s, 2, 3).tolist() == [False, False, True, True, True, True, True]
+    ev = pd.Series([False, True, False, False, False, True, False])
+    assert bars_since(ev).tolist() == [-1, 0, 1, 2, 3, 0, 1]
+    assert held_since(ev, s).tolist() == [False, True, False, False, False, True, False]
+
+
+def test_streaming_matches_vectorized():
+    s, ev = _flags(seed=1), _flags(p=0.05, seed=2)
+    c, nm, hs = Confirm(3), NofM(4, 6), HeldSince()
+    got_c = [c.update(x) for x in s]
+    got_nm = [nm.update(x) for x in s]
+    got_hs = [hs.update(e, x) for e, x in zip(ev, s)]
+    assert got_c == confirm(s, 3).tolist()
+    assert got_nm == n_of_m(s, 4, 6).tolist()
+    assert got_hs == held_since(ev, s).tolist()
@@ -0,0 +1,77 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+from decimal import Decimal
+
+import pytest
+
+from core.orders import LocalUserDataStream, OrderTracker
+from core.types import OrderRequest
+from integrations.exchanges.simulated import AsyncSimulatedExchangeAdapter, SimulatedExchangeAdapter, SyntheticBook
+from integrations.exchanges.binance import SymbolFilters
+
+ETH = SymbolFilters("ETHUSDT", step_size=Decimal("0.001"), tick_size=Decimal("0.01"),
+                    min_qty=Decimal("0.001"), min_notional=Decimal("5"))
+
+
+def test_fill_applies_filters_fees_slippage_and_balances():
+    ex = SimulatedExchangeAdapter(filters={"ETHUSDT": ETH}, taker_fee_pct=0.1, slippage_bps=10)
+    ex.on_bar("ETH/USDT", {"close": 2000.0})
+    r = ex.buy_market("ETH/USDT", 1.23456, "c1")
+    assert r["status"] == "FILLED" and r["executedQty"] == "1.23400000"     # LOT_SIZE
+    assert r["fills"][0]["price"] == "2002.00000000"                        # +10 bps
+    assert abs(ex.balances["USDT"] - (10_000 - 2002 * 1.234 * 1.001)) < 1e-6
+    assert ex.balances["ETH"] == pytest.approx(1.234)
+    assert ex.get_order("ETH/USDT", client_order_id="c1") is r
+
+    with pytest.raises(RuntimeError):
+        ex.sell_market("ETH/USDT", 5.0)                                      # нет столько ETH
+    with pytest.raises(RuntimeError, match="NOTIONAL"):
+        ex.buy_market("ETH/USDT", 0.002)                                     # NOTIONAL < 5
+    with pytest.raises(RuntimeError, match="LOT_SIZE"):
+        ex.buy_market("ETH/USDT", 0.0009)                                    # < minQty
+
+
+def test_get_order_by_order_id_or_client_order_id():
+    ex = SimulatedExchangeAdapter(filters={"ETHUSDT": ETH})
+    ex.set_price("ETH/USDT", 2000.0)
+    ex.set_price("BTC/USDT", 30000.0)
+    first = ex.buy_market("ETH/USDT", 0.01, "c1")
+    again = ex.buy_market("ETH/USDT", 0.01, "c1")          # маркет уже исполнен — id можно переиспользовать
+    btc = ex.buy_market("BTC/USDT", 0.001, "c1")
+    assert ex.get_order("ETH/USDT", first["orderId"]) is first
+    assert ex.get_order("ETH/USDT", str(again["orderId"])) is again          # orderId строкой, как из ответа REST
+    assert ex.get_order("ETH/USDT", client_order_id="c1") is again           # последний с этим clientOrderId
+    assert ex.get_order("BTC/USDT", client_order_id="c1") is btc
+    assert ex.get_order("ETH/USDT", first["orderId"], client_order_id="c1") is first   # orderId приоритетнее
+    with pytest.raises(RuntimeError, match="-2013"):
+        ex.get_order("ETH/USDT", btc["orderId"])                             # чужой символ
+    with pytest.raises(RuntimeError, match="-2013"):
+        ex.get_order("ETH/USDT", "c1")                                       # clientOrderId вместо orderId
+    with pytest.raises(ValueError):
+        ex.get_order("ETH/USDT")
+
+
+def test_synthetic_book_walks_levels():
+    book = SyntheticBook(half_spread_bps=0.0, level_bps=100.0, level_qty=1.0)
+    # 1 @ 100, 1 @ 101, 0.5 @ 102
+    assert book.avg_price(100.0, 2.5, "BUY") == pytest.approx((100 + 101 + 51) / 2.5)
+    assert book.avg_price(100.0, 1.0, "SELL") == pytest.approx(100.0)
+
+
+def test_async_adapter_feeds_order_tracker_via_user_stream():
+    async def go():
+        stream = LocalUserDataStream()
+        ex = AsyncSimulatedExchangeAdapter(check_balance=False, user_stream=stream)
+        ex.set_price("BTC/USDT", 50_000.0)
+        tracker = OrderTracker()
+        consumer = asyncio.create_task(tracker.consume(stream.events()))
+        futs = await tracker.submit(ex, [OrderRequest("BTC/USDT", "BUY", 0.01), OrderRequest("NOPE/USDT", "BUY", 1)])
+        st = await futs[0]
+        with pytest.raises(RuntimeError):
+            await futs[1]
+        consumer.cancel()
+        return st
+    st = asyncio.run(go())
+    assert st.status == "FILLED" and st.avg_price == pytest.approx(50_000.0)
@@ -0,0 +1,132 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import threading, time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+from services.amazon.sp_api import SpApiClient
+
+
+def _response(status: int, body: str = "{}", headers=None) -> requests.Response:
+    r = requests.Response()
+    r.status_code = status
+    r._content = body.encode()
+    r.headers.update(headers or {})
+    return r
+
+
+class FakeSession:
+    """Отдаёт заготовленные статусы по очереди и запоминает запросы."""
+
+    def __init__(self, statuses, retry_after="0.01"):
+        self.statuses = list(statuses)
+        self.retry_after = retry_after
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def request(self, method, url, headers=None, params=None, json=None, timeout=None):
+        with self._lock:
+            self.calls.append((method, url, headers["x-amz-access-token"], time.monotonic()))
+            status = self.statuses.pop(0) if self.statuses else 200
+        return _response(status, headers={"Retry-After": self.retry_after} if status == 429 else None)
+
+
+def test_retries_429_then_returns_success():
+    s = FakeSession([429, 429, 200])
+    c = SpApiClient(session=s, backoff=0.01, token_provider=lambda: "tok", limits={"getOrder": (1000.0, 1)})
+    r = c.request("getOrder", "GET", "/orders/v0/orders/1")
+    assert r.status_code == 200 and len(s.calls) == 3
+    assert s.calls[0][1].endswith("/orders/v0/orders/1") and s.calls[0][2] == "tok"
+
+
+def test_gives_up_after_max_retries_and_leaves_status_to_caller():
+    s = FakeSession([503] * 10)
+    c = SpApiClient(session=s, backoff=0.001, max_retries=2, token_provider=lambda: "tok")
+    assert c.request("getOrder", "GET", "/x").status_code == 503
+    assert len(s.calls) == 3
+
+
+class TimeoutSession(FakeSession):
+    def request(self, method, url, headers=None, params=None, json=None, timeout=None):
+        self.calls.append((method, url, headers["x-amz-access-token"], time.monotonic()))
+        raise requests.ReadTimeout("read timed out")
+
+
+def test_post_is_retried_only_on_429():
+    limits = {"createSolicitation": (1000.0, 10)}
+    s = FakeSession([503, 200])
+    c = SpApiClient(session=s, backoff=0.001, token_provider=lambda: "tok", limits=limits)
+    assert c.request("createSolicitation", "POST", "/s").status_code == 503 and len(s.calls) == 1
+
+    s = FakeSession([429, 200])
+    c = SpApiClient(session=s, backoff=0.001, token_provider=lambda: "tok", limits=limits)
+    assert c.request("createSolicitation", "POST", "/s").status_code == 200 and len(s.calls) == 2
+
+    s = TimeoutSession([])
+    c = SpApiClient(session=s, backoff=0.001, token_provider=lambda: "tok", limits=limits)
+    with pytest.raises(requests.Timeout):
+        c.request("createSolicitation", "POST", "/s")
+    assert len(s.calls) == 1
+
+    s = FakeSession([503, 200])                     # вызывающий знает, что повтор безопасен
+    c = SpApiClient(session=s, backoff=0.001, token_provider=lambda: "tok", limits=limits)
+    assert c.request("createSolicitation", "POST", "/s", idempotent=True).status_code == 200 and len(s.calls) == 2
+
+
+def test_operations_have_independent_rate_limits():
+    s = FakeSession([])
+    c = SpApiClient(session=s, token_provider=lambda: "tok",
+                    limits={"slow": (20.0, 1), "fast": (1000.0, 100)})
+    t0 = time.monotonic()
+    for _ in range(5):
+        c.request("fast", "GET", "/f")
+    assert time.monotonic() - t0 < 0.05
+    for _ in range(3):
+        c.request("slow", "GET", "/s")
+    # burst 1, затем по 50 мс на запрос
+    assert time.monotonic() - t0 >= 0.09
+
+
+def test_403_refreshes_token_once():
+    tokens = iter(["old", "new"])
+    invalidated = []
+    import services.amazon.sp_api as sp
+    orig = sp.invalidate_access_token
+    sp.invalidate_access_token = invalidated.append
+    try:
+        s = FakeSession([403, 200])
+        c = SpApiClient(session=s, token_provider=lambda: next(tokens))
+        assert c.request("getOrder", "GET", "/x").status_code == 200
+    finally:
+        sp.invalidate_access_token = orig
+    assert invalidated == ["old"] and [call[2] for call in s.calls] == ["old", "new"]
+
+
+def test_429_waits_retry_after_once_via_bucket():
+    s = FakeSession([429, 200], retry_after="0.2")
+    c = SpApiClient(session=s, token_provider=lambda: "tok", limits={"getOrder": (1000.0, 10)})
+    t0 = time.monotonic()
+    assert c.request("getOrder", "GET", "/x").status_code == 200
+    assert 0.2 <= s.calls[1][3] - s.calls[0][3] < 0.35          # drain без второго sleep поверх
+    assert time.monotonic() - t0 < 0.35
+
+
+def test_retry_after_accepts_seconds_http_date_or_falls_back_to_backoff():
+    c = SpApiClient(session=FakeSession([]), backoff=1.0, token_provider=lambda: "tok")
+    wait = lambda header, attempt=0: c._retry_after(_response(429, headers={"Retry-After": header}), attempt)
+    assert wait("3") == 3.0
+    assert wait(formatdate(time.time() + 30, usegmt=True)) == pytest.approx(30, abs=1.5)
+    assert wait(formatdate(time.time() - 30, usegmt=True)) == 0.0        # дата в прошлом — не ждём
+    assert 2.0 <= wait("soon", attempt=2) <= 4.0                          # мусор — backoff * 2^attempt с jitter
+
+
+@pytest.mark.parametrize("status, expected", [(200, False), (404, False), (429, None), (503, None), (403, None)])
+def test_review_eligibility_is_unknown_unless_200_or_404(monkeypatch, status, expected):
+    import services.amazon.solicitations as sol
+    import services.amazon.sp_api as sp
+    monkeypatch.setattr(sp, "invalidate_access_token", lambda token: None)
+    client = SpApiClient(session=FakeSession([status] * 3), max_retries=0, token_provider=lambda: "tok")
+    monkeypatch.setattr(sol, "get_client", lambda: client)
+    assert sol.get_review_eligibility("O-1") is expected
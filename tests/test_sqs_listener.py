@@ -0,0 +1,122 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import asyncio, json, threading, time
+from unittest import mock
+
+with mock.patch.dict(os.environ, {"DATABASE_URL": os.getenv("DATABASE_URL", "sqlite://")}):   # engine при импорте
+    from services.amazon import sqs_listener as sl
+
+
+def _body(order_id, status="Unshipped"):
+    return json.dumps({"Payload": {"OrderChangeNotification": {
+        "AmazonOrderId": order_id,
+        "Summary": {"OrderStatus": status, "OrderItems": [{"Quantity": 1}], "FulfillmentType": "MFN"},
+    }}})
+
+
+class FakeSQS:
+    """Одна пачка сообщений, дальше пустой long poll; delete/visibility запоминаются."""
+
+    def __init__(self, bodies, receives=1):
+        self.batches = [[{"MessageId": f"m{i}", "ReceiptHandle": f"h{i}", "Body": b,
+                          "Attributes": {"ApproximateReceiveCount": str(receives)}} for i, b in enumerate(bodies)]]
+        self.received = []
+        self.deleted, self.extended = [], []
+        self._lock = threading.Lock()
+
+    def receive_message(self, **kw):
+        self.received.append(kw)
+        with self._lock:
+            if self.batches:
+                return {"Messages": self.batches.pop(0)}
+        time.sleep(0.01)
+        return {}
+
+    def delete_message_batch(self, QueueUrl, Entries):
+        with self._lock:
+            self.deleted += [e["ReceiptHandle"] for e in Entries]
+        return {"Successful": [{"Id": e["Id"]} for e in Entries]}
+
+    def change_message_visibility_batch(self, QueueUrl, Entries):
+        with self._lock:
+            self.extended += [e["ReceiptHandle"] for e in Entries]
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        self.sent.append((chat_id, text))
+
+
+def test_failed_order_fetch_is_not_deleted_or_sent(monkeypatch):
+    def get_order(order_id):
+        if order_id == "BAD":
+            raise RuntimeError("SP-API 503")
+        return {"payload": {"OrderTotal": {"Amount": "9.99", "CurrencyCode": "USD"}}}
+
+    bot, reviews = FakeBot(), []
+    monkeypatch.setattr(sl, "get_order", get_order)
+    monkeypatch.setattr(sl, "get_items", lambda order_id: {"payload": {"OrderItems": [{"Title": f"item {order_id}"}]}})
+    monkeypatch.setattr(sl, "get_authorized_user_ids", lambda: [7])
+    monkeypatch.setattr(sl, "get_bot", lambda: bot)
+    monkeypatch.setattr(sl, "enqueue_review", reviews.append)
+    monkeypatch.setattr(sl, "DELETE_FLUSH_SEC", 0.01)
+    sqs = FakeSQS([_body("OK-1"), _body("BAD"), _body("OK-2", "Shipped")])
+    pipeline = sl.SqsPipeline(sqs, "q", workers=2, visibility_timeout=0.2)
+
+    async def run():
+        task = asyncio.create_task(pipeline.run())
+        while len(sqs.deleted) < 2:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.2)                        # BAD за это время не удаляется и не продлевается
+        task.cancel()
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+    assert sorted(sqs.deleted) == ["h0", "h2"]
+    assert "h1" not in sqs.extended and pipeline._inflight == {}
+    assert sorted(text.split("Товары:</b> ")[1].split("\n")[0] for _, text in bot.sent) == ["item OK-1", "item OK-2"]
+    assert all(chat == 7 and "9.99 USD" in text for chat, text in bot.sent)
+    assert reviews == ["OK-2"]
+
+
+def _failing_pipeline(monkeypatch, sqs):
+    def get_order(order_id):
+        raise RuntimeError("SP-API 503")
+
+    bot = FakeBot()
+    monkeypatch.setattr(sl, "get_order", get_order)
+    monkeypatch.setattr(sl, "get_items", lambda order_id: {"payload": {"OrderItems": []}})
+    monkeypatch.setattr(sl, "get_authorized_user_ids", lambda: [7])
+    monkeypatch.setattr(sl, "get_bot", lambda: bot)
+    monkeypatch.setattr(sl, "DELETE_FLUSH_SEC", 0.01)
+    return sl.SqsPipeline(sqs, "q", workers=2, visibility_timeout=0.2, max_receives=3), bot
+
+
+def _run_until(pipeline, done, settle=0.1):
+    async def run():
+        task = asyncio.create_task(pipeline.run())
+        while not done():
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(settle)
+        task.cancel()
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+
+
+def test_non_order_and_malformed_messages_are_dropped(monkeypatch):
+    other = json.dumps({"NotificationType": "ANY_OFFER_CHANGED", "Payload": {"AnyOfferChangedNotification": {}}})
+    sqs = FakeSQS([other, "not json", _body("BAD")])
+    pipeline, bot = _failing_pipeline(monkeypatch, sqs)
+    _run_until(pipeline, lambda: len(sqs.deleted) >= 2)
+    assert sorted(sqs.deleted) == ["h0", "h1"]           # BAD (receive 1 из 3) вернётся в очередь
+    assert bot.sent == []
+    assert sqs.received[0]["AttributeNames"] == ["ApproximateReceiveCount"]
+
+
+def test_message_is_dropped_after_max_receives(monkeypatch):
+    sqs = FakeSQS([_body("BAD")], receives=3)
+    pipeline, bot = _failing_pipeline(monkeypatch, sqs)
+    _run_until(pipeline, lambda: sqs.deleted, settle=0.05)
+    assert sqs.deleted == ["h0"] and pipeline._inflight == {} and bot.sent == []
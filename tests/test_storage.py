@@ -0,0 +1,149 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from core.storage import SqlStore
+from core.types import Position, Side
+from database.models import (Base, DailyPnL, Order, Position as PositionRow, PositionStatus, StoreJournal,
+                             StoreSnapshot, Trade)
+
+
+def _session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'store.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+
+def _round_trip(store):
+    store.set_position(Position(side=Side.LONG, qty=2.0, entry=100.0, stop=95.0, tp1=None, meta={}))
+    store.record_fill("c-1", "BUY", 2.0, 100.0)
+    store.set_day_pnl_pct(1.0)
+    store.set_equity(10_100.0)
+    store.set_position(Position(side=Side.FLAT, qty=0.0, entry=None, stop=None, tp1=None, meta={}))
+    store.record_fill("c-2", "SELL", 2.0, 150.0)
+
+
+def test_write_behind_persists_domain_rows(tmp_path):
+    Session = _session_factory(tmp_path)
+    store = SqlStore(Session, key="ETH:15m", symbol="ETH/USDT", strategy="trend", flush_interval=0.01)
+    _round_trip(store)
+    assert store.get_equity() == 10_100.0          # память обновилась сразу
+    assert store.flush(5)
+    store.close(5)
+
+    with Session() as s:
+        pos = s.query(PositionRow).one()
+        assert pos.status == PositionStatus.CLOSED and float(pos.realized_pnl) == 100.0
+        assert s.query(Order).count() == 2 and s.query(Trade).count() == 2
+        assert all(o.position_id == pos.id for o in s.query(Order))
+        day = s.query(DailyPnL).one()
+        assert float(day.equity) == 10_100.0 and float(day.realized_pnl) == 100.0
+
+
+def test_recovery_from_snapshot_plus_journal(tmp_path):
+    Session = _session_factory(tmp_path)
+    store = SqlStore(Session, key="k", flush_interval=0.01, snapshot_every=3)
+    _round_trip(store)
+    store.set_position(Position(side=Side.LONG, qty=1.0, entry=120.0, stop=110.0, tp1=None, meta={"coid": "c-3"}))
+    store.flush(5)   # без close(): имитируем падение — хвост после снапшота остался только в журнале
+
+    with Session() as s:
+        # журнал, покрытый снапшотом, удалён; остался только хвост после него
+        snap = s.get(StoreSnapshot, "k")
+        seqs = [r.seq for r in s.query(StoreJournal).filter(StoreJournal.key == "k").order_by(StoreJournal.seq)]
+        assert snap.seq >= 3 and seqs == list(range(snap.seq + 1, 8))
+
+    again = SqlStore(Session, key="k", flush_interval=0.01)
+    pos = again.get_position()
+    assert (pos.side, pos.qty, pos.stop, pos.meta) == (Side.LONG, 1.0, 110.0, {"coid": "c-3"})
+    assert again.get_equity() == 10_100.0 and again.get_day_pnl_pct() == 1.0
+
+    # позиция, открытая до рестарта, закрывается той же строкой в positions
+    again.set_position(Position(side=Side.FLAT, qty=0.0, entry=None, stop=None, tp1=None, meta={}))
+    again.close(5)
+    with Session() as s:
+        assert s.query(PositionRow).filter(PositionRow.status == PositionStatus.OPEN).count() == 0
+        assert s.query(PositionRow).count() == 2
+    store.close(5)
+
+
+def test_pnl_day_survives_restart_and_resets_on_new_day(tmp_path):
+    from datetime import date, datetime, timezone
+    from core.indicators import IndicatorEngine
+    from core.risk import RiskConfig, RiskEngine
+    from core.runtime import StrategyInstance
+
+    Session = _session_factory(tmp_path)
+
+    def instance(store):
+        return StrategyInstance("ETH/USDT", "1h", None, RiskEngine(RiskConfig(1.0, 3.0, 2.0), store.get_equity),
+                                IndicatorEngine({}), store)
+
+    def bar(day, hour):
+        return {"ts": datetime(2024, 1, day, hour, tzinfo=timezone.utc), "open": 1.0, "high": 1.0, "low": 1.0,
+                "close": 1.0, "volume": 1.0}
+
+    store = SqlStore(Session, key="k", flush_interval=0.01)
+    inst = instance(store)
+    inst._roll_day(bar(1, 9))
+    store.set_day_pnl_pct(-4.0)                        # kill switch сработал 1 января
+    store.close(5)
+
+    again = SqlStore(Session, key="k", flush_interval=0.01)
+    assert again.get_pnl_day() == date(2024, 1, 1) and again.get_day_pnl_pct() == -4.0
+    inst = instance(again)
+    inst._roll_day(bar(1, 15))                         # рестарт посреди того же дня — не сбрасываем
+    assert inst.risk.daily_kill_switch(again.get_day_pnl_pct())
+    inst._roll_day(bar(2, 0))
+    assert again.get_day_pnl_pct() == 0.0 and again.get_pnl_day() == date(2024, 1, 2)
+    again.close(5)
+
+    third = SqlStore(Session, key="k", flush_interval=0.01)    # через полночь в простое — сброс на первом баре
+    inst = instance(third)
+    third.set_day_pnl_pct(-4.0)
+    inst._roll_day(bar(3, 1))
+    assert third.get_day_pnl_pct() == 0.0
+    third.close(5)
+
+
+def test_poison_op_is_dead_lettered_and_batch_neighbours_are_written(tmp_path):
+    Session = _session_factory(tmp_path)
+    store = SqlStore(Session, key="k", flush_interval=0.05, retry_backoff=0.001)
+    store.set_equity(10_050.0)
+    store.record_fill("bad", "BUY", None, 100.0)       # orders.qty NOT NULL
+    store.record_fill("good", "BUY", 1.0, 100.0)
+    store.close(5)
+
+    assert [op[2]["coid"] for op, _ in store.dead_letters] == ["bad"]
+    with Session() as s:
+        assert [o.client_order_id for o in s.query(Order)] == ["good"]
+    again = SqlStore(Session, key="k")
+    assert again.get_equity() == 10_050.0
+    again.close(5)
+
+
+def test_transient_errors_are_retried_with_a_bound(tmp_path):
+    from sqlalchemy.exc import OperationalError
+
+    Session = _session_factory(tmp_path)
+    failures = [2]
+
+    def flaky():
+        if failures[0]:
+            failures[0] -= 1
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+        return Session()
+
+    store = SqlStore(Session, key="k", flush_interval=0.01, retry_backoff=0.001, max_retries=3)
+    store.session_factory = flaky
+    store.set_equity(1.0)
+    assert store.flush(5) and store.write_errors == 2 and not store.dead_letters
+
+    failures[0] = 100                                  # БД лежит дольше, чем готовы ждать
+    store.set_equity(2.0)
+    assert store.flush(5)
+    assert store.write_errors == 2 + 4 and [op[2] for op, _ in store.dead_letters] == [{"v": 2.0}]
+    failures[0] = 0
+    store.close(5)
@@ -0,0 +1,45 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi.testclient import TestClient
+
+from core.metrics import LatencyRegistry
+from core.tracing import TRACER, Tracer, render_prometheus
+
+
+def test_tracer_keys_by_stage_and_pair():
+    t = Tracer()
+    for ns in (1_000, 2_000, 3_000):
+        t.record("strategy", "ETH/USDT", ns)
+    with t.span("indicators", "BTC/USDT"):
+        pass
+    t.record("strategy", "BTC/USDT", 5_000_000)
+    assert t.hist("strategy", "ETH/USDT").count == 3
+    assert t.hist("indicators", "BTC/USDT").count == 1
+    assert t.hist("strategy", "BTC/USDT").percentile(50) >= 5_000_000 * 0.93
+
+    off = Tracer(enabled=False)
+    off.record("x", "", 1)
+    with off.span("y"):
+        pass
+    assert off.items() == []
+
+
+def test_prometheus_endpoint():
+    from apps.api import app, latency_sources
+    TRACER.reset()
+    TRACER.record("order_ack", 'ETH/USDT', 2_500_000)
+    reg = LatencyRegistry()
+    reg.record("POST /v3/order", 10_000_000)
+    latency_sources["binance"] = reg
+    try:
+        body = TestClient(app).get("/metrics").text
+    finally:
+        latency_sources.clear()
+        TRACER.reset()
+    assert "# TYPE trading_stage_latency_seconds summary" in body
+    assert 'trading_stage_latency_seconds_count{stage="order_ack",pair="ETH/USDT"} 1' in body
+    assert 'trading_endpoint_latency_seconds_count{source="binance",endpoint="POST /v3/order"} 1' in body
+    line = next(l for l in body.splitlines() if 'stage="order_ack"' in l and 'quantile="0.5"' in l)
+    assert abs(float(line.split()[-1]) - 0.0025) < 0.0025 * 0.07
+    assert render_prometheus(Tracer()).count("\n") == 2
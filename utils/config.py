@@ -1,6 +1,9 @@
 # модели pydantic
 import yaml
 from dataclasses import dataclass
+from typing import List, Optional
+
+from core.rules import validate_rules
 
 @dataclass
 class Config:
@@ -10,8 +13,12 @@ class Config:
     entry_long: dict
     exit_long: dict
     risk: dict
+    pairs: Optional[List[str]] = None   # несколько пар в одном процессе (apps/runner.py); иначе — pair
 
 def load_config(path="config.yaml") -> Config:
     with open(path, "r", encoding="utf-8") as f:
         data = yaml.safe_load(f)
-    return Config(**data)
+    cfg = Config(**data)
+    # ссылки правил на индикаторы проверяем сразу, а не на первом баре
+    validate_rules(cfg.indicators, cfg.entry_long, cfg.exit_long)
+    return cfg
@@ -0,0 +1,61 @@
+# token bucket: общий лимитер для REST-клиентов (Binance weight, SP-API, скрейпер)
+import asyncio
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    rate токенов в секунду, не больше capacity в запасе.
+    acquire() блокирует поток, aacquire() — только корутину; обе безопасны из нескольких потоков.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._ts = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float) -> float:
+        """Списывает токены (в долг, если нужно) и возвращает, сколько ждать."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._ts) * self.rate)
+            self._ts = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: float = 1.0) -> None:
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def drain(self, seconds: float) -> None:
+        """Сервер сказал «хватит» (429 / Retry-After): обнуляем запас на seconds вперёд."""
+        with self._lock:
+            self._tokens = min(self._tokens, -seconds * self.rate)
+            self._ts = time.monotonic()
+
+
+def parse_retry_after(header: Optional[str]) -> Optional[float]:
+    """Retry-After в секундах ожидания: число секунд или HTTP-date (прошедшая дата — 0). Мусор/нет — None."""
+    if not header:
+        return None
+    try:
+        return max(0.0, float(header))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(header).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None